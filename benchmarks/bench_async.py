@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measures the asynchronous pipeline with DOI retrieval against a local stand-in
+for Crossref, that answers after a fixed latency, at several concurrency limits
+
+Usage: python benchmarks/bench_async.py [COUNT] [LATENCY_MS]
+"""
+
+import asyncio
+import json
+import sys
+import time
+import urllib.parse
+from typing import List
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.async_pipeline import (
+    CrossrefClient,
+    format_references_async,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    default_options,
+)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    text = "\n".join(generate_references(count))
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+
+    handlers: List["asyncio.Task[None]"] = []
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        handlers.append(asyncio.current_task())  # type: ignore
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()).strip():
+                pass
+            target = urllib.parse.urlsplit(request_line.split()[1].decode())
+            title = urllib.parse.parse_qs(target.query)["query"][0]
+            await asyncio.sleep(latency)
+            body = json.dumps(
+                {"message": {"items": [{"DOI": "10.5555/1", "title": [title]}]}}
+            ).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body))
+            writer.write(body)
+            await writer.drain()
+        writer.close()
+
+    async def run(concurrency: int) -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        async with server, CrossrefClient(
+            f"http://{host}:{port}/works", concurrency
+        ) as client:
+            start = time.perf_counter()
+            first = None
+            results = 0
+            async for _ in format_references_async(
+                text, options, journal_matcher, client
+            ):
+                if first is None:
+                    first = time.perf_counter() - start
+                results += 1
+            elapsed = time.perf_counter() - start
+        # the handlers finish, when the client has closed its connections
+        await asyncio.gather(*handlers)
+        handlers.clear()
+        print(
+            f"{concurrency:>11}  {elapsed:>6.2f} s  {results / elapsed:>8.1f}"
+            f"  {first * 1000:>9.0f} ms"
+        )
+
+    print(f"{count} references, {latency * 1000:.0f} ms per lookup")
+    print("concurrency    total  refs/s  first result")
+    for concurrency in [1, 8, 32]:
+        asyncio.run(run(concurrency))
+
+
+if __name__ == "__main__":
+    main()
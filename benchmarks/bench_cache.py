@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Measures a rerun of a bibliography with a few edited references,
+with and without the result cache
+
+Usage: python benchmarks/bench_cache.py [COUNT] [EDITED]
+"""
+
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.cache import ResultCache
+from itaxotools.reference_formatter.library.citation import process_reference_file
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    edited = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    lines = list(generate_references(count))
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    with tempfile.TemporaryDirectory() as output_dir:
+        cache_path = Path(output_dir) / "cache.sqlite"
+
+        def run(cache) -> float:
+            start = time.perf_counter()
+            process_reference_file(
+                io.StringIO("\n".join(lines)),
+                output_dir,
+                options,
+                journal_matcher,
+                cache,
+            )
+            return time.perf_counter() - start
+
+        print("no cache:      {:.3f} s".format(run(None)))
+        with ResultCache(cache_path) as cache:
+            print("cold cache:    {:.3f} s".format(run(cache)))
+        rng = random.Random(0)
+        for i in rng.sample(range(count), edited):
+            lines[i] = lines[i].replace("a", "e", 1)
+        with ResultCache(cache_path) as cache:
+            print(f"{edited} lines edited:")
+            print("warm cache:    {:.3f} s".format(run(cache)))
+            print(cache.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measures the cost of checkpointing: compares formatting synthetic references
+into a file with `format_document` and with `format_checkpointed`,
+and times resuming a run, that was interrupted in the middle
+
+Usage: python benchmarks/bench_checkpoint.py [COUNT] [SEED]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from corpus import generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import (
+    format_checkpointed,
+    format_document,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    default_options,
+)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    # DOIs are looked up without network, so that the run can be interrupted
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+    lookups = 0
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        nonlocal lookups
+        lookups += 1
+        if lookups == count // 2:
+            raise Interrupted
+        return None
+
+    with tempfile.TemporaryDirectory() as directory, quiet_parser():
+        input = Path(directory) / "input.txt"
+        input.write_text("\n".join(generate_references(count, seed)))
+        plain = Path(directory) / "plain.txt"
+        start = time.perf_counter()
+        with open(input) as infile, open(plain, mode="w") as outfile:
+            for piece in format_document(infile, default_options(), journal_matcher):
+                outfile.write(piece)
+        plain_time = time.perf_counter() - start
+        checkpointed = Path(directory) / "checkpointed.txt"
+        start = time.perf_counter()
+        format_checkpointed(
+            str(input), str(checkpointed), default_options(), journal_matcher
+        )
+        checkpointed_time = time.perf_counter() - start
+        assert checkpointed.read_text() == plain.read_text()
+        resumed = Path(directory) / "resumed.txt"
+        try:
+            format_checkpointed(
+                str(input), str(resumed), options, journal_matcher, lookup=lookup
+            )
+        except Interrupted:
+            pass
+        start = time.perf_counter()
+        format_checkpointed(
+            str(input),
+            str(resumed),
+            options,
+            journal_matcher,
+            resume=True,
+            lookup=lookup,
+        )
+        resumed_time = time.perf_counter() - start
+    print(f"formatting {count} references: {plain_time:.3f} s")
+    print(
+        f"with checkpoints: {checkpointed_time:.3f} s"
+        f" ({checkpointed_time / plain_time - 1:+.1%})"
+    )
+    print(f"resuming after half of the references: {resumed_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
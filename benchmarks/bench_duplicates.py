@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Measures the duplicate detection on merged synthetic reference lists,
+where a fifth of the references are reformatted copies,
+with increasing sizes, to show that its time grows near linearly
+
+Usage: python benchmarks/bench_duplicates.py [SIZES...]
+"""
+
+import sys
+import time
+from typing import List
+
+from corpus import generate_duplicated, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import Reference
+from itaxotools.reference_formatter.library.duplicates import (
+    DuplicateFields,
+    candidate_pairs,
+    duplicate_clusters,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+
+FRACTION = 0.2
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 20000, 40000]
+    journal_matcher = JournalMatcher()
+    for size in sizes:
+        works: List[int] = []
+        references: List[Reference] = []
+        with quiet_parser():
+            for work, line in generate_duplicated(size, FRACTION):
+                reference = Reference.parse(line, journal_matcher)
+                if reference:
+                    works.append(work)
+                    references.append(reference)
+        start = time.perf_counter()
+        clusters = duplicate_clusters(references)
+        elapsed = time.perf_counter() - start
+        pairs = sum(
+            1 for _ in candidate_pairs([DuplicateFields(ref) for ref in references])
+        )
+        duplicates = len(works) - len(set(works))
+        found = sum(len(cluster) - 1 for cluster in clusters)
+        # the clusters, that merge different works
+        wrong = sum(len({works[i] for i in cluster}) - 1 for cluster in clusters)
+        print(
+            f"{len(references)} references: {pairs} candidate pairs,"
+            f" {found - wrong} of {duplicates} duplicates found, {wrong} wrongly,"
+            f" {elapsed:.3f} s, {elapsed / len(references) * 1e6:.1f} µs/reference"
+        )
+
+
+if __name__ == "__main__":
+    main()
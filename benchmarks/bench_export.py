@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Measures the export of the parsed fields of synthetic references to CSV,
+compared with parsing them, and the peak memory of the export
+for several batch sizes, which doesn't grow with the number of references
+
+Usage: python benchmarks/bench_export.py [COUNT] [SEED]
+"""
+
+import io
+import os
+import sys
+import time
+
+from corpus import generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import txt_to_references
+from itaxotools.reference_formatter.library.export import column_batches, write_csv
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.memory import MIB, profile_memory
+from itaxotools.reference_formatter.library.options import default_options
+
+BATCH_SIZES = [1000, 10000]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    text = "\n".join(generate_references(count, seed))
+    journal_matcher = JournalMatcher()
+    start = time.process_time()
+    with quiet_parser():
+        entries = list(
+            txt_to_references(io.StringIO(text), default_options(), journal_matcher)
+        )
+    parsing = time.process_time() - start
+    with open(os.devnull, mode="w", newline="") as output:
+        start = time.process_time()
+        write_csv(column_batches(entries), output)
+        exporting = time.process_time() - start
+        print(f"parsing {count} references: {parsing:.3f} s")
+        print(
+            f"exporting them to CSV: {exporting:.3f} s"
+            f" ({exporting / parsing:.1%} of parsing,"
+            f" {exporting / len(entries) * 1e6:.1f} µs per reference)"
+        )
+        for batch_size in BATCH_SIZES:
+            with profile_memory("export") as profile:
+                write_csv(column_batches(entries, batch_size), output)
+            print(f"peak with batches of {batch_size}: {profile.peak / MIB:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Measures splitting of HTML reference lists of growing size into list entries
+
+Usage: python benchmarks/bench_html.py [SIZES...]
+"""
+
+import io
+import sys
+import time
+
+from corpus import generate_html
+
+from itaxotools.reference_formatter.library.handle_html import (
+    HTMLList,
+    HTMLListReader,
+)
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print("entries  list   HTMLList  per entry  HTMLListReader  per entry")
+    for size in sizes:
+        for list_tag in ["p", "ol"]:
+            document = generate_html(size, list_tag=list_tag)
+
+            start = time.perf_counter()
+            count = sum(1 for _ in HTMLList(document))
+            whole = time.perf_counter() - start
+            assert count == size
+
+            start = time.perf_counter()
+            count = sum(1 for _ in HTMLListReader().read(io.StringIO(document)))
+            streamed = time.perf_counter() - start
+            assert count == size
+
+            print(
+                "{:>7}  {:<4} {:>8.3f} s {:>7.2f} µs {:>13.3f} s {:>7.2f} µs".format(
+                    size,
+                    list_tag,
+                    whole,
+                    whole / size * 1e6,
+                    streamed,
+                    streamed / size * 1e6,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Measures the live update of the output after a change of the options:
+formatting of the visible window and of the whole output of parsed references,
+compared to processing the input again
+
+Usage: python benchmarks/bench_live.py [COUNT] [WINDOW]
+"""
+
+import io
+import sys
+import tempfile
+import time
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.citation import process_reference_file
+from itaxotools.reference_formatter.library.document import ParsedDocument
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import Options, default_options
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    text = "\n".join(generate_references(count))
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    changed_options = dict(options)
+    changed_options[Options.ProcessPageRangeVolume] = False
+
+    start = time.perf_counter()
+    document = ParsedDocument.from_text(io.StringIO(text), options, journal_matcher)
+    print("parsing:            {:.3f} s".format(time.perf_counter() - start))
+
+    doi_lookup = document.doi_lookup()
+    middle = len(document) // 2
+    start = time.perf_counter()
+    document.lines(changed_options, middle, middle + window, doi_lookup)
+    print(
+        "visible {} lines:  {:.1f} ms".format(
+            window, (time.perf_counter() - start) * 1000
+        )
+    )
+
+    start = time.perf_counter()
+    document.render(changed_options, lambda _: None, doi_lookup)
+    print("whole output:       {:.3f} s".format(time.perf_counter() - start))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        process_reference_file(
+            io.StringIO(text), output_dir, changed_options, journal_matcher
+        )
+        print("processing again:   {:.3f} s".format(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
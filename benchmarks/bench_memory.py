@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Profiles the memory of the core stages with tracemalloc:
+building the journal index, constructing the journal matcher,
+parsing a synthetic corpus into references, that are kept,
+and processing an html list of a fifth of its size.
+
+Prints the peak and the largest allocation sites of each stage
+and fails, when the peak of a stage is over its budget.
+
+Usage: python benchmarks/bench_memory.py [--count N] [--top N] [--frames N]
+           [--budget STAGE=MIB...] [STAGE...]
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple
+
+from corpus import generate_html, generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import (
+    Reference,
+    process_reference_html,
+)
+from itaxotools.reference_formatter.library.journal_list import (
+    JournalMatcher,
+    load_index,
+    table_version,
+)
+from itaxotools.reference_formatter.library.memory import (
+    MemoryBudgetExceeded,
+    profile_memory,
+)
+from itaxotools.reference_formatter.library.options import Options, default_options
+
+
+class Stage(NamedTuple):
+    name: str
+    # prepares the input and returns the profiled function
+    setup: Callable[[argparse.Namespace, Path], Callable[[], Any]]
+    # budget of the peak in MiB for the given number of references
+    budget: Callable[[int], float]
+
+
+def _journal_index(args: argparse.Namespace, directory: Path) -> Callable[[], Any]:
+    version = table_version()
+    return lambda: load_index(directory / "built.idx", version)
+
+
+def _journal_matcher(args: argparse.Namespace, directory: Path) -> Callable[[], Any]:
+    # the index is built beforehand
+    load_index(directory / "journals.idx", table_version())
+    return lambda: JournalMatcher(directory / "journals.idx")
+
+
+def _parse(args: argparse.Namespace, directory: Path) -> Callable[[], Any]:
+    journal_matcher = JournalMatcher(directory / "journals.idx")
+    lines = list(generate_references(args.count))
+    return lambda: [Reference.parse(line, journal_matcher) for line in lines]
+
+
+def _html(args: argparse.Namespace, directory: Path) -> Callable[[], Any]:
+    journal_matcher = JournalMatcher(directory / "journals.idx")
+    document = generate_html(args.count // 5, 0, "ol")
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    return lambda: process_reference_html(
+        io.StringIO(document), str(directory), options, journal_matcher
+    )
+
+
+STAGES = [
+    Stage("journal_index", _journal_index, lambda count: 24),
+    Stage("journal_matcher", _journal_matcher, lambda count: 16),
+    # about 2.5 KiB are kept for each reference
+    Stage("parse", _parse, lambda count: 16 + count * 3 / 1024),
+    Stage("html", _html, lambda count: 32),
+]
+
+
+def budgets(args: argparse.Namespace) -> Dict[str, float]:
+    result = {stage.name: stage.budget(args.count) for stage in STAGES}
+    for budget in args.budget:
+        name, _, value = budget.partition("=")
+        if name not in result:
+            sys.exit(f"Unknown stage: {name}")
+        result[name] = float(value)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stages", nargs="*", help="names of the stages to profile")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--top", type=int, default=5, help="allocation sites shown")
+    parser.add_argument("--frames", type=int, default=1, help="frames per traceback")
+    parser.add_argument(
+        "--budget", action="append", default=[], help="override as STAGE=MIB"
+    )
+    args = parser.parse_args()
+    limits = budgets(args)
+
+    exceeded = []
+    with tempfile.TemporaryDirectory() as directory:
+        for stage in STAGES:
+            if args.stages and stage.name not in args.stages:
+                continue
+            function = stage.setup(args, Path(directory))
+            with quiet_parser():
+                with profile_memory(stage.name, args.top, args.frames) as profile:
+                    result = function()
+            del result
+            print(profile.report())
+            try:
+                profile.check(limits[stage.name])
+            except MemoryBudgetExceeded as ex:
+                print(ex)
+                exceeded.append(stage.name)
+            print()
+    if exceeded:
+        print("Over the budget: " + ", ".join(exceeded))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Measures parsing throughput of `Reference.parse` on a synthetic corpus
+
+Usage: python benchmarks/bench_parse.py [COUNT] [SEED]
+"""
+
+import sys
+import time
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.citation import Reference
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    lines = list(generate_references(count, seed))
+    journal_matcher = JournalMatcher()
+    for journal_matcher_used in (None, journal_matcher):
+        parsed = 0
+        start = time.perf_counter()
+        for line in lines:
+            if Reference.parse(line, journal_matcher_used):
+                parsed += 1
+        elapsed = time.perf_counter() - start
+        print(
+            "journals: {:<3} parsed {}/{} in {:.3f} s, {:.0f} lines/s".format(
+                "on" if journal_matcher_used else "off",
+                parsed,
+                count,
+                elapsed,
+                count / elapsed,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Measures the pre-filter of non-reference lines on a synthetic manuscript,
+where a third of the lines are headings and notes:
+compares `parse_line` on every line with `parse_line`
+on the lines, that pass `may_be_reference`,
+and checks that both give the same results
+
+Usage: python benchmarks/bench_prefilter.py [COUNT] [SEED]
+"""
+
+import sys
+import time
+from typing import Any, Callable, List
+
+from corpus import generate_manuscript, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import (
+    DEFAULT_PARSER,
+    parse_line,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+
+
+def best_times(functions: List[Callable[[], Any]], repeat: int) -> List[float]:
+    """
+    Returns the best CPU time of each function,
+    which run in turns, so that the speed of the machine affects them alike
+    """
+    times = [float("inf")] * len(functions)
+    for _ in range(repeat):
+        for i, function in enumerate(functions):
+            start = time.process_time()
+            function()
+            times[i] = min(times[i], time.process_time() - start)
+    return times
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    lines = list(generate_manuscript(count, seed))
+    rejected = [line for line in lines if not DEFAULT_PARSER.may_be_reference(line)]
+    journal_matcher = JournalMatcher()
+
+    def unfiltered() -> List:
+        return [parse_line(line, journal_matcher) for line in lines]
+
+    def filtered() -> List:
+        return [
+            parse_line(line, journal_matcher)
+            if DEFAULT_PARSER.may_be_reference(line)
+            else None
+            for line in lines
+        ]
+
+    def parse_rejected() -> List:
+        return [parse_line(line, journal_matcher) for line in rejected]
+
+    def check_rejected() -> List:
+        return [DEFAULT_PARSER.may_be_reference(line) for line in rejected]
+
+    with quiet_parser():
+        unparsed = sum(1 for result in unfiltered() if result is None)
+        disagreements = sum(
+            1 for a, b in zip(unfiltered(), filtered()) if (a is None) != (b is None)
+        )
+        before, after, parsing, checking = best_times(
+            [unfiltered, filtered, parse_rejected, check_rejected], 5
+        )
+    print(
+        f"{unparsed} of {count} lines are not references,"
+        f" {len(rejected)} are rejected by the pre-filter"
+    )
+    print(f"{disagreements} lines are parsed differently")
+    print(
+        f"rejected lines: {parsing / len(rejected) * 1e6:.1f} µs to parse,"
+        f" {checking / len(rejected) * 1e6:.1f} µs to reject"
+    )
+    print(f"without pre-filter: {before:.3f} s, {count / before:.0f} lines/s")
+    print(
+        f"with pre-filter:    {after:.3f} s, {count / after:.0f} lines/s"
+        f" ({(after / before - 1) * 100:+.1f}%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
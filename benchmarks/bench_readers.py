@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Measures the throughput of reading a synthetic reference list
+as plain text, through a memory map and compressed with gzip, bz2 and xz
+
+Usage: python benchmarks/bench_readers.py [COUNT] [SEED]
+"""
+
+import bz2
+import gzip
+import lzma
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, TextIO
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.readers import (
+    MappedTextReader,
+    open_input,
+)
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+
+
+def measure(name: str, size: int, opener: Callable[[], TextIO]) -> None:
+    start = time.perf_counter()
+    with opener() as file:
+        lines = sum(1 for _ in file)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name}: {lines} lines in {elapsed:.3f} s,"
+        f" {size / elapsed / (1 << 20):.1f} MiB/s of text"
+    )
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    with tempfile.TemporaryDirectory() as directory:
+        input = Path(directory) / "input.txt"
+        input.write_text("\n".join(generate_references(count, seed)))
+        data = input.read_bytes()
+        size = len(data)
+        print(f"{count} references, {size / (1 << 20):.1f} MiB")
+        measure("open", size, lambda: open(input, errors="replace"))
+        measure("memory map", size, lambda: MappedTextReader(str(input)))
+        for extension, compress in COMPRESSORS.items():
+            path = Path(directory) / ("input.txt" + extension)
+            path.write_bytes(compress(data))
+            measure(extension, size, lambda: open_input(str(path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measures rendering synthetic references into several targets:
+compares a separate `format_document` run for each target
+with a single parse of `ParsedDocument` and `render_targets`
+
+Usage: python benchmarks/bench_render.py [COUNT] [SEED]
+"""
+
+import io
+import sys
+import time
+from typing import List
+
+from corpus import generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import format_document
+from itaxotools.reference_formatter.library.document import (
+    ParsedDocument,
+    RenderTarget,
+    TargetKind,
+    render_targets,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    Options,
+    OptionsDict,
+    YearFormat,
+    default_options,
+)
+
+
+def target_options() -> List[OptionsDict]:
+    changed = default_options()
+    changed[Options.YearFormat] = YearFormat.Period
+    unprocessed = default_options()
+    unprocessed[Options.ProcessPageRangeVolume] = False
+    return [default_options(), changed, unprocessed]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    text = "\n".join(generate_references(count, seed))
+    journal_matcher = JournalMatcher()
+    profiles = target_options()
+    with quiet_parser():
+        start = time.process_time()
+        for options in profiles:
+            separate = "".join(format_document(text, options, journal_matcher))
+        separate_time = time.process_time() - start
+        start = time.process_time()
+        document = ParsedDocument.from_text(
+            io.StringIO(text), profiles[0], journal_matcher
+        )
+        parse_time = time.process_time() - start
+        outputs = [io.StringIO() for _ in profiles]
+        render_targets(
+            document,
+            [
+                RenderTarget(TargetKind.Text, options, output)
+                for options, output in zip(profiles, outputs)
+            ],
+            document.doi_lookup(),
+        )
+        single_time = time.process_time() - start
+    assert outputs[-1].getvalue() == separate
+    print(f"{len(profiles)} targets of {count} references")
+    print(f"separate runs: {separate_time:.3f} s")
+    print(
+        f"single parse: {single_time:.3f} s"
+        f" (parsing {parse_time:.3f} s,"
+        f" {(single_time - parse_time) / len(profiles):.3f} s for each target)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Load test of the formatting service: sends single references or batches
+from concurrent clients and reports requests per second and latency percentiles.
+
+Starts a local server, unless the URL of a running one is given.
+
+Usage: python benchmarks/bench_server.py [--url URL] [--clients N]
+           [--requests N] [--batch SIZE] [--workers N]
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from typing import List
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.server import FormatterServer
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    references = list(generate_references(max(args.requests, args.batch)))
+    if args.batch == 1:
+        endpoint = "/format"
+        bodies = [json.dumps({"reference": line}).encode() for line in references]
+    else:
+        endpoint = "/batch"
+        bodies = [
+            json.dumps({"text": "\n".join(references[i : i + args.batch])}).encode()
+            for i in range(0, len(references), args.batch)
+        ]
+
+    server = None
+    url = args.url
+    if not url:
+        server = FormatterServer(("127.0.0.1", 0), args.workers, use_cache=False)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}"
+
+    latencies: List[float] = []
+    next_request = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def client() -> None:
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                return
+            body = bodies[i % len(bodies)]
+            start = time.perf_counter()
+            with urllib.request.urlopen(
+                urllib.request.Request(url + endpoint, body)
+            ) as response:
+                response.read()
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if server:
+        server.shutdown()
+        server.server_close()
+
+    latencies.sort()
+    print(
+        f"{len(latencies)} requests of {args.batch} references"
+        f" from {args.clients} clients in {elapsed:.2f} s"
+    )
+    print(f"requests/s: {len(latencies) / elapsed:.1f}")
+    for name, fraction in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]:
+        print(f"{name}: {percentile(latencies, fraction) * 1000:.1f} ms")
+    print(f"max: {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
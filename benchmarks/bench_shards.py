@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Measures sharded formatting of synthetic references:
+the planning of the shards, a single run and the shards run
+in local worker processes, which simulate the nodes, followed by the merge
+
+Usage: python benchmarks/bench_shards.py [COUNT] [SHARDS] [WORKERS]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import format_document
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+from itaxotools.reference_formatter.library.shards import (
+    merge_report,
+    merge_shards,
+    plan_shards,
+    run_local,
+    write_plan,
+)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    journal_matcher = JournalMatcher()
+    with tempfile.TemporaryDirectory() as directory, quiet_parser():
+        input = Path(directory) / "input.txt"
+        input.write_text("\n".join(generate_references(count)))
+        start = time.perf_counter()
+        with open(input) as infile:
+            expected = "".join(
+                format_document(infile, default_options(), journal_matcher)
+            )
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        plan = plan_shards(str(input), shards, {})
+        plan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        write_plan(plan, directory)
+        run_local(plan, directory, workers, False, journal_matcher)
+        output = io.StringIO()
+        summary = merge_shards(directory, output)
+        sharded_time = time.perf_counter() - start
+    assert output.getvalue() == expected
+    print(f"{count} references, {len(plan.shards)} shards, {workers} workers")
+    print(f"planning: {plan_time * 1000:.1f} ms")
+    print(f"single run: {single_time:.3f} s")
+    print(f"sharded run and merge: {sharded_time:.3f} s")
+    print(merge_report(summary).splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
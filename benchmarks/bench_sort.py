@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Measures sorting of parsed synthetic references by their collation keys,
+compared with parsing them
+
+Usage: python benchmarks/bench_sort.py [COUNT] [SEED]
+"""
+
+import sys
+import time
+
+from corpus import generate_references, quiet_parser
+
+from itaxotools.reference_formatter.library.citation import Reference
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.sorting import (
+    collation_key,
+    sorted_in_place,
+)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    lines = list(generate_references(count, seed))
+    journal_matcher = JournalMatcher()
+    start = time.perf_counter()
+    with quiet_parser():
+        references = [Reference.parse(line, journal_matcher) for line in lines]
+    parsing = time.perf_counter() - start
+    start = time.perf_counter()
+    keys = [collation_key(reference) for reference in references if reference]
+    keying = time.perf_counter() - start
+    start = time.perf_counter()
+    sorted(keys)
+    sorting = time.perf_counter() - start
+    start = time.perf_counter()
+    sorted_in_place(
+        references, lambda reference: collation_key(reference) if reference else None
+    )
+    total = time.perf_counter() - start
+    print(f"parsing {count} references: {parsing:.3f} s")
+    print(f"computing the keys: {keying:.3f} s, sorting them: {sorting:.3f} s")
+    print(f"sorting the references: {total:.3f} s ({total / parsing:.1%} of parsing)")
+
+
+if __name__ == "__main__":
+    main()
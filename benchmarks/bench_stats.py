@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measures the cost of collecting the statistics of processing:
+formats a synthetic corpus with and without them and prints the collected report
+
+Usage: python benchmarks/bench_stats.py [COUNT] [REPEAT]
+"""
+
+import sys
+import time
+from typing import Callable
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.citation import format_references
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+from itaxotools.reference_formatter.library.stats import StageClock, collect_stats
+
+
+def best_time(function: Callable[[], None], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    text = "\n".join(generate_references(count))
+    journal_matcher = JournalMatcher()
+    options = default_options()
+
+    def run() -> None:
+        for _ in format_references(text, options, journal_matcher):
+            pass
+
+    clock = StageClock()
+
+    def run_with_stats() -> None:
+        nonlocal clock
+        with collect_stats() as clock:
+            run()
+
+    disabled = best_time(run, repeat)
+    enabled = best_time(run_with_stats, repeat)
+    print(f"without statistics: {disabled:.3f} s, {count / disabled:.0f} refs/s")
+    print(
+        f"with statistics:    {enabled:.3f} s, {count / enabled:.0f} refs/s"
+        f" (+{(enabled / disabled - 1) * 100:.1f}%)"
+    )
+    print()
+    print(clock.report())
+
+
+if __name__ == "__main__":
+    main()
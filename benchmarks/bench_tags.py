@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measures formatting of HTML entries with hundreds of inline style tags,
+which preserves the style of the authors' surnames and the journal names
+
+Usage: python benchmarks/bench_tags.py [COUNT] [AUTHORS]
+"""
+
+import random
+import sys
+import time
+
+from corpus import SURNAMES, generate_reference, quiet_parser, styled_entry
+
+from itaxotools.reference_formatter.library.citation import process_entry
+from itaxotools.reference_formatter.library.handle_html import ListEntry, extract_tags
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    Options,
+    Style,
+    default_options,
+)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    authors = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(0)
+    entries = []
+    for _ in range(count):
+        reference = generate_reference(rng)
+        while "et al" in reference or reference.endswith(")."):
+            reference = generate_reference(rng)
+        names = ", ".join(
+            rng.choice(SURNAMES) + ", " + rng.choice("ABCDEFG") + "."
+            for _ in range(authors)
+        )
+        entries.append(ListEntry(None, styled_entry(rng, names + ", " + reference)))
+    tag_count = sum(len(extract_tags(entry.content)[1]._tags) for entry in entries)
+    print(f"{count} entries, {tag_count // count} tags per entry")
+
+    start = time.perf_counter()
+    for entry in entries:
+        text, tags = extract_tags(entry.content)
+        for offset in range(0, len(text), 8):
+            tags.surround_tags("", offset)
+            tags.insert_tags(text[offset : offset + 40], offset)
+    elapsed = time.perf_counter() - start
+    print("tag lookups:  {:.3f} s".format(elapsed))
+
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    options[Options.SurnameStyle] = Style.Preserve
+    options[Options.JournalStyle] = Style.Preserve
+    start = time.perf_counter()
+    with quiet_parser():
+        for entry in entries:
+            process_entry(entry, options, journal_matcher, lambda title, fuzzy: None)
+    elapsed = time.perf_counter() - start
+    print("formatting:   {:.3f} s".format(elapsed))
+
+
+if __name__ == "__main__":
+    main()
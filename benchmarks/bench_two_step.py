@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Measures the second step of the two-step workflow,
+with and without the structured intermediate records
+
+Usage: python benchmarks/bench_two_step.py [COUNT] [SEED]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from corpus import generate_references
+
+from itaxotools.reference_formatter.library.citation import (
+    intermediate_records,
+    txt_first_step,
+    txt_second_step,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    input = io.StringIO("\n".join(generate_references(count, seed)))
+    journal_matcher = JournalMatcher()
+    options = default_options()
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        txt_first_step(input, output_dir, options, journal_matcher)
+        print("step 1:               {:.3f} s".format(time.perf_counter() - start))
+        with open(os.path.join(output_dir, "output")) as view_file:
+            view = view_file.read().splitlines()
+
+        start = time.perf_counter()
+        txt_second_step(view, output_dir, options, journal_matcher)
+        print("step 2, view only:    {:.3f} s".format(time.perf_counter() - start))
+
+        start = time.perf_counter()
+        txt_second_step(
+            view, output_dir, options, journal_matcher, intermediate_records(output_dir)
+        )
+        print("step 2, with records: {:.3f} s".format(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measures the memory of the worker processes of the formatting service
+with 1, 4 and 16 workers, which are forked or spawned.
+
+RSS counts the shared pages in every worker, while the private memory
+is what each worker adds and PSS splits the shared pages between processes.
+Reads /proc, so it runs on Linux.
+
+Each measurement runs in a new process.
+
+Usage: python benchmarks/bench_workers.py [START_METHOD...]
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Tuple
+
+from itaxotools.reference_formatter.library import server
+from itaxotools.reference_formatter.library.options import default_options
+
+WORKER_COUNTS = [1, 4, 16]
+
+
+def memory_usage() -> Dict[str, int]:
+    """
+    Returns the memory of this process in KiB
+    """
+    usage: Dict[str, int] = {}
+    with open("/proc/self/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3:
+                usage[parts[0].rstrip(":")] = int(parts[1])
+    return usage
+
+
+def measure(text: str) -> Tuple[int, Dict[str, int]]:
+    server._format_request(text, default_options())
+    # the other tasks are taken by the other workers
+    time.sleep(1)
+    return os.getpid(), memory_usage()
+
+
+def run(start_method: str, workers: int) -> None:
+    # spawned workers import this module again, but they don't need pandas
+    from corpus import generate_references
+
+    text = "\n".join(generate_references(300))
+    start = time.perf_counter()
+    with server.worker_pool(workers, False, start_method=start_method) as pool:
+        futures = [pool.submit(measure, text) for _ in range(3 * workers)]
+        usages = dict(future.result() for future in futures)
+        elapsed = time.perf_counter() - start
+        parent = memory_usage()
+    rss = sum(usage["Rss"] for usage in usages.values()) / len(usages)
+    private = sum(
+        usage["Private_Clean"] + usage["Private_Dirty"] for usage in usages.values()
+    ) / len(usages)
+    pss = parent["Pss"] + sum(usage["Pss"] for usage in usages.values())
+    print(
+        f"{start_method:<5}  {len(usages):>7}  {rss / 1024:>7.0f} MB"
+        f"  {private / 1024:>11.0f} MB  {pss / 1024:>6.0f} MB  {elapsed:>6.1f} s",
+        flush=True,
+    )
+
+
+def main() -> None:
+    if len(sys.argv) == 3 and sys.argv[2].isdigit():
+        run(sys.argv[1], int(sys.argv[2]))
+        return
+    print("start  workers  rss/worker  private/worker  total pss    time")
+    for start_method in sys.argv[1:] or ["fork", "spawn"]:
+        for workers in WORKER_COUNTS:
+            subprocess.run(
+                [sys.executable, __file__, start_method, str(workers)],
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Seeded generator of synthetic bibliography references
+"""
+
+import contextlib
+import html
+import logging
+import random
+import re
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from itaxotools.reference_formatter.library.citation import parser_logger
+from itaxotools.reference_formatter.library.resources import get_resource
+
+SURNAMES = [
+    "Müller",
+    "Lemmon",
+    "Prum",
+    "Kircher",
+    "Raxworthy",
+    "Tucker",
+    "Hedges",
+    "Stamatakis",
+    "Nguyen",
+    "von Haeseler",
+    "Cernanský",
+    "Augé",
+    "Borsuk-Bialynicka",
+    "O'Brien",
+    "Wörheide",
+    "Smith",
+    "García",
+    "Ivanov",
+    "Kharchev",
+    "Vences",
+]
+
+WORDS = [
+    "phylogeny",
+    "of",
+    "the",
+    "lizards",
+    "and",
+    "snakes",
+    "from",
+    "late",
+    "Eocene",
+    "deposits",
+    "using",
+    "targeted",
+    "sequencing",
+    "data",
+    "a",
+    "revision",
+    "genus",
+    "new",
+    "species",
+    "evolution",
+    "in",
+    "tropical",
+    "island",
+    "frogs",
+]
+
+DASHES = ["-", "–", "—"]
+
+_journals: Optional[List[str]] = None
+
+
+def journals() -> List[str]:
+    """
+    Journal names of all forms from the abbreviation table
+    """
+    global _journals
+    if _journals is None:
+        table = pd.read_table(get_resource("Journal_abbreviations.csv"), dtype=str)
+        _journals = sorted(set(table.stack().dropna()))
+    return _journals
+
+
+def _initials(rng: random.Random) -> str:
+    letters = rng.sample("ABCDEFGHJKLMNPRSTVW", rng.randint(1, 2))
+    return " ".join(letter + "." for letter in letters)
+
+
+def _authors(rng: random.Random) -> str:
+    count = rng.choice([1, 1, 2, 2, 3, 4, 6, 12])
+    names = [rng.choice(SURNAMES) + ", " + _initials(rng) for _ in range(count)]
+    if count == 1:
+        return names[0]
+    if rng.random() < 0.1:
+        return names[0] + " et al."
+    return ", ".join(names[:-1]) + rng.choice([" & ", " and ", ", "]) + names[-1]
+
+
+def _title(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(4, 14))]
+    return " ".join(words).capitalize() + "."
+
+
+def _volume(rng: random.Random) -> str:
+    volume = str(rng.randint(1, 300))
+    if rng.random() < 0.4:
+        return volume + "(" + str(rng.randint(1, 9)) + "):"
+    return volume + ","
+
+
+def _pages(rng: random.Random) -> str:
+    first = rng.randint(1, 3000)
+    return str(first) + rng.choice(DASHES) + str(first + rng.randint(1, 40))
+
+
+def _doi(rng: random.Random) -> str:
+    return rng.choice(["doi: ", "https://doi.org/"]) + "10.{}/{}".format(
+        rng.randint(1000, 9999), rng.randint(100000, 999999)
+    )
+
+
+def generate_reference(rng: random.Random, number: Optional[int] = None) -> str:
+    year = str(rng.randint(1850, 2023))
+    if rng.random() < 0.05:
+        year += rng.choice("abc")
+    journal = rng.choice(journals())
+    parts: List[str] = []
+    if number is not None:
+        parts.append(f"{number}.")
+    if rng.random() < 0.5:
+        # terminal year, as in Nature
+        parts += [
+            _authors(rng),
+            _title(rng),
+            journal,
+            _volume(rng),
+            _pages(rng),
+            f"({year}).",
+        ]
+    else:
+        # medial year
+        parts += [
+            _authors(rng),
+            f"({year})." if rng.random() < 0.7 else f"{year}.",
+            _title(rng),
+            journal + ",",
+            _volume(rng),
+            _pages(rng) + ".",
+        ]
+    if rng.random() < 0.3:
+        parts.append(_doi(rng))
+    return " ".join(parts)
+
+
+def generate_references(count: int, seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    numbered = rng.random() < 0.5
+    for i in range(count):
+        yield generate_reference(rng, i + 1 if numbered else None)
+
+
+# lines of manuscripts, that are not references
+HEADINGS = [
+    "References",
+    "LITERATURE CITED",
+    "Literature cited",
+    "Supplementary references",
+    "4. DISCUSSION",
+    "Appendix 2",
+    "Table 3. Specimens examined",
+    "ZOOTAXA 4821 (2)",
+    "© 2020 Magnolia Press",
+    "Received 12 March 2020; accepted 3 June 2020",
+    "* Corresponding author: smith@example.org",
+    "Note: references marked with an asterisk were not seen",
+    "---",
+    "* * *",
+    "Page 14 of 22",
+]
+
+
+def generate_manuscript(count: int, seed: int = 0) -> Iterator[str]:
+    """
+    Reference list of a manuscript, with a heading or a note
+    for every two references on average
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        if rng.random() < 1 / 3:
+            yield rng.choice(HEADINGS)
+        else:
+            yield generate_reference(rng)
+
+
+def reformatted(rng: random.Random, reference: str) -> str:
+    """
+    The same reference, formatted differently, as in a merged list
+    """
+    if rng.random() < 0.5:
+        reference = reference.replace(" & ", " and ")
+    if rng.random() < 0.5:
+        for dash in DASHES:
+            reference = reference.replace(dash, "-")
+    if rng.random() < 0.5:
+        # initials without periods
+        reference = re.sub(r"\b([A-Z])\.", r"\1", reference)
+    if rng.random() < 0.3:
+        reference = reference.split(" doi: ")[0].split(" https://doi.org/")[0]
+    return reference
+
+
+def generate_duplicated(
+    count: int, fraction: float, seed: int = 0
+) -> List[Tuple[int, str]]:
+    """
+    Merged reference list, where `fraction` of the references
+    are reformatted copies of the others.
+    Each reference is paired with the index of the original.
+    """
+    rng = random.Random(seed)
+    unique = list(generate_references(round(count * (1 - fraction)), seed))
+    references = list(enumerate(unique))
+    for _ in range(count - len(unique)):
+        work = rng.randrange(len(unique))
+        references.append((work, reformatted(rng, unique[work])))
+    rng.shuffle(references)
+    return references
+
+
+def _html_entry(reference: str) -> str:
+    # Word puts formatting tags around parts of the entries
+    return html.escape(reference).replace(" (", " <i>(", 1).replace(") ", ")</i> ", 1)
+
+
+def styled_entry(rng: random.Random, reference: str) -> str:
+    """
+    Wraps every word of `reference` in inline style tags, as Word does
+    """
+    words = []
+    for word in html.escape(reference).split(" "):
+        tag = rng.choice(["span lang=EN-US style='font-size:10.0pt'", "i", "b"])
+        words.append(f"<{tag}>{word}</{tag.split()[0]}>")
+    return " ".join(words)
+
+
+def generate_html(count: int, seed: int = 0, list_tag: str = "p") -> str:
+    """
+    HTML document with the references as <p>, <ul> or <ol> list
+    """
+    parts = [
+        "<html><head><style>\n",
+        "p.MsoNormal { margin: 0cm; font-size: 12.0pt }\n" * 200,
+        "</style></head><body lang=EN-US>\n",
+    ]
+    references = generate_references(count, seed)
+    if list_tag == "p":
+        for reference in references:
+            parts.append("<p class=MsoNormal>" + _html_entry(reference) + "</p>\n")
+    else:
+        parts.append(f"<{list_tag}>\n")
+        for reference in references:
+            parts.append("<li>" + _html_entry(reference) + "</li>\n")
+        parts.append(f"</{list_tag}>\n")
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+@contextlib.contextmanager
+def quiet_parser() -> Iterator[None]:
+    """
+    Silences the warnings of the parser about the references it can't parse
+    """
+    level = parser_logger.level
+    parser_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        parser_logger.setLevel(level)
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the parsing and formatting components
+on a seeded synthetic corpus, compared against a JSON baseline.
+
+Each case reports the CPU time per item, the best of several repeats,
+which are interleaved with the other cases.
+With --save the results become the baseline, otherwise the run fails,
+when a case is slower than the baseline by more than the threshold,
+so that it can gate changes.
+The baseline is scaled by the time of a calibration loop relative to
+its time in the baseline, which compensates for the speed of the machine.
+
+Usage: python benchmarks/suite.py [--save] [--baseline PATH] [--threshold FRACTION]
+           [--repeat N] [--count N] [--seed N] [CASE...]
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from corpus import (
+    generate_html,
+    generate_reference,
+    generate_references,
+    quiet_parser,
+    styled_entry,
+)
+
+from itaxotools.reference_formatter.library.citation import (
+    Reference,
+    format_entry,
+)
+from itaxotools.reference_formatter.library.handle_html import (
+    HTMLList,
+    HTMLListReader,
+    ListEntry,
+    extract_tags,
+)
+from itaxotools.reference_formatter.library.journal_list import (
+    JournalMatcher,
+    load_index,
+)
+from itaxotools.reference_formatter.library.options import (
+    Options,
+    Style,
+    default_options,
+)
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+# allowed slowdown of a case relative to the baseline
+DEFAULT_THRESHOLD = 0.25
+
+# each repeat runs the case for at least this CPU time, in seconds
+MIN_REPEAT_TIME = 0.05
+
+
+class Corpus:
+    """
+    Inputs of the cases, generated on first use
+    """
+
+    def __init__(self, count: int, seed: int):
+        self.count = count
+        self.seed = seed
+
+    @cached_property
+    def journal_matcher(self) -> JournalMatcher:
+        return JournalMatcher()
+
+    @cached_property
+    def lines(self) -> List[str]:
+        return list(generate_references(self.count, self.seed))
+
+    @cached_property
+    def references(self) -> List[Reference]:
+        parsed = (Reference.parse(line, self.journal_matcher) for line in self.lines)
+        return [reference for reference in parsed if reference]
+
+    @cached_property
+    def articles(self) -> List[str]:
+        # the parts of the references, that the journal names are searched in
+        return [
+            reference.unparsed[reference.article]
+            + reference.unparsed[reference.article.stop :]
+            for reference in self.references
+        ]
+
+    @cached_property
+    def views(self) -> List[str]:
+        return [reference.serialize("{}") for reference in self.references]
+
+    @cached_property
+    def records(self) -> List[Dict[str, Any]]:
+        return [reference.to_record() for reference in self.references]
+
+    @cached_property
+    def html(self) -> str:
+        return generate_html(self.count, self.seed, "ol")
+
+    @cached_property
+    def styled_entries(self) -> List[ListEntry]:
+        rng = random.Random(self.seed)
+        return [
+            ListEntry(None, styled_entry(rng, generate_reference(rng)))
+            for _ in range(self.count // 4)
+        ]
+
+
+# a case prepares its input and returns the measured function
+# with the number of items it processes
+Setup = Callable[[Corpus], Tuple[Callable[[], Any], int]]
+
+
+def _journal_index_build(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    version = corpus.journal_matcher.version
+
+    def build() -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            load_index(Path(directory) / "journals.idx", version)
+
+    return build, 1
+
+
+def _journal_matcher_load(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    path = corpus.journal_matcher.index.path
+    return lambda: JournalMatcher(path), 1
+
+
+def _journal_lookup(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    journal_matcher = corpus.journal_matcher
+    articles = corpus.articles
+
+    def lookup() -> None:
+        for article in articles:
+            journal_matcher.extract_journal(article)
+
+    return lookup, len(articles)
+
+
+def _parse(journals: bool) -> Setup:
+    def setup(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+        journal_matcher = corpus.journal_matcher if journals else None
+        lines = corpus.lines
+
+        def parse() -> None:
+            for line in lines:
+                Reference.parse(line, journal_matcher)
+
+        return parse, len(lines)
+
+    return setup
+
+
+def _format_reference(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    options = default_options()
+    references = corpus.references
+
+    def format() -> None:
+        for reference in references:
+            reference.format_reference(options, None, lambda title, fuzzy: None)
+
+    return format, len(references)
+
+
+def _serialize(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    references = corpus.references
+
+    def serialize() -> None:
+        for reference in references:
+            reference.serialize("{}")
+
+    return serialize, len(references)
+
+
+def _deserialize(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    journal_matcher = corpus.journal_matcher
+    views = corpus.views
+
+    def deserialize() -> None:
+        for view in views:
+            Reference.deserialize(view, "{}", journal_matcher)
+
+    return deserialize, len(views)
+
+
+def _from_record(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    journal_matcher = corpus.journal_matcher
+    records = corpus.records
+
+    def from_record() -> None:
+        for record in records:
+            Reference.from_record(record, journal_matcher)
+
+    return from_record, len(records)
+
+
+def _html_list(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    document = corpus.html
+    return lambda: sum(1 for _ in HTMLList(document)), corpus.count
+
+
+def _html_list_reader(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    document = corpus.html
+
+    def read() -> None:
+        for _ in HTMLListReader().read(io.StringIO(document)):
+            pass
+
+    return read, corpus.count
+
+
+def _extract_tags(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    entries = corpus.styled_entries
+
+    def extract() -> None:
+        for entry in entries:
+            text, tags = extract_tags(entry.content)
+            for offset in range(0, len(text), 8):
+                tags.surround_tags("", offset)
+                tags.insert_tags(text[offset : offset + 40], offset)
+
+    return extract, len(entries)
+
+
+def _format_entry(corpus: Corpus) -> Tuple[Callable[[], Any], int]:
+    journal_matcher = corpus.journal_matcher
+    entries = corpus.styled_entries
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    options[Options.SurnameStyle] = Style.Preserve
+    options[Options.JournalStyle] = Style.Preserve
+
+    def format() -> None:
+        for entry in entries:
+            format_entry(entry, options, journal_matcher, lambda title, fuzzy: None)
+
+    return format, len(entries)
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Setup
+
+
+CASES = [
+    Case("journal_index_build", _journal_index_build),
+    Case("journal_matcher_load", _journal_matcher_load),
+    Case("journal_lookup", _journal_lookup),
+    Case("parse", _parse(journals=True)),
+    Case("parse_without_journals", _parse(journals=False)),
+    Case("format_reference", _format_reference),
+    Case("serialize", _serialize),
+    Case("deserialize", _deserialize),
+    Case("from_record", _from_record),
+    Case("html_list", _html_list),
+    Case("html_list_reader", _html_list_reader),
+    Case("extract_tags", _extract_tags),
+    Case("format_entry", _format_entry),
+]
+
+
+def _calibration() -> None:
+    # interpreter work with strings and dicts, like that of the cases,
+    # that measures the speed of the machine
+    words = {}
+    for i in range(5000):
+        word = f"word{i * 7919 % 5000}"
+        words[word.upper()] = word.split("d")
+    " ".join(sorted(words))
+
+
+class _Timer:
+    """
+    Runs a case repeatedly, looping it, so that one repeat takes
+    at least `MIN_REPEAT_TIME`, and keeps the best time
+    """
+
+    def __init__(self, function: Callable[[], Any], count: int):
+        self.function = function
+        self.count = count
+        self.loops = 1
+        self.best = self._time()
+        while self.best < MIN_REPEAT_TIME:
+            self.loops *= 2
+            self.best = self._time()
+
+    def _time(self) -> float:
+        start = time.process_time()
+        for _ in range(self.loops):
+            self.function()
+        return time.process_time() - start
+
+    def repeat(self) -> None:
+        self.best = min(self.best, self._time())
+
+    def per_item(self) -> float:
+        return self.best / self.loops / self.count
+
+
+def environment(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Describes what the results depend on besides the code
+    """
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "count": args.count,
+        "seed": args.seed,
+    }
+
+
+def run(args: argparse.Namespace) -> Tuple[Dict[str, float], float]:
+    """
+    Returns the best CPU time per item of each case in seconds
+    and the time of the calibration loop.
+
+    The repeats of the cases are interleaved with each other
+    and with the calibration, so that the changes of speed of the machine
+    affect all of them alike.
+    """
+    corpus = Corpus(args.count, args.seed)
+    calibration = _Timer(_calibration, 1)
+    timers: Dict[str, _Timer] = {}
+    with quiet_parser():
+        for case in CASES:
+            if not args.cases or case.name in args.cases:
+                timers[case.name] = _Timer(*case.setup(corpus))
+        for _ in range(args.repeat - 1):
+            for timer in timers.values():
+                calibration.repeat()
+                timer.repeat()
+    results = {name: timer.per_item() for name, timer in timers.items()}
+    for name, result in results.items():
+        print(f"{name:<24} {result * 1e6:>10.2f} µs")
+    return results, calibration.per_item()
+
+
+def compare(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    threshold: float,
+    speed: float = 1.0,
+) -> List[str]:
+    """
+    Prints the change of each case and returns the regressed cases.
+
+    The times of the baseline are multiplied by `speed`,
+    the relative time of the calibration loop.
+    """
+    regressions: List[str] = []
+    print()
+    if speed != 1.0:
+        print(f"The calibration takes {speed:.2f} times its time in the baseline")
+    print(f"{'case':<24} {'baseline':>13} {'current':>13} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<24} {'-':>13} {result * 1e6:>10.2f} µs")
+            continue
+        change = result / (baseline[name] * speed) - 1
+        status = ""
+        if change > threshold:
+            regressions.append(name)
+            status = "  REGRESSION"
+        print(
+            f"{name:<24} {baseline[name] * 1e6:>10.2f} µs {result * 1e6:>10.2f} µs"
+            f" {change * 100:>+7.1f}%{status}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cases", nargs="*", help="names of the cases to run")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="save as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    unknown = set(args.cases) - {case.name for case in CASES}
+    if unknown:
+        parser.error("unknown cases: " + ", ".join(sorted(unknown)))
+
+    results, calibration = run(args)
+    if args.save:
+        cases: Dict[str, float] = {}
+        if args.baseline.exists():
+            # the other cases are kept, when only some of them are run,
+            # rescaled to the current calibration
+            baseline = json.loads(args.baseline.read_text())
+            if baseline["environment"] == environment(args):
+                speed = calibration / baseline["calibration"]
+                cases = {
+                    name: seconds * speed for name, seconds in baseline["cases"].items()
+                }
+        cases.update(results)
+        saved = {
+            "environment": environment(args),
+            "calibration": calibration,
+            "cases": cases,
+        }
+        args.baseline.write_text(json.dumps(saved, indent=2) + "\n")
+        print(f"\nSaved the baseline into {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save to create it")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["environment"] != environment(args):
+        print(
+            "\nThe baseline was measured in another environment:",
+            json.dumps(baseline["environment"]),
+        )
+    regressions = compare(
+        results,
+        baseline["cases"],
+        args.threshold,
+        calibration / baseline["calibration"],
+    )
+    if regressions:
+        print(
+            f"\n{len(regressions)} cases are slower than the baseline"
+            f" by more than {args.threshold:.0%}: " + ", ".join(regressions)
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
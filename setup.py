@@ -51,6 +51,7 @@ setup(
     ],
     extras_require={
         "dev": ["pyinstaller"],
+        "export": ["pyarrow"],
     },
     # Include all data from MANIFEST.in
     include_package_data=True,
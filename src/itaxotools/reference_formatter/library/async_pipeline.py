@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import json
+import urllib.parse
+from collections import deque
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .citation import (
+    FormattedReference,
+    ParseStatus,
+    Reference,
+    input_parts,
+    txt_to_references,
+)
+from .crossref import (
+    ETIQUETTE_EMAIL,
+    PROJECT_NAME,
+    PROJECT_URL,
+    PROJECT_VERSION,
+    match_title,
+)
+from .handle_html import ExtractedTags, HTMLListReader, ListEntry, extract_tags
+from .journal_list import JournalMatcher
+from .options import Options, OptionsDict
+from .sorting import collation_key, sorted_in_place
+
+CROSSREF_URL = "https://api.crossref.org/works"
+
+# number of requests to Crossref running at once
+DEFAULT_CONCURRENCY = 8
+
+# timeout of a request to Crossref, in seconds
+DEFAULT_TIMEOUT = 30.0
+
+# number of references parsed or formatted in the executor at once
+BATCH_SIZE = 64
+
+# number of parsed references, that wait for their DOIs, for each running request
+WINDOW_PER_REQUEST = 16
+
+
+class CrossrefError(Exception):
+    pass
+
+
+def user_agent() -> str:
+    if ETIQUETTE_EMAIL:
+        return (
+            f"{PROJECT_NAME}/{PROJECT_VERSION} "
+            f"({PROJECT_URL}; mailto:{ETIQUETTE_EMAIL})"
+        )
+    else:
+        return f"{PROJECT_NAME}/{PROJECT_VERSION} ({PROJECT_URL})"
+
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class CrossrefClient:
+    """
+    Asynchronous client of the Crossref REST API on asyncio streams.
+
+    At most `concurrency` requests are sent at once,
+    and the connections are kept open for the next requests.
+    """
+
+    def __init__(
+        self,
+        url: str = CROSSREF_URL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        parts = urllib.parse.urlsplit(url)
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or (443 if self._https else 80)
+        self._path = parts.path or "/"
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._idle: List[_Connection] = []
+
+    async def __aenter__(self) -> "CrossrefClient":
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def doi_from_title(self, title: str, fuzzy: bool) -> Optional[str]:
+        """
+        Same as `crossref.doi_from_title`
+        """
+        query = urllib.parse.urlencode(
+            {
+                "query": title,
+                "select": "DOI,title",
+                "sort": "relevance",
+                "order": "desc",
+                "rows": 1,
+            }
+        )
+        async with self._semaphore:
+            status, body = await asyncio.wait_for(
+                self._get(f"{self._path}?{query}"), self.timeout
+            )
+        if status == 404:
+            return None
+        if status != 200:
+            raise CrossrefError(f"Crossref responded with status {status}")
+        try:
+            item = json.loads(body)["message"]["items"][0]
+            if match_title(item["title"][0], title, fuzzy):
+                return "doi:" + item["DOI"]
+        except (IndexError, KeyError):
+            pass
+        return None
+
+    async def _get(self, target: str) -> Tuple[int, bytes]:
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {self._host}\r\n"
+            f"User-Agent: {user_agent()}\r\n"
+            "Accept: application/json\r\n"
+            "\r\n"
+        ).encode()
+        while self._idle:
+            try:
+                return await self._exchange(self._idle.pop(), request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # the server has closed the idle connection
+                pass
+        connection = await asyncio.open_connection(
+            self._host, self._port, ssl=True if self._https else None
+        )
+        return await self._exchange(connection, request)
+
+    async def _exchange(
+        self, connection: _Connection, request: bytes
+    ) -> Tuple[int, bytes]:
+        reader, writer = connection
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("Connection is closed")
+            status = int(status_line.split()[1])
+            headers: Dict[str, str] = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip().lower()
+            keep_alive = headers.get("connection") != "close"
+            if headers.get("transfer-encoding") == "chunked":
+                body = await _read_chunked(reader)
+            elif "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+                keep_alive = False
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return status, body
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    chunks: List[bytes] = []
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            # skip the trailers
+            while (await reader.readline()).strip():
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readline()
+
+
+class _Parsed(NamedTuple):
+    source: str
+    reference: Optional[Reference]
+    tags: Optional[ExtractedTags]
+    # the list entry, when the input is html
+    entry: Optional[ListEntry]
+
+
+def _parsed_references(
+    input: Union[str, Iterable[str]],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+) -> Iterator[_Parsed]:
+    references = _parsed_input(input, options, journal_matcher)
+    if options[Options.SortReferences]:
+        # the unparsed references stay in place
+        yield from sorted_in_place(
+            list(references),
+            lambda parsed: collation_key(parsed.reference)
+            if parsed.reference
+            else None,
+        )
+    else:
+        yield from references
+
+
+def _parsed_input(
+    input: Union[str, Iterable[str]],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+) -> Iterator[_Parsed]:
+    if options[Options.HtmlFormat]:
+        reader = HTMLListReader()
+        for entry in reader.read_chunks(input_parts(input, True)):
+            ref_text, tags = extract_tags(entry.content)
+            ref = Reference.parse(ref_text, journal_matcher)
+            yield _Parsed(ref.unparsed if ref else ref_text, ref, tags, entry)
+    else:
+        for ref in txt_to_references(
+            input_parts(input, False), options, journal_matcher
+        ):
+            if isinstance(ref, Reference):
+                yield _Parsed(ref.unparsed, ref, None, None)
+            else:
+                yield _Parsed(ref, None, None, None)
+
+
+def _format(
+    parsed: _Parsed, options: OptionsDict, doi: Optional[str]
+) -> FormattedReference:
+    if parsed.reference is None:
+        if parsed.entry:
+            formatted = "*" + parsed.entry.content
+        else:
+            formatted = "* " + parsed.source
+        return FormattedReference(parsed.source, formatted, ParseStatus.Unparsed, {})
+    return FormattedReference(
+        parsed.source,
+        parsed.reference.format_reference(options, parsed.tags, lambda *_: doi),
+        ParseStatus.Parsed,
+        parsed.reference.field_spans(),
+    )
+
+
+# title and whether it's matched fuzzily, as looked up by `CrossrefClient`
+_Query = Tuple[str, bool]
+
+
+def _format_batch(
+    batch: List[Tuple[_Parsed, Optional[str]]], options: OptionsDict
+) -> List[FormattedReference]:
+    return [_format(parsed, options, doi) for parsed, doi in batch]
+
+
+async def format_references_async(
+    input: Union[str, Iterable[str]],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    client: Optional[CrossrefClient] = None,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[FormattedReference]:
+    """
+    Asynchronous version of `format_references`.
+
+    Formatting runs in `executor`, the default executor of the loop
+    by default, which can also be a process pool.
+    Parsing advances a generator over the input, that can't be sent
+    to another process, so it always runs in the default executor.
+    The DOIs are retrieved concurrently by `client`.
+    The results are yielded in the order of the input,
+    each as soon as the DOI of its reference is resolved.
+    """
+    loop = asyncio.get_running_loop()
+    own_client = client is None and bool(options[Options.CrossrefAPI])
+    if own_client:
+        client = CrossrefClient()
+    window = WINDOW_PER_REQUEST * (client.concurrency if client else 1)
+    references = _parsed_references(input, options, journal_matcher)
+    # the same title is looked up once, while its references are pending,
+    # so that the lookups don't accumulate over the whole input
+    lookups: Dict[_Query, "asyncio.Task[Optional[str]]"] = {}
+    waiting: Dict[_Query, int] = {}
+    pending: Deque[Tuple[_Parsed, Optional[_Query]]] = deque()
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            ready: List[Tuple[_Parsed, Optional[str]]] = []
+            while pending and len(ready) < BATCH_SIZE:
+                parsed, query = pending[0]
+                if query and not lookups[query].done():
+                    break
+                pending.popleft()
+                doi = None
+                if query:
+                    doi = lookups[query].result()
+                    waiting[query] -= 1
+                    if not waiting[query]:
+                        del waiting[query]
+                        del lookups[query]
+                ready.append((parsed, doi))
+            if ready:
+                for result in await loop.run_in_executor(
+                    executor, _format_batch, ready, options
+                ):
+                    yield result
+            elif not exhausted and len(pending) < window:
+                batch = await loop.run_in_executor(None, _take, references, BATCH_SIZE)
+                exhausted = len(batch) < BATCH_SIZE
+                for parsed in batch:
+                    query = (
+                        parsed.reference.doi_query(options)
+                        if parsed.reference
+                        else None
+                    )
+                    if query:
+                        assert client is not None
+                        if query not in lookups:
+                            lookups[query] = asyncio.create_task(
+                                client.doi_from_title(*query)
+                            )
+                        waiting[query] = waiting.get(query, 0) + 1
+                    pending.append((parsed, query))
+            else:
+                # the first reference waits for its DOI
+                _, query = pending[0]
+                assert query is not None
+                await asyncio.wait([lookups[query]])
+    finally:
+        for lookup in lookups.values():
+            lookup.cancel()
+        if own_client and client:
+            await client.close()
+
+
+def _take(iterator: Iterator[_Parsed], count: int) -> List[_Parsed]:
+    return list(itertools.islice(iterator, count))
@@ -47,6 +47,8 @@ class Author:
         elif options[Options.InitialsPeriod] == InitialsPeriod.WithPeriod:
             if "." not in self.initials:
                 initials = "".join([initial + ". " for initial in self.initials])
+            else:
+                initials = self.initials
         else:
             assert False
         if options[Options.HtmlFormat]:
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .crossref import DoiLookup
+
+# change when the parser or the stored records change in an incompatible way
+CACHE_VERSION = "2"
+
+DEFAULT_MAX_ENTRIES = 200_000
+
+# number of new entries and accesses, that are written in one transaction,
+# so that the write lock of the database is held only briefly
+WRITE_BATCH_SIZE = 256
+
+# how long a process waits for another one to release the database, in seconds
+BUSY_TIMEOUT = 60.0
+
+
+def digest(*parts: str) -> str:
+    """
+    Returns a digest of a sequence of strings, to be used as a cache key
+    """
+    hash = hashlib.blake2b(CACHE_VERSION.encode(), digest_size=16)
+    for part in parts:
+        hash.update(b"\0")
+        hash.update(part.encode())
+    return hash.hexdigest()
+
+
+def default_cache_path() -> Path:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    if cache_dir:
+        return Path(cache_dir) / "reference_formatter" / "results.sqlite"
+    return Path.home() / ".cache" / "reference_formatter" / "results.sqlite"
+
+
+class ResultCache:
+    """
+    Persistent cache of per-line results with LRU eviction.
+
+    Entries are JSON values grouped by kind: parsed lines, formatted references
+    and DOIs retrieved from Crossref.
+    The keys are digests of everything the value depends on.
+
+    Several processes can share the cache: the database is in WAL mode,
+    so that the readers don't block the writer, and the new entries
+    are written in short transactions of at most `WRITE_BATCH_SIZE` entries.
+    """
+
+    def __init__(
+        self, path: Union[str, Path], max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._connection = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "kind TEXT, key TEXT, value TEXT, used INTEGER, PRIMARY KEY (kind, key))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)"
+        )
+        (last_used,) = self._connection.execute(
+            "SELECT MAX(used) FROM entries"
+        ).fetchone()
+        self._clock = last_used or 0
+        self._touched: Dict[Tuple[str, str], int] = {}
+        # new entries, that are not written yet
+        self._pending: Dict[Tuple[str, str], str] = {}
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        """
+        Returns the stored JSON value or None, if there is no entry
+        """
+        value = self._pending.get((kind, key))
+        if value is None:
+            row = self._connection.execute(
+                "SELECT value FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                self.misses[kind] += 1
+                return None
+            value = row[0]
+        self.hits[kind] += 1
+        self._touched[(kind, key)] = self._tick()
+        self._write_full_batch()
+        return value
+
+    def put(self, kind: str, key: str, value: str) -> None:
+        self._pending[(kind, key)] = value
+        self._touched[(kind, key)] = self._tick()
+        self._write_full_batch()
+
+    def _write_full_batch(self) -> None:
+        if len(self._touched) >= WRITE_BATCH_SIZE:
+            self._write()
+
+    def _write(self) -> None:
+        """
+        Writes the new entries and the access order in one transaction
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (
+                    (kind, key, value, self._touched[(kind, key)])
+                    for (kind, key), value in self._pending.items()
+                ),
+            )
+            self._connection.executemany(
+                "UPDATE entries SET used = ? WHERE kind = ? AND key = ?",
+                (
+                    (used, kind, key)
+                    for (kind, key), used in self._touched.items()
+                    if (kind, key) not in self._pending
+                ),
+            )
+        self._pending.clear()
+        self._touched.clear()
+
+    def memoize(self, kind: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the stored value, or computes and stores it
+        """
+        value = self.get(kind, key)
+        if value is not None:
+            return json.loads(value)
+        result = compute()
+        self.put(kind, key, json.dumps(result, ensure_ascii=False))
+        return result
+
+    def doi_lookup(self, lookup: DoiLookup) -> DoiLookup:
+        """
+        Wraps `lookup`, so that retrieved DOIs are cached by title
+        """
+
+        def cached_lookup(title: str, fuzzy: bool) -> Optional[str]:
+            return self.memoize(
+                "doi", digest(title, str(fuzzy)), lambda: lookup(title, fuzzy)
+            )
+
+        return cached_lookup
+
+    def flush(self) -> None:
+        """
+        Stores the new entries and the access order
+        and evicts the least recently used entries
+        """
+        self._write()
+        with self._connection:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM entries WHERE rowid IN "
+                    "(SELECT rowid FROM entries ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    def report(self) -> str:
+        """
+        Returns hit and miss counts for each kind of entries
+        """
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return "\n".join(
+            f"{kind}: {self.hits[kind]} cached, {self.misses[kind]} new"
+            for kind in kinds
+        )
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from .cache import digest
+from .crossref import DoiLookup
+
+# the journal is next to the output file, with this suffix
+JOURNAL_SUFFIX = ".progress"
+
+# number of references formatted between the commits
+CHECKPOINT_INTERVAL = 100
+
+_READ_BLOCK = 1 << 20
+
+
+class ResumeMismatch(Exception):
+    pass
+
+
+def run_fingerprint(input_path: str, profile: str, sort: bool) -> str:
+    """
+    Returns a digest of the input file, the `format_profile` of the output
+    and whether the references are sorted
+    """
+    hash = hashlib.blake2b(digest_size=16)
+    with open(input_path, mode="rb") as infile:
+        while True:
+            block = infile.read(_READ_BLOCK)
+            if not block:
+                break
+            hash.update(block)
+    return digest(hash.hexdigest(), profile, str(sort))
+
+
+class ProgressJournal:
+    """
+    Progress of formatting a reference list into an output file,
+    so that an interrupted run can be resumed.
+
+    The journal is a JSON lines file: the first line identifies the run,
+    each following line commits the number of finished references,
+    the size of the output and the DOIs retrieved since the previous commit.
+    An incomplete last line, written when the run was killed, is ignored.
+    """
+
+    def __init__(self, path: str, fingerprint: str, resume: bool = False):
+        self.path = path
+        self.references = 0
+        self.output_size = 0
+        self.dois: Dict[Tuple[str, bool], Optional[str]] = {}
+        self._new_dois: List[List[Any]] = []
+        if resume and os.path.exists(path):
+            self._load(fingerprint)
+        # the loaded journal is compacted into a single commit
+        with open(path + ".tmp", mode="w") as temp:
+            print(json.dumps({"run": fingerprint}), file=temp)
+            if self.references or self.dois:
+                dois = [[*key, doi] for key, doi in self.dois.items()]
+                print(self._commit_line(dois), file=temp)
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(path + ".tmp", path)
+        self._file = open(path, mode="a")
+
+    def __enter__(self) -> "ProgressJournal":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._file.close()
+
+    def _load(self, fingerprint: str) -> None:
+        with open(self.path) as file:
+            lines = file.read().split("\n")
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+        if not records or records[0].get("run") != fingerprint:
+            raise ResumeMismatch(
+                "The input or the options differ from the interrupted run"
+            )
+        for record in records[1:]:
+            self.references = record["references"]
+            self.output_size = record["output_size"]
+            for title, fuzzy, doi in record["dois"]:
+                self.dois[(title, fuzzy)] = doi
+
+    def _commit_line(self, dois: List[List[Any]]) -> str:
+        return json.dumps(
+            {
+                "references": self.references,
+                "output_size": self.output_size,
+                "dois": dois,
+            },
+            ensure_ascii=False,
+        )
+
+    def doi_lookup(self, lookup: DoiLookup) -> DoiLookup:
+        """
+        Wraps `lookup`, so that the DOIs are committed with the progress
+        and the committed DOIs are not retrieved again
+        """
+
+        def journaled_lookup(title: str, fuzzy: bool) -> Optional[str]:
+            key = (title, fuzzy)
+            if key not in self.dois:
+                self.dois[key] = lookup(title, fuzzy)
+                self._new_dois.append([title, fuzzy, self.dois[key]])
+            return self.dois[key]
+
+        return journaled_lookup
+
+    def commit(self, references: int, output: BinaryIO) -> None:
+        """
+        Makes the output durable and records, that `references` are finished
+        """
+        output.flush()
+        os.fsync(output.fileno())
+        self.references = references
+        self.output_size = output.tell()
+        print(self._commit_line(self._new_dois), file=self._file)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._new_dois = []
+
+
+def open_resumed(path: str, size: int) -> BinaryIO:
+    """
+    Opens the output file of a run to continue it after `size` bytes,
+    or creates it, if `size` is 0
+    """
+    if not size:
+        return open(path, mode="wb")
+    try:
+        output = open(path, mode="r+b")
+    except FileNotFoundError:
+        raise ResumeMismatch("The output of the interrupted run is missing")
+    if output.seek(0, os.SEEK_END) < size:
+        output.close()
+        raise ResumeMismatch("The output of the interrupted run is truncated")
+    # the output written after the last commit is replaced
+    output.truncate(size)
+    output.seek(size)
+    return output
@@ -13,16 +13,34 @@ from typing import (
     Union,
     Set,
     NamedTuple,
+    Iterable,
+    Callable,
 )
+import hashlib
+import itertools
+import json
+import logging
 import os
 
 import regex  # type: ignore
 
 from .utils import normalize_space, replace_slice
 from .journal_list import JournalMatcher, NameForm
-from .handle_html import ExtractedTags, HTMLList, extract_tags, ListEntry
+from .handle_html import ExtractedTags, HTMLListReader, extract_tags, ListEntry
 from .positioned import PositionedString
-from .crossref import doi_from_title
+from .crossref import doi_from_title, DoiLookup
+from .cache import ResultCache, digest
+from .checkpoint import (
+    CHECKPOINT_INTERVAL,
+    JOURNAL_SUFFIX,
+    ProgressJournal,
+    open_resumed,
+    run_fingerprint,
+)
+from .progress import Progress
+from .readers import open_input
+from .stats import StageClock, stage_clock, timed, timed_lookup
+from .sorting import collation_key, sorted_in_place
 from .options import (
     OptionsDict,
     Options,
@@ -30,6 +48,7 @@ from .options import (
     LastSeparator,
     JournalSeparator,
     InitialsPeriod,
+    options_digest,
 )
 from .author import Author
 from .journal import Journal
@@ -43,6 +62,9 @@ class YearPosition(Enum):
 
 REFERENCE_FIELD_COUNT = 10
 
+# diagnostics of the parser, one for each reference it can't parse
+parser_logger = logging.getLogger(__name__)
+
 
 class Reference(NamedTuple):
     numbering: Optional[slice]
@@ -57,10 +79,15 @@ class Reference(NamedTuple):
     doi: Optional[slice]
     unparsed: str
 
-    def append_doi(self, doi: str) -> None:
-        start = len(self.unparsed)
+    def append_doi(self, doi: str) -> Reference:
+        """
+        Returns the reference with `doi` appended to the text, separated by a space
+        """
+        start = len(self.unparsed) + 1
         end = start + len(doi)
-        self._replace(unparsed=(self.unparsed + doi), doi=slice(start, end))
+        return self._replace(
+            unparsed=(self.unparsed + " " + doi), doi=slice(start, end)
+        )
 
     def format_authors(
         self, options: OptionsDict, tags: ExtractedTags, input: str
@@ -69,9 +96,11 @@ class Reference(NamedTuple):
         if not authors:
             return input
         if options[Options.InitialsPeriod] == InitialsPeriod.NoChange:
+            # the choice is made for each reference separately
+            options = dict(options)
             options[Options.InitialsPeriod] = InitialsPeriod.WithoutPeriod
             for author in authors:
-                if "." in author.initials:
+                if not author.is_et_al and "." in author.initials:
                     options[Options.InitialsPeriod] = InitialsPeriod.WithPeriod
         formatted_authors = (
             author.format_author(options, i == 0, tags)
@@ -105,22 +134,29 @@ class Reference(NamedTuple):
         else:
             return input
 
-    def format_doi(self, options: OptionsDict, input: str) -> str:
+    def doi_query(self, options: OptionsDict) -> Optional[Tuple[str, bool]]:
+        """
+        Returns the arguments of the DOI lookup, that formatting with `options`
+        performs, if there is one
+        """
+        if options[Options.RemoveDoi] or not options[Options.CrossrefAPI] or self.doi:
+            return None
+        return self.unparsed[self.article], options[Options.CrossrefAPI].is_fuzzy()
+
+    def format_doi(
+        self, options: OptionsDict, input: str, doi_lookup: DoiLookup = doi_from_title
+    ) -> str:
         if options[Options.RemoveDoi]:
             if self.doi:
                 return replace_slice(input, self.doi, "")
             else:
                 return input
-        elif options[Options.CrossrefAPI] and not self.doi:
-            retrieved_doi = doi_from_title(
-                self.unparsed[self.article], options[Options.CrossrefAPI].is_fuzzy()
-            )
+        query = self.doi_query(options)
+        if query:
+            retrieved_doi = doi_lookup(*query)
             if retrieved_doi:
                 return input + " " + retrieved_doi
-            else:
-                return input
-        else:
-            return input
+        return input
 
     def format_terminal_year(self, options: OptionsDict, input: str) -> str:
         if self.year[2] == YearPosition.Terminal:
@@ -241,6 +277,24 @@ class Reference(NamedTuple):
             slices.append(self.doi)
         return slices
 
+    def field_spans(self) -> Dict[str, slice]:
+        """
+        Returns the spans of the fields, that are present in the reference
+        """
+        spans = {
+            "numbering": self.numbering,
+            "authors": self.authors[1],
+            "year": self.year[1],
+            "article": self.article,
+            "journal_separator": self.journal_separator,
+            "journal": self.journal[1] if self.journal else None,
+            "volume_separator": self.volume_separator,
+            "volume": self.volume[2] if self.volume else None,
+            "page_range": self.page_range[2] if self.page_range else None,
+            "doi": self.doi,
+        }
+        return {name: span for name, span in spans.items() if span is not None}
+
     def assert_parts_order(self, slices: List[slice]):
         """
         asserts that all parts of the reference are in the expected order
@@ -376,7 +430,7 @@ class Reference(NamedTuple):
     def _year_from_slice(
         a_slice: slice, input: str, journal_matcher: Optional[JournalMatcher]
     ) -> Tuple[str, slice, YearPosition]:
-        year_string = regex.search(r"\d+[a-z]?", input[a_slice]).group(0)
+        year_string = DEFAULT_PARSER.year_string_regex.search(input[a_slice]).group(0)
         return year_string, a_slice, YearPosition.Medial
 
     @staticmethod
@@ -397,11 +451,11 @@ class Reference(NamedTuple):
     ) -> Tuple[Journal, slice]:
         if journal_matcher is None:
             return None, a_slice
-        journal_name_tuple = journal_matcher.extract_journal(input[a_slice])
-        if journal_name_tuple is None:
+        found_journal = journal_matcher.find_journal(input[a_slice])
+        if found_journal is None:
             return None, a_slice
-        journal_name, _ = journal_name_tuple
-        return Journal(journal_name), a_slice
+        row, _ = found_journal
+        return Journal(journal_matcher.journal_names(row), row), a_slice
 
     @staticmethod
     def _volume_separator_from_slice(
@@ -413,22 +467,14 @@ class Reference(NamedTuple):
     def _volume_from_slice(
         a_slice: slice, input: str, journal_matcher: Optional[JournalMatcher]
     ) -> Tuple[str, Optional[str], slice]:
-        volume_regex = regex.compile(
-            r"(?<vol>\d+)[,:]|"
-            r"(?<vol>\d+)\s*\((?<issue>\d[^)])\)|"
-            r"vol\S+\s*(?<vol>d+)\s*iss\S+\s*(?<issue>\d+)"
-        )
-        volume_match = regex.fullmatch(volume_regex, input[a_slice])
+        volume_match = DEFAULT_PARSER.volume_regex.fullmatch(input[a_slice])
         return volume_match.group("vol"), volume_match.group("issue"), a_slice
 
     @staticmethod
     def _page_range_from_slice(
         a_slice: slice, input: str, journal_matcher: Optional[JournalMatcher]
     ) -> Tuple[str, str, slice]:
-        page_range_regex = regex.compile(
-            r"(?:pp\.)?\s*([A-Za-z]*\d+)\s?[-‐‑‒–—―]\s?([A-Za-z]*\d+)\S?$"
-        )
-        page_range_match = regex.fullmatch(page_range_regex, input[a_slice])
+        page_range_match = DEFAULT_PARSER.page_range_regex.fullmatch(input[a_slice])
         return (
             page_range_match.group(1).strip(),
             page_range_match.group(2).strip(),
@@ -441,54 +487,326 @@ class Reference(NamedTuple):
     ) -> slice:
         return a_slice
 
-    def format_reference(self, options: OptionsDict, tags: Optional[ExtractedTags]):
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Returns the fully resolved fields as a JSON-compatible dictionary
+        """
+        authors, authors_span = self.authors
+        year, year_span, year_position = self.year
+        if authors is None:
+            authors_record: Optional[List[Any]] = None
+        else:
+            authors_record = [
+                None
+                if author.is_et_al
+                else [*_span_record(author.span), author.initials]
+                for author in authors
+            ]
+        if self.journal:
+            journal, journal_span = self.journal
+            journal_record: Optional[List[Any]] = [
+                journal.row if journal else None,
+                *_span_record(journal_span),
+            ]
+        else:
+            journal_record = None
+        return {
+            "unparsed": self.unparsed,
+            "numbering": _span_record(self.numbering),
+            "authors": authors_record,
+            "authors_span": _span_record(authors_span),
+            "year": [year, *_span_record(year_span), year_position.name],
+            "article": _span_record(self.article),
+            "journal_separator": _span_record(self.journal_separator),
+            "journal": journal_record,
+            "volume_separator": _span_record(self.volume_separator),
+            "volume": [*self.volume[:2], *_span_record(self.volume[2])]
+            if self.volume
+            else None,
+            "page_range": [*self.page_range[:2], *_span_record(self.page_range[2])]
+            if self.page_range
+            else None,
+            "doi": _span_record(self.doi),
+        }
+
+    @staticmethod
+    def from_record(
+        record: Dict[str, Any], journal_matcher: Optional[JournalMatcher]
+    ) -> Reference:
+        """
+        Inverse of `to_record`.
+
+        Journal names are looked up by the row of the journal table,
+        the text is not parsed again.
+        """
+        unparsed = record["unparsed"]
+        authors: Optional[List[Author]]
+        if record["authors"] is None:
+            authors = None
+        else:
+            authors = [
+                _author_from_record(author_record, unparsed)
+                for author_record in record["authors"]
+            ]
+        year, year_start, year_stop, year_position = record["year"]
+        if record["journal"]:
+            row, start, stop = record["journal"]
+            if row is not None and journal_matcher:
+                journal: Optional[Journal] = Journal(
+                    journal_matcher.journal_names(row), row
+                )
+            else:
+                journal = None
+            journal_field: Optional[Tuple[Journal, slice]] = (
+                journal,  # type: ignore
+                slice(start, stop),
+            )
+        else:
+            journal_field = None
+        volume = record["volume"]
+        page_range = record["page_range"]
+        return Reference(
+            _span_from_record(record["numbering"]),
+            (authors, slice(*record["authors_span"])),
+            (year, slice(year_start, year_stop), YearPosition[year_position]),
+            slice(*record["article"]),
+            _span_from_record(record["journal_separator"]),
+            journal_field,
+            _span_from_record(record["volume_separator"]),
+            (volume[0], volume[1], slice(volume[2], volume[3])) if volume else None,
+            (page_range[0], page_range[1], slice(page_range[2], page_range[3]))
+            if page_range
+            else None,
+            _span_from_record(record["doi"]),
+            unparsed,
+        )
+
+    def format_reference(
+        self,
+        options: OptionsDict,
+        tags: Optional[ExtractedTags],
+        doi_lookup: DoiLookup = doi_from_title,
+    ) -> str:
+        clock = stage_clock()
+        if clock is None:
+            return self._format_reference(options, tags, doi_lookup, None)
+        with clock.stage("format_reference"):
+            return self._format_reference(options, tags, doi_lookup, clock)
+
+    def _format_reference(
+        self,
+        options: OptionsDict,
+        tags: Optional[ExtractedTags],
+        doi_lookup: DoiLookup,
+        clock: Optional[StageClock],
+    ) -> str:
         self.assert_parts_order(self.collect_slices())
         formatted_reference = self.unparsed
-        formatted_reference = self.format_doi(options, formatted_reference)
+        if clock:
+            clock.enter("format_doi")
+        formatted_reference = self.format_doi(options, formatted_reference, doi_lookup)
         if options[Options.ProcessAuthorsAndYear]:
+            if clock:
+                clock.enter("format_terminal_year")
             formatted_reference = self.format_terminal_year(
                 options, formatted_reference
             )
         if options[Options.ProcessPageRangeVolume]:
+            if clock:
+                clock.enter("format_page_range")
             formatted_reference = self.format_page_range(options, formatted_reference)
+            if clock:
+                clock.enter("format_volume")
             formatted_reference = self.format_volume(options, formatted_reference)
             formatted_reference = self.format_volume_separator(
                 options, formatted_reference
             )
         if options[Options.ProcessJournalName]:
+            if clock:
+                clock.enter("format_journal")
             formatted_reference = self.format_journal(
                 options, tags, formatted_reference
             )
             formatted_reference = self.format_journal_separator(
                 options, formatted_reference
             )
+        if clock:
+            clock.enter("format_article")
         formatted_reference = self.format_article(options, tags, formatted_reference)
         if options[Options.ProcessAuthorsAndYear]:
+            if clock:
+                clock.enter("format_year")
             formatted_reference = self.format_year(options, formatted_reference)
+            if clock:
+                clock.enter("format_authors")
             formatted_reference = self.format_authors(
                 options, tags, formatted_reference
             )
+        if clock:
+            clock.enter("format_numbering")
         formatted_reference = self.format_numbering(options, formatted_reference)
+        if clock:
+            clock.enter("normalize_space")
         return normalize_space(formatted_reference).strip()
 
     @staticmethod
     def parse(
         line: str, journal_matcher: Optional[JournalMatcher]
     ) -> Optional["Reference"]:
+        return DEFAULT_PARSER.parse(line, journal_matcher)
+
+    @staticmethod
+    def split_three_words(
+        s: PositionedString,
+    ) -> Optional[Tuple[PositionedString, PositionedString]]:
+        return DEFAULT_PARSER.split_three_words(s)
+
+    @staticmethod
+    def parse_authors(s: PositionedString) -> List[Author]:
+        return DEFAULT_PARSER.parse_authors(s)
+
+    @staticmethod
+    def extract_author(parts: List[PositionedString]) -> Iterator[Author]:
+        return DEFAULT_PARSER.extract_author(parts)
+
+
+def _span_record(span: Optional[slice]) -> Optional[List[int]]:
+    if span is None:
+        return None
+    return [span.start, span.stop]
+
+
+def _span_from_record(record: Optional[List[int]]) -> Optional[slice]:
+    if record is None:
+        return None
+    return slice(*record)
+
+
+def _author_from_record(record: Optional[List[Any]], unparsed: str) -> Author:
+    if record is None:
+        # et al
+        return Author(slice(0, 0))
+    start, stop, initials = record
+    return Author(slice(start, stop), unparsed[start:stop], initials)
+
+
+class LineTokens(NamedTuple):
+    """
+    Candidates for reference parts found by `ReferenceParser.tokenize`
+    """
+
+    doi: bool
+    digits: bool
+    dash: bool
+
+
+class ReferenceParser:
+    """
+    Parses lines into references.
+
+    All regular expressions are compiled once, on construction,
+    so that a single parser can be reused for any number of lines.
+    """
+
+    def __init__(self) -> None:
+        self.token_regex = regex.compile(
+            r"(?<doi>doi)|(?<digits>\d+)|(?<dash>[-‐‑‒–—―])"
+        )
+        self.numbering_regex = regex.compile(r"\d+\.?\s*")
+        self.digit_regex = regex.compile(r"\d")
+        # matches, when there is no digit after the numbering,
+        # which is consumed as by `numbering_regex`,
+        # or no lower case letter precedes the first one
+        self.no_year_regex = regex.compile(
+            r"(?>(?:\d+\.?\s*)?)(?:[^\d\p{Lower}]*\d|\D*$)"
+        )
+        self.terminal_year_regex = regex.compile(r"\((\d+[a-z]?)\)\S?$")
+        self.year_regex = regex.compile(r"\(?(\d+[a-z]?)\)?\S?")
+        self.year_string_regex = regex.compile(r"\d+[a-z]?")
+        self.lower_regex = regex.compile(r"\p{Lower}")
+        self.page_range_regex = regex.compile(
+            r"(?:pp\.)?\s*([A-Za-z]*\d+)\s?[-‐‑‒–—―]\s?([A-Za-z]*\d+)\S?$"
+        )
+        self.journal_separator_regex = regex.compile(r"\W*$")
+        self.volume_regex = regex.compile(
+            r"(?<vol>\d+)[,:]|"
+            r"(?<vol>\d+)\s*\((?<issue>\d[^)])\)|"
+            r"vol\S+\s*(?<vol>d+)\s*iss\S+\s*(?<issue>\d+)"
+        )
+        self.three_words_regex = regex.compile(
+            r"[^\s.]*[[:lower:]][^\s.]*\s+"
+            r"[^\s.]*[[:lower:]][^\s.]*\s+"
+            r"[^\s.]*[[:lower:]][^\s.]*"
+        )
+        self.et_al_regex = regex.compile("et al")
+        self.surname_regex = regex.compile(r"\p{Alpha}[\p{Lower}\'\u2019].*\p{Lower}")
+        self.last_separators = [str(sep) for sep in reversed(list(LastSeparator))]
+
+    def tokenize(self, line: str) -> LineTokens:
+        """
+        Finds candidates for DOI, numbering, year, volume and page range
+        in a single scan of the line.
+
+        The parser skips the passes, whose candidates are absent.
+        """
+        kinds = {match.lastgroup for match in self.token_regex.finditer(line)}
+        return LineTokens("doi" in kinds, "digits" in kinds, "dash" in kinds)
+
+    def may_be_reference(self, line: str) -> bool:
+        """
+        Cheap check before `parse_line`, that rejects only the lines,
+        that it doesn't parse: those without a digit for the year
+        after the numbering and those without a lower case letter
+        in the authors before it.
+        """
+        if "doi" in line:
+            # the line may be a DOI, which is also removed before the year is found
+            return True
+        if not self.digit_regex.search(line):
+            return False
+        if ")" in line[-3:]:
+            # the year may be terminal, with digits in the authors
+            return True
+        return not self.no_year_regex.match(line)
+
+    def parse(
+        self, line: str, journal_matcher: Optional[JournalMatcher]
+    ) -> Optional[Reference]:
+        clock = stage_clock()
+        if clock is None:
+            return self._parse(line, journal_matcher, None)
+        with clock.stage("tokenize"):
+            return self._parse(line, journal_matcher, clock)
+
+    def _parse(
+        self,
+        line: str,
+        journal_matcher: Optional[JournalMatcher],
+        clock: Optional[StageClock],
+    ) -> Optional[Reference]:
+        tokens = self.tokenize(line)
+        if not tokens.digits:
+            # year is required
+            return None
         s = PositionedString.new(line)
-        s, doi = parse_doi(s)
-        numbering_match = s.match(r"\d+\.?\s*")
+        if tokens.doi:
+            if clock:
+                clock.enter("parse_doi")
+            s, doi = parse_doi(s)
+        else:
+            doi = None
+        if clock:
+            clock.enter("numbering_year")
+        numbering_match = s.match(self.numbering_regex)
         if numbering_match:
             _, numbering_str, s = s.match_partition(numbering_match)
             numbering = numbering_str.get_slice()
             s = s.strip()
         else:
             numbering = None
-        terminal_year_match = s.search(r"\((\d+[a-z]?)\)\S?$")
+        terminal_year_match = s.search(self.terminal_year_regex)
         if terminal_year_match:
-            authors_article = Reference.split_three_words(
-                s[: terminal_year_match.start()]
-            )
+            authors_article = self.split_three_words(s[: terminal_year_match.start()])
             if authors_article:
                 authors, article = authors_article
             else:
@@ -499,7 +817,7 @@ class Reference(NamedTuple):
                 YearPosition.Terminal,
             )
         else:
-            year_match = s.search(r"\(?(\d+[a-z]?)\)?\S?")
+            year_match = s.search(self.year_regex)
             if not year_match:
                 return None
             authors, year_string, article = s.match_partition(year_match)
@@ -509,13 +827,15 @@ class Reference(NamedTuple):
                 YearPosition.Medial,
             )
         authors = authors.strip()
-        if not regex.search(r"\p{Lower}", authors.content):
+        if not authors.search(self.lower_regex):
             return None
         article = article.strip()
-        page_range_regex = regex.compile(
-            r"(?:pp\.)?\s*([A-Za-z]*\d+)\s?[-‐‑‒–—―]\s?([A-Za-z]*\d+)\S?$"
-        )
-        page_range_match = article.search(page_range_regex)
+        if tokens.dash:
+            if clock:
+                clock.enter("page_range")
+            page_range_match = article.search(self.page_range_regex)
+        else:
+            page_range_match = None
         if page_range_match:
             article, page_range_string, _ = article.match_partition(page_range_match)
             page_range: Optional[Tuple[str, str, slice]] = (
@@ -527,26 +847,23 @@ class Reference(NamedTuple):
         else:
             page_range = None
         if journal_matcher:
-            journal_name_tuple = journal_matcher.extract_journal(article.content)
-            if journal_name_tuple:
-                journal_name, journal_span = journal_name_tuple
+            if clock:
+                clock.enter("extract_journal")
+            found_journal = journal_matcher.find_journal(article.content)
+            if found_journal:
+                journal_row, journal_span = found_journal
                 extra = article[journal_span.stop :].strip()
                 article = article[: journal_span.start]
-                journal_separator_match = article.search(r"\W*$")
+                journal_separator_match = article.search(self.journal_separator_regex)
                 article, _, _ = article.match_partition(journal_separator_match)
                 journal_separator = article.match_position(journal_separator_match)
                 journal_span = slice(
                     article.start + journal_span.start,
                     article.start + journal_span.stop,
                 )
-                volume_regex = regex.compile(
-                    r"(?<vol>\d+)[,:]|"
-                    r"(?<vol>\d+)\s*\((?<issue>\d[^)])\)|"
-                    r"vol\S+\s*(?<vol>d+)\s*iss\S+\s*(?<issue>\d+)"
-                )
-                volume_match = extra.search(volume_regex)
+                volume_match = extra.search(self.volume_regex)
                 journal: Optional[Tuple[Journal, slice]] = (
-                    Journal(journal_name),
+                    Journal(journal_matcher.journal_names(journal_row), journal_row),
                     journal_span,
                 )
                 if not volume_match:
@@ -571,10 +888,12 @@ class Reference(NamedTuple):
             journal = None
             volume_separator = None
             volume = None
+        if clock:
+            clock.enter("parse_authors")
         try:
-            authors_list = (Reference.parse_authors(authors), authors.get_slice())
+            authors_list = (self.parse_authors(authors), authors.get_slice())
         except IndexError:  # parts.pop in extract_author
-            print("Unexpected name:\n", authors.content)
+            parser_logger.warning("Unexpected name: %s", authors.content)
             return None
         return Reference(
             numbering,
@@ -590,27 +909,21 @@ class Reference(NamedTuple):
             line,
         )
 
-    @staticmethod
     def split_three_words(
+        self,
         s: PositionedString,
     ) -> Optional[Tuple[PositionedString, PositionedString]]:
-        three_words_regex = regex.compile(
-            r"[^\s.]*[[:lower:]][^\s.]*\s+"
-            r"[^\s.]*[[:lower:]][^\s.]*\s+"
-            r"[^\s.]*[[:lower:]][^\s.]*"
-        )
-        three_words_match = s.search(three_words_regex)
-        if three_words_regex:
+        three_words_match = s.search(self.three_words_regex)
+        if three_words_match:
             return s[: three_words_match.start()], s[three_words_match.start() :]
         else:
             return None
 
-    @staticmethod
-    def parse_authors(s: PositionedString) -> List[Author]:
+    def parse_authors(self, s: PositionedString) -> List[Author]:
         # try to separate the last author
         # after the loop parts_rest and last_part will be comma-separated lists
         # of surnames and initials
-        for lastsep in map(str, reversed(list(LastSeparator))):
+        for lastsep in self.last_separators:
             parts_rest, sep, last_part = s.partition(lastsep)
             if sep.is_nonempty():
                 break
@@ -619,16 +932,15 @@ class Reference(NamedTuple):
             for part in parts_rest.split(",") + last_part.split(",")
             if part
         ]
-        return [author for author in Reference.extract_author(parts)]
+        return [author for author in self.extract_author(parts)]
 
-    @staticmethod
-    def extract_author(parts: List[PositionedString]) -> Iterator[Author]:
+    def extract_author(self, parts: List[PositionedString]) -> Iterator[Author]:
         while parts:
             part = parts.pop(0)
-            if regex.search("et al", part.content):
+            if part.search(self.et_al_regex):
                 yield (Author(part.get_slice()))
                 continue
-            find_surname = part.search(r"\p{Alpha}[\p{Lower}\'\u2019].*\p{Lower}")
+            find_surname = part.search(self.surname_regex)
             if not find_surname:
                 initials = part.content
                 surname_pos = parts.pop(0)
@@ -651,77 +963,415 @@ class Reference(NamedTuple):
             yield (Author(surname_span, surname, initials))
 
 
+DEFAULT_PARSER = ReferenceParser()
+
+
+_timed_parse_doi = timed("parse_doi", parse_doi)
+
+
 def parse_line(
     line: str, journal_matcher: Optional[JournalMatcher]
 ) -> Union[Optional[Reference], str]:
-    (rest, doi) = parse_doi(PositionedString.new(line))
+    find_doi = _timed_parse_doi if stage_clock() else parse_doi
+    (rest, doi) = find_doi(PositionedString.new(line))
     if not rest and doi:
         return line[doi]
     else:
         return Reference.parse(line, journal_matcher)
 
 
+def is_doi_line(line: str) -> bool:
+    """
+    Returns True, if the line consists of a DOI,
+    which `txt_to_references` appends to the previous reference
+    """
+    line = normalize_space(line.lstrip("\ufeff").rstrip())
+    if not line or not DEFAULT_PARSER.may_be_reference(line):
+        return False
+    rest, doi = parse_doi(PositionedString.new(line))
+    return not rest and doi is not None
+
+
+def _journal_version(journal_matcher: Optional[JournalMatcher]) -> str:
+    return journal_matcher.version if journal_matcher else ""
+
+
+def parse_line_cached(
+    line: str, journal_matcher: Optional[JournalMatcher], cache: ResultCache
+) -> Union[Optional[Reference], str]:
+    """
+    Same as `parse_line`, but the result is stored in `cache`,
+    keyed by the line and the version of the journal table
+    """
+
+    def parse() -> Dict[str, Any]:
+        parsed_line = parse_line(line, journal_matcher)
+        if isinstance(parsed_line, Reference):
+            return {"reference": parsed_line.to_record()}
+        elif isinstance(parsed_line, str):
+            return {"doi": parsed_line}
+        else:
+            return {}
+
+    result = cache.memoize(
+        "parsed", digest(line, _journal_version(journal_matcher)), parse
+    )
+    if "reference" in result:
+        return Reference.from_record(result["reference"], journal_matcher)
+    else:
+        return result.get("doi")
+
+
+_timed_normalize_space = timed("normalize_space", normalize_space)
+
+
 def txt_to_references(
     input: TextIO,
     options: OptionsDict,
     journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
 ) -> Iterator[Union[Reference, str]]:
-    prev_reference = None
+    prev_reference: Optional[Reference] = None
+    normalize = _timed_normalize_space if stage_clock() else normalize_space
     for line in input:
-        if line[0] == "\ufeff":
+        if line.startswith("\ufeff"):
             line = line[1:]
-        line = normalize_space(line.rstrip())
+        line = normalize(line.rstrip())
         if not line:
             continue
-        parsed_line = parse_line(line, journal_matcher)
+        if not DEFAULT_PARSER.may_be_reference(line):
+            # headings, notes and separators are passed through
+            parsed_line: Union[Optional[Reference], str] = None
+        elif cache:
+            parsed_line = parse_line_cached(line, journal_matcher, cache)
+        else:
+            parsed_line = parse_line(line, journal_matcher)
         if isinstance(parsed_line, str) and prev_reference:  # line is doi
-            prev_reference.doi = "\n" + parsed_line
-            prev_reference.replace_doi("\n" + parsed_line)
+            yield prev_reference.append_doi(parsed_line)
+            prev_reference = None
+            continue
+        if prev_reference:
             yield prev_reference
             prev_reference = None
-        elif isinstance(parsed_line, Reference):
-            if prev_reference:
-                yield prev_reference
+        if isinstance(parsed_line, Reference):
             prev_reference = parsed_line
         else:
             yield line
-            continue
     if prev_reference:
         yield prev_reference
 
 
+def format_profile(
+    options: OptionsDict, journal_matcher: Optional[JournalMatcher]
+) -> str:
+    """
+    Returns the part of cache keys, that identifies the output format
+    """
+    return _journal_version(journal_matcher) + ":" + options_digest(options)
+
+
+def format_reference_cached(
+    ref: Reference,
+    options: OptionsDict,
+    cache: Optional[ResultCache],
+    profile: str,
+    doi_lookup: DoiLookup = doi_from_title,
+) -> str:
+    """
+    Same as `Reference.format_reference` for plain text, but the result is stored
+    in `cache`, keyed by the reference and the `format_profile`
+    """
+    if not cache:
+        return ref.format_reference(options, None, doi_lookup)
+    return cache.memoize(
+        "formatted",
+        digest(ref.unparsed, profile),
+        lambda: ref.format_reference(options, None, doi_lookup),
+    )
+
+
+def pipeline_doi_lookup(
+    cache: Optional[ResultCache],
+    progress: Optional[Progress],
+    lookup: DoiLookup = doi_from_title,
+) -> DoiLookup:
+    """
+    Returns the DOI lookup for a processing run,
+    that can be cancelled with `progress` and is cached in `cache`
+    """
+    doi_lookup: DoiLookup = lookup
+    if progress:
+        doi_lookup = progress.doi_lookup(doi_lookup)
+    # the cached DOIs are not counted
+    doi_lookup = timed_lookup(doi_lookup)
+    if cache:
+        doi_lookup = cache.doi_lookup(doi_lookup)
+    return doi_lookup
+
+
+# receives the output text of processing as it is written
+OutputListener = Callable[[str], None]
+
+
+class _ListenedOutput:
+    """
+    Output text file, that also passes the written text to a listener
+    """
+
+    def __init__(self, path: str, listener: Optional[OutputListener]):
+        self._file = open(path, mode="w")
+        self._listener = listener
+
+    def __enter__(self) -> _ListenedOutput:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._file.close()
+
+    def write(self, s: str) -> int:
+        if self._listener:
+            self._listener(s)
+        return self._file.write(s)
+
+
+def open_output(
+    output_dir: str, listener: Optional[OutputListener] = None
+) -> _ListenedOutput:
+    """
+    Opens the `output` file in `output_dir`, which passes
+    the written text to `listener`
+    """
+    return _ListenedOutput(os.path.join(output_dir, "output"), listener)
+
+
 class StepOrderViolated(Exception):
     pass
 
 
+INTERMEDIATE_FILE = "intermediate.jsonl"
+
+
+def _view_digest(line: str) -> str:
+    return hashlib.blake2b(line.encode(), digest_size=8).hexdigest()
+
+
+def bracketed_views(
+    input: Iterable[str],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the bracketed view of each reference in `input` lines,
+    together with the record of its resolved fields for `formatted_views`.
+
+    The record is a JSON line with the digest of the view line
+    to detect hand corrections.
+    """
+    for ref in txt_to_references(input, options, journal_matcher, cache):
+        if isinstance(ref, Reference):
+            line = ref.serialize("{}")
+            record: Dict[str, Any] = {
+                "view": _view_digest(line),
+                "reference": ref.to_record(),
+            }
+        else:
+            line = "* " + ref
+            record = {"view": _view_digest(line)}
+        yield line, json.dumps(record, ensure_ascii=False)
+        if progress:
+            progress.advance()
+
+
 def txt_first_step(
     input: TextIO,
     output_dir: str,
     options: OptionsDict,
     journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+    on_output: Optional[OutputListener] = None,
 ):
-    with open(os.path.join(output_dir, "output"), mode="w") as outfile:
-        for ref in txt_to_references(input, options, journal_matcher):
-            if isinstance(ref, Reference):
-                print(ref.serialize("{}"), file=outfile)
-            else:
-                print("*", ref, file=outfile)
+    """
+    Writes the bracketed view of the references into `output`
+    and their records into `INTERMEDIATE_FILE`, line by line
+    """
+    with open_output(output_dir, on_output) as outfile, open(
+        os.path.join(output_dir, INTERMEDIATE_FILE), mode="w"
+    ) as records_file:
+        for line, record in bracketed_views(
+            input, options, journal_matcher, cache, progress
+        ):
+            print(line, file=outfile)
+            print(record, file=records_file)
+
+
+def intermediate_records(output_dir: str) -> Iterator[str]:
+    """
+    Yields the records written by `txt_first_step`, if there are any
+    """
+    try:
+        records_file = open(os.path.join(output_dir, INTERMEDIATE_FILE))
+    except FileNotFoundError:
+        return
+    with records_file:
+        yield from records_file
+
+
+def formatted_views(
+    input: Iterable[str],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    records: Iterable[str] = (),
+    progress: Optional[Progress] = None,
+) -> Iterator[str]:
+    """
+    Formats the bracketed view produced by `bracketed_views`
+    and yields the output lines.
+
+    References, whose view lines are unchanged, are loaded from `records`
+    without parsing; hand-corrected lines are deserialized from the view.
+    """
+    doi_lookup = pipeline_doi_lookup(None, progress)
+    refs: Iterable[Union[Reference, str]] = _loaded_views(
+        input, journal_matcher, records, progress
+    )
+    if options[Options.SortReferences]:
+        refs = sorted_in_place(list(refs), _reference_key)
+    for ref in refs:
+        if isinstance(ref, Reference):
+            yield ref.format_reference(options, None, doi_lookup)
+        else:
+            yield ref
+
+
+def _loaded_views(
+    input: Iterable[str],
+    journal_matcher: Optional[JournalMatcher],
+    records: Iterable[str],
+    progress: Optional[Progress],
+) -> Iterator[Union[Reference, str]]:
+    for line, record_line in itertools.zip_longest(input, records):
+        if line is None:
+            break
+        if progress:
+            progress.advance()
+        line = line.rstrip()
+        if not line:
+            continue
+        if line[0] == "*":
+            yield line
+            continue
+        record = json.loads(record_line) if record_line else None
+        if record and record["view"] == _view_digest(line):
+            yield Reference.from_record(record["reference"], journal_matcher)
+        else:
+            yield Reference.deserialize(line, "{}", journal_matcher)
 
 
 def txt_second_step(
-    input: Iterator[str],
+    input: Iterable[str],
     output_dir: str,
     options: OptionsDict,
     journal_matcher: Optional[JournalMatcher],
+    records: Iterable[str] = (),
+    progress: Optional[Progress] = None,
+    on_output: Optional[OutputListener] = None,
 ) -> None:
-    with open(os.path.join(output_dir, "output"), mode="w") as outfile:
-        for line in input:
-            line = line.rstrip()
-            if line[0] == "*":
-                print(line, file=outfile)
-            else:
-                ref = Reference.deserialize(line, "{}", journal_matcher)
-                print(ref.format_reference(options, None), file=outfile)
+    """
+    Writes the output of `formatted_views` into `output`
+    """
+    with open_output(output_dir, on_output) as outfile:
+        for line in formatted_views(input, options, journal_matcher, records, progress):
+            print(line, file=outfile)
+
+
+class ParseStatus(Enum):
+    Parsed = 0
+    # the reference is not recognized and is output marked with "*"
+    Unparsed = 1
+
+
+class FormattedReference(NamedTuple):
+    """
+    Result of formatting a reference.
+
+    `source` is the text of the reference, that was parsed,
+    and `spans` are the fields of the reference in it.
+    """
+
+    source: str
+    formatted: str
+    status: ParseStatus
+    spans: Dict[str, slice]
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "formatted": self.formatted,
+            "status": self.status.name,
+            "spans": {name: _span_record(span) for name, span in self.spans.items()},
+        }
+
+    @staticmethod
+    def from_record(record: Dict[str, Any]) -> FormattedReference:
+        return FormattedReference(
+            record["source"],
+            record["formatted"],
+            ParseStatus[record["status"]],
+            {name: slice(*span) for name, span in record["spans"].items()},
+        )
+
+
+def _reference_key(ref: Union[Reference, str]) -> Optional[str]:
+    # the unparsed lines stay in place
+    return collation_key(ref) if isinstance(ref, Reference) else None
+
+
+def _formatted_text(
+    input: Iterable[str],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache],
+    progress: Optional[Progress],
+    doi_lookup: Optional[DoiLookup] = None,
+    skip: int = 0,
+) -> Iterator[FormattedReference]:
+    """
+    Yields the formatted references of the text `input`.
+
+    The first `skip` references are parsed, but not formatted nor yielded.
+    """
+    if doi_lookup is None:
+        doi_lookup = pipeline_doi_lookup(cache, progress)
+    profile = format_profile(options, journal_matcher)
+    clock = stage_clock()
+    refs: Iterable[Union[Reference, str]] = txt_to_references(
+        input, options, journal_matcher, cache
+    )
+    if options[Options.SortReferences]:
+        refs = sorted_in_place(list(refs), _reference_key)
+    for ref in refs:
+        if skip:
+            skip -= 1
+            if progress:
+                progress.advance()
+            continue
+        if isinstance(ref, Reference):
+            result = FormattedReference(
+                ref.unparsed,
+                format_reference_cached(ref, options, cache, profile, doi_lookup),
+                ParseStatus.Parsed,
+                ref.field_spans(),
+            )
+        else:
+            result = FormattedReference(ref, "* " + ref, ParseStatus.Unparsed, {})
+        if clock:
+            clock.end_reference(result.source)
+        yield result
+        if progress:
+            progress.advance()
 
 
 def process_reference_file(
@@ -729,25 +1379,181 @@ def process_reference_file(
     output_dir: str,
     options: OptionsDict,
     journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+    on_output: Optional[OutputListener] = None,
 ):
-    with open(os.path.join(output_dir, "output"), mode="w") as outfile:
-        for ref in txt_to_references(input, options, journal_matcher):
-            if isinstance(ref, Reference):
-                print(ref.format_reference(options, None), file=outfile)
-            else:
-                print("*", ref, file=outfile)
+    with open_output(output_dir, on_output) as outfile:
+        for result in _formatted_text(input, options, journal_matcher, cache, progress):
+            print(result.formatted, file=outfile)
+
+
+def format_checkpointed(
+    input_path: str,
+    output_path: str,
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    resume: bool = False,
+    progress: Optional[Progress] = None,
+    lookup: DoiLookup = doi_from_title,
+    interval: int = CHECKPOINT_INTERVAL,
+) -> None:
+    """
+    Formats the reference list at `input_path` into `output_path`
+    like `format_document`, committing the progress to a journal next to it.
+
+    With `resume` the references finished by an interrupted run are skipped,
+    its DOIs are reused and the output is continued.
+    The journal is removed, when the run is finished.
+    """
+    journal_path = output_path + JOURNAL_SUFFIX
+    fingerprint = run_fingerprint(
+        input_path,
+        format_profile(options, journal_matcher),
+        options[Options.SortReferences],
+    )
+    with ProgressJournal(journal_path, fingerprint, resume) as journal:
+        doi_lookup = journal.doi_lookup(pipeline_doi_lookup(cache, progress, lookup))
+        references = journal.references
+        with open_input(input_path) as infile, open_resumed(
+            output_path, journal.output_size
+        ) as output:
+            for result in _formatted_text(
+                infile,
+                options,
+                journal_matcher,
+                cache,
+                progress,
+                doi_lookup,
+                references,
+            ):
+                output.write((result.formatted + "\n").encode())
+                references += 1
+                if references % interval == 0:
+                    journal.commit(references, output)
+            journal.commit(references, output)
+    os.remove(journal_path)
+
+
+# text of an html list entry without the tags, the tags and the parsed reference
+_ParsedEntry = Tuple[str, ExtractedTags, Optional[Reference]]
+
+
+def _parse_entry(
+    entry: ListEntry, journal_matcher: Optional[JournalMatcher]
+) -> _ParsedEntry:
+    ref_text, tags = extract_tags(entry.content)
+    return ref_text, tags, Reference.parse(ref_text, journal_matcher)
+
+
+def _format_parsed_entry(
+    entry: ListEntry,
+    parsed: _ParsedEntry,
+    options: OptionsDict,
+    doi_lookup: DoiLookup,
+) -> FormattedReference:
+    ref_text, tags, ref = parsed
+    if not ref:
+        return FormattedReference(
+            ref_text, "*" + entry.content, ParseStatus.Unparsed, {}
+        )
+    else:
+        return FormattedReference(
+            ref.unparsed,
+            ref.format_reference(options, tags, doi_lookup),
+            ParseStatus.Parsed,
+            ref.field_spans(),
+        )
+
+
+def format_entry(
+    entry: ListEntry,
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    doi_lookup: DoiLookup = doi_from_title,
+) -> FormattedReference:
+    """
+    Formats the content of an html list entry
+    """
+    return _format_parsed_entry(
+        entry, _parse_entry(entry, journal_matcher), options, doi_lookup
+    )
+
+
+def process_entry(
+    entry: ListEntry,
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    doi_lookup: DoiLookup = doi_from_title,
+) -> ListEntry:
+    result = format_entry(entry, options, journal_matcher, doi_lookup)
+    return entry._replace(content=result.formatted)
+
+
+def _entry_key(item: Tuple[ListEntry, _ParsedEntry]) -> Optional[str]:
+    ref = item[1][2]
+    # the unparsed entries stay in place
+    return collation_key(ref) if ref else None
+
+
+def _formatted_entries(
+    html: Iterable[ListEntry],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache],
+    progress: Optional[Progress],
+) -> Iterator[Tuple[ListEntry, FormattedReference]]:
+    doi_lookup = pipeline_doi_lookup(cache, progress)
+    profile = format_profile(options, journal_matcher)
+    clock = stage_clock()
+    items: Iterable[Tuple[ListEntry, Optional[_ParsedEntry]]]
+    if options[Options.SortReferences]:
+        # the entries are parsed once for their keys and for formatting
+        items = sorted_in_place(
+            [(entry, _parse_entry(entry, journal_matcher)) for entry in html],
+            _entry_key,
+        )
+    else:
+        items = ((entry, None) for entry in html)
+    for entry, parsed in items:
+
+        def format_item() -> FormattedReference:
+            return _format_parsed_entry(
+                entry,
+                parsed or _parse_entry(entry, journal_matcher),
+                options,
+                doi_lookup,
+            )
+
+        if cache:
+            result = FormattedReference.from_record(
+                cache.memoize(
+                    "formatted",
+                    digest(entry.content, profile),
+                    lambda: format_item().to_record(),
+                )
+            )
+        else:
+            result = format_item()
+        if clock:
+            clock.end_reference(result.source)
+        yield entry, result
+        if progress:
+            progress.advance()
 
 
 def processed_references(
-    html: HTMLList, options: OptionsDict, journal_matcher: Optional[JournalMatcher]
+    html: Iterable[ListEntry],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
 ) -> Iterator[ListEntry]:
-    for entry in html:
-        ref_text, tags = extract_tags(entry.content)
-        ref = Reference.parse(ref_text, journal_matcher)
-        if not ref:
-            yield entry._replace(content=("*" + entry.content))
-        else:
-            yield entry._replace(content=ref.format_reference(options, tags))
+    for entry, result in _formatted_entries(
+        html, options, journal_matcher, cache, progress
+    ):
+        yield entry._replace(content=result.formatted)
 
 
 def process_reference_html(
@@ -755,10 +1561,82 @@ def process_reference_html(
     output_dir: str,
     options: OptionsDict,
     journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+    on_output: Optional[OutputListener] = None,
 ):
-    with open(os.path.join(output_dir, "output"), mode="w") as outfile:
-        html = HTMLList(input.read())
+    with open_output(output_dir, on_output) as outfile:
+        html = HTMLListReader()
         for chunk in html.assemble_html(
-            processed_references(html, options, journal_matcher)
+            processed_references(
+                html.read(input), options, journal_matcher, cache, progress
+            )
+        ):
+            outfile.write(chunk)
+
+
+def input_parts(input: Union[str, Iterable[str]], html: bool) -> Iterable[str]:
+    """
+    Returns the lines of a reference list or the chunks of an html document,
+    given as a string or as an iterable
+    """
+    if not isinstance(input, str):
+        return input
+    elif html:
+        return [input]
+    else:
+        return input.splitlines(keepends=True)
+
+
+def format_references(
+    input: Union[str, Iterable[str]],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+) -> Iterator[FormattedReference]:
+    """
+    Formats the references in memory and yields the result for each of them.
+
+    With `Options.HtmlFormat` `input` is an html document or its chunks,
+    otherwise it's a reference list or its lines.
+    """
+    if options[Options.HtmlFormat]:
+        entries = HTMLListReader().read_chunks(input_parts(input, True))
+        for _, result in _formatted_entries(
+            entries, options, journal_matcher, cache, progress
+        ):
+            yield result
+    else:
+        yield from _formatted_text(
+            input_parts(input, False), options, journal_matcher, cache, progress
+        )
+
+
+def format_document(
+    input: Union[str, Iterable[str]],
+    options: OptionsDict,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Progress] = None,
+) -> Iterator[str]:
+    """
+    Same as `format_references`, but yields the output text in pieces:
+    the lines of the formatted references or the assembled html document
+    """
+    if options[Options.HtmlFormat]:
+        html = HTMLListReader()
+        yield from html.assemble_html(
+            processed_references(
+                html.read_chunks(input_parts(input, True)),
+                options,
+                journal_matcher,
+                cache,
+                progress,
+            )
+        )
+    else:
+        for result in format_references(
+            input, options, journal_matcher, cache, progress
         ):
-            print(chunk, file=outfile)
+            yield result.formatted + "\n"
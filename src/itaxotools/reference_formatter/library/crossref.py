@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from typing import Optional
+from typing import Callable, Optional
 import logging
 import json
 
@@ -30,6 +30,9 @@ def load_etiquette_email() -> Optional[str]:
         return None
 
 
+# retrieves DOI by the title of an article and whether to use fuzzy matching
+DoiLookup = Callable[[str, bool], Optional[str]]
+
 PROJECT_NAME: str = "reference_formatter"
 PROJECT_VERSION: str = "0.1.0"
 PROJECT_URL: str = "https://github.com/iTaxoTools"
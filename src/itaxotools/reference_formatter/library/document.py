@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+import json
+from enum import Enum
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from .cache import ResultCache
+from .citation import (
+    FormattedReference,
+    OutputListener,
+    ParseStatus,
+    Reference,
+    txt_to_references,
+)
+from .crossref import DoiLookup
+from .handle_html import (
+    ENTRY_INDENT,
+    ExtractedTags,
+    HTMLListReader,
+    ListEntry,
+    extract_tags,
+)
+from .journal_list import JournalMatcher
+from .options import Options, OptionsDict
+from .progress import Progress
+from .sorting import collation_key, sorted_in_place
+
+# number of lines passed to the output at once
+RENDER_BLOCK = 256
+
+
+class _Item(NamedTuple):
+    reference: Optional[Reference]
+    # the list entry of the reference in html
+    entry: Optional[ListEntry]
+    tags: Optional[ExtractedTags]
+
+
+class ParsedDocument:
+    """
+    Parsed references of an input file,
+    that can be formatted again with different options without parsing.
+
+    Each line of the output is either fixed text or a formatted reference,
+    so the lines of the output don't move, when the options change,
+    except that sorting moves the parsed references between their lines.
+    DOIs retrieved for the document are remembered, so that they are looked up
+    only once.
+    """
+
+    def __init__(self) -> None:
+        self.html = False
+        self.items: List[_Item] = []
+        # for each line of the output, its text or the index of its item
+        self._layout: List[Union[str, int]] = []
+        # the layout with the references sorted, computed on first use
+        self._sorted_layout: Optional[List[Union[str, int]]] = None
+        self._dois: Dict[Tuple[str, bool], Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._layout)
+
+    @classmethod
+    def from_text(
+        cls,
+        input: TextIO,
+        options: OptionsDict,
+        journal_matcher: Optional[JournalMatcher],
+        cache: Optional[ResultCache] = None,
+        progress: Optional[Progress] = None,
+    ) -> "ParsedDocument":
+        """
+        Parses the plain text `input` like `process_reference_file`
+        """
+        document = cls()
+        for ref in txt_to_references(input, options, journal_matcher, cache):
+            if isinstance(ref, Reference):
+                document._layout.append(len(document.items))
+                document.items.append(_Item(ref, None, None))
+            else:
+                document._layout.append("* " + ref)
+            if progress:
+                progress.advance()
+        return document
+
+    @classmethod
+    def from_html(
+        cls,
+        input: TextIO,
+        journal_matcher: Optional[JournalMatcher],
+        progress: Optional[Progress] = None,
+    ) -> "ParsedDocument":
+        """
+        Parses the html `input` like `process_reference_html`
+        """
+        document = cls()
+        document.html = True
+        reader = HTMLListReader()
+
+        def parsed_entries() -> Iterator[int]:
+            for entry in reader.read(input):
+                ref_text, tags = extract_tags(entry.content)
+                ref = Reference.parse(ref_text, journal_matcher)
+                document.items.append(_Item(ref, entry, tags))
+                if progress:
+                    progress.advance()
+                yield len(document.items) - 1
+
+        text: List[str] = []
+        for piece in reader.layout(parsed_entries()):
+            if isinstance(piece, str):
+                text.append(piece)
+            else:
+                document._add_text(text)
+                text = []
+                document._layout.append(piece)
+        document._add_text(text)
+        return document
+
+    def _add_text(self, pieces: List[str]) -> None:
+        # the pieces form complete lines
+        self._layout.extend("".join(pieces).split("\n")[:-1])
+
+    def doi_lookup(self, lookup: Optional[DoiLookup] = None) -> DoiLookup:
+        """
+        Returns a DOI lookup, that remembers the DOIs retrieved with `lookup`.
+        Without `lookup` only the remembered DOIs are found.
+        """
+
+        def remembered_lookup(title: str, fuzzy: bool) -> Optional[str]:
+            key = (title, fuzzy)
+            if key not in self._dois:
+                if lookup is None:
+                    return None
+                self._dois[key] = lookup(title, fuzzy)
+            return self._dois[key]
+
+        return remembered_lookup
+
+    def _format_item(
+        self, item: _Item, options: OptionsDict, doi_lookup: DoiLookup
+    ) -> str:
+        if item.reference:
+            content = item.reference.format_reference(options, item.tags, doi_lookup)
+        else:
+            assert item.entry is not None
+            content = "*" + item.entry.content
+        if item.entry is None:
+            return content
+        return ENTRY_INDENT + item.entry._replace(content=content).to_str()
+
+    def _item_key(self, line: Union[str, int]) -> Optional[str]:
+        if isinstance(line, str):
+            return None
+        reference = self.items[line].reference
+        return collation_key(reference) if reference else None
+
+    def layout(self, options: OptionsDict) -> List[Union[str, int]]:
+        """
+        Returns the text or the index of the item of each line of the output
+        """
+        if not options[Options.SortReferences]:
+            return self._layout
+        if self._sorted_layout is None:
+            self._sorted_layout = sorted_in_place(self._layout, self._item_key)
+        return self._sorted_layout
+
+    def lines(
+        self, options: OptionsDict, start: int, stop: int, doi_lookup: DoiLookup
+    ) -> List[str]:
+        """
+        Returns the lines of the output from `start` to `stop`,
+        formatted with `options`
+        """
+        return [
+            line
+            if isinstance(line, str)
+            else self._format_item(self.items[line], options, doi_lookup)
+            for line in self.layout(options)[start:stop]
+        ]
+
+    def references(
+        self, options: OptionsDict, doi_lookup: DoiLookup
+    ) -> Iterator[FormattedReference]:
+        """
+        Yields the result of formatting each reference with `options`,
+        in the order of the output without its fixed html text
+        """
+        for line in self.layout(options):
+            if isinstance(line, str):
+                if not self.html:
+                    # the unparsed line follows "* "
+                    yield FormattedReference(line[2:], line, ParseStatus.Unparsed, {})
+                continue
+            item = self.items[line]
+            if item.reference:
+                tags = item.tags if options[Options.HtmlFormat] else None
+                yield FormattedReference(
+                    item.reference.unparsed,
+                    item.reference.format_reference(options, tags, doi_lookup),
+                    ParseStatus.Parsed,
+                    item.reference.field_spans(),
+                )
+            else:
+                assert item.entry is not None
+                text, _ = extract_tags(item.entry.content)
+                # empty entries are skipped, like the empty lines of text
+                if text.strip():
+                    yield FormattedReference(
+                        text, "* " + text, ParseStatus.Unparsed, {}
+                    )
+
+    def render(
+        self,
+        options: OptionsDict,
+        on_output: OutputListener,
+        doi_lookup: DoiLookup,
+        progress: Optional[Progress] = None,
+    ) -> None:
+        """
+        Passes the whole output, formatted with `options`, to `on_output`
+        """
+        for start in range(0, len(self), RENDER_BLOCK):
+            stop = start + RENDER_BLOCK
+            lines = self.lines(options, start, stop, doi_lookup)
+            on_output("".join(line + "\n" for line in lines))
+            if progress:
+                progress.advance(
+                    sum(not isinstance(line, str) for line in self._layout[start:stop])
+                )
+
+
+class TargetKind(Enum):
+    # the output of the input's format: a reference list or an html document
+    Document = "document"
+    # the formatted references as plain text, one on each line
+    Text = "text"
+    # JSON lines of the records of `FormattedReference`
+    Json = "json"
+
+
+class RenderTarget(NamedTuple):
+    kind: TargetKind
+    options: OptionsDict
+    output: TextIO
+
+
+def render_targets(
+    document: ParsedDocument,
+    targets: Sequence[RenderTarget],
+    doi_lookup: DoiLookup,
+) -> None:
+    """
+    Writes the output of each target, formatted with its options,
+    from the single parse of `document`.
+
+    `Options.HtmlFormat` is set by the kind of the target and the document.
+    The DOIs are looked up once for all targets.
+    """
+    doi_lookup = document.doi_lookup(doi_lookup)
+    for target in targets:
+        options = target.options.copy()
+        if target.kind == TargetKind.Document:
+            options[Options.HtmlFormat] = document.html
+            document.render(options, target.output.write, doi_lookup)
+            continue
+        options[Options.HtmlFormat] = False
+        for result in document.references(options, doi_lookup):
+            if target.kind == TargetKind.Text:
+                target.output.write(result.formatted + "\n")
+            else:
+                target.output.write(json.dumps(result.to_record()) + "\n")
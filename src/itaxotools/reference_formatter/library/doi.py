@@ -6,14 +6,15 @@ import regex
 
 from .positioned import PositionedString
 
+DOI_REGEX = regex.compile(r"https?:.*doi.*$|\bdoi: ?[^ ]*$")
+
 
 def parse_doi(line: PositionedString) -> Tuple[PositionedString, Optional[slice]]:
     """
     Parses line as line == rest + doi and returns (rest, doi).
     Returns (line, None) is the line doesn't contain doi
     """
-    doi_regex = regex.compile(r"https?:.*doi.*$|\bdoi: ?[^ ]*$")
-    doi_match = line.search(doi_regex)
+    doi_match = line.search(DOI_REGEX)
     if doi_match:
         rest, doi, _ = line.match_partition(doi_match)
         return rest, doi.get_slice()
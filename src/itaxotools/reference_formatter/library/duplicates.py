@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import regex
+from fuzzywuzzy import fuzz
+
+from .citation import Reference
+from .utils import fold
+
+# similarity of the titles of duplicates, from 0 to 100
+TITLE_THRESHOLD = 90
+
+# larger blocks are not compared, so that common keys don't make
+# the number of compared pairs quadratic
+MAX_BLOCK_SIZE = 64
+
+# number of the first words of the title in its blocking key
+TITLE_KEY_WORDS = 3
+
+_YEAR_REGEX = regex.compile(r"\d+")
+
+
+class DuplicateFields:
+    """
+    Fields of a reference, that identify the work independently of formatting
+    """
+
+    def __init__(self, reference: Reference):
+        authors, _ = reference.authors
+        first_author = authors[0] if authors else None
+        if first_author and not first_author.is_et_al:
+            self.surname: Optional[str] = fold(first_author.surname) or None
+        else:
+            self.surname = None
+        year_match = _YEAR_REGEX.search(reference.year[0])
+        self.year = year_match.group(0) if year_match else None
+        self.journal = reference.journal[0].row if reference.journal else None
+        self.volume = fold(reference.volume[0]) if reference.volume else None
+        self.first_page = (
+            fold(reference.page_range[0]) if reference.page_range else None
+        )
+        self.title = fold(reference.unparsed[reference.article])
+
+    def blocking_keys(self) -> Iterator[Hashable]:
+        """
+        Yields the keys of the blocks of the reference.
+
+        The keys combine the first author and year with the first page,
+        the journal or the first words of the title, and the journal
+        and volume with the first page, so duplicates share a key,
+        unless they differ in several fields.
+        """
+        if self.surname and self.year and self.first_page:
+            yield ("author-page", self.surname, self.year, self.first_page)
+        if self.journal is not None and self.volume and self.first_page:
+            yield ("journal-page", self.journal, self.volume, self.first_page)
+        if self.surname and self.year and self.journal is not None:
+            yield ("author-journal", self.surname, self.year, self.journal, self.volume)
+        if self.surname and self.year and self.title:
+            title_start = " ".join(self.title.split()[:TITLE_KEY_WORDS])
+            yield ("author-title", self.surname, self.year, title_start)
+
+    def same_title(self, other: "DuplicateFields", threshold: int) -> bool:
+        if not self.title or not other.title:
+            return False
+        # the parts of other fields, that are parsed as the title, are ignored
+        return self.title == other.title or (
+            fuzz.token_set_ratio(self.title, other.title) >= threshold
+        )
+
+
+class _DisjointSets:
+    """
+    Union-find on the indices from 0 to `size`
+    """
+
+    def __init__(self, size: int):
+        self.parents = list(range(size))
+
+    def find(self, i: int) -> int:
+        root = i
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[i] != root:
+            self.parents[i], i = root, self.parents[i]
+        return root
+
+    def union(self, i: int, j: int) -> None:
+        i, j = self.find(i), self.find(j)
+        # the first reference becomes the root
+        if i < j:
+            self.parents[j] = i
+        elif j < i:
+            self.parents[i] = j
+
+
+def candidate_pairs(fields: Sequence[DuplicateFields]) -> Iterator[Tuple[int, int]]:
+    """
+    Yields the pairs of indices, that share a block, each once
+    """
+    blocks: Dict[Hashable, List[int]] = {}
+    for i, reference_fields in enumerate(fields):
+        for key in reference_fields.blocking_keys():
+            blocks.setdefault(key, []).append(i)
+    seen = set()
+    for block in blocks.values():
+        if len(block) > MAX_BLOCK_SIZE:
+            continue
+        for position, i in enumerate(block):
+            for j in block[position + 1 :]:
+                if (i, j) not in seen:
+                    seen.add((i, j))
+                    yield i, j
+
+
+def duplicate_clusters(
+    references: Sequence[Reference], threshold: int = TITLE_THRESHOLD
+) -> List[List[int]]:
+    """
+    Returns the clusters of the indices of duplicate references.
+
+    Candidates share a block, see `DuplicateFields.blocking_keys`,
+    and are confirmed by the similarity of the titles.
+    The clusters have at least two references
+    and are ordered by their first reference.
+    """
+    fields = [DuplicateFields(reference) for reference in references]
+    sets = _DisjointSets(len(references))
+    for i, j in candidate_pairs(fields):
+        if sets.find(i) != sets.find(j) and fields[i].same_title(fields[j], threshold):
+            sets.union(i, j)
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(references)):
+        clusters.setdefault(sets.find(i), []).append(i)
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+
+def deduplicate(
+    references: Sequence[Reference], threshold: int = TITLE_THRESHOLD
+) -> List[int]:
+    """
+    Returns the indices of the references without the later duplicates
+    """
+    duplicates = {
+        i for cluster in duplicate_clusters(references, threshold) for i in cluster[1:]
+    }
+    return [i for i in range(len(references)) if i not in duplicates]
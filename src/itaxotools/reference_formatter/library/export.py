@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import csv
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+import regex
+
+from .citation import ParseStatus, Reference
+from .journal_list import NameForm
+
+# number of rows, that are converted into columns and written at once
+BATCH_SIZE = 10000
+
+# columns of the export and their types: "string", "int" or "bool"
+EXPORT_COLUMNS: Dict[str, str] = {
+    "entry": "int",
+    "status": "string",
+    "source": "string",
+    "authors": "string",
+    "first_author": "string",
+    "author_count": "int",
+    "et_al": "bool",
+    "year": "string",
+    "title": "string",
+    "journal": "string",
+    "journal_row": "int",
+    "journal_full_name": "string",
+    "journal_with_periods": "string",
+    "journal_abbrev": "string",
+    "journal_no_space": "string",
+    "volume": "string",
+    "issue": "string",
+    "first_page": "string",
+    "last_page": "string",
+    "doi": "string",
+}
+
+_JOURNAL_COLUMNS = {
+    NameForm.FullName: "journal_full_name",
+    NameForm.WithPeriods: "journal_with_periods",
+    NameForm.Abbrev: "journal_abbrev",
+    NameForm.WithPeriodsNoSpace: "journal_no_space",
+}
+
+_DOI_REGEX = regex.compile(r"10\.\S+")
+
+EXPORT_FORMATS = ["csv", "parquet", "arrow"]
+
+
+class ExportDependencyMissing(Exception):
+    pass
+
+
+def export_row(index: int, entry: Union[Reference, str]) -> Dict[str, Any]:
+    """
+    Returns the parsed fields of `entry` as the values of `EXPORT_COLUMNS`.
+
+    `index` is the number of the entry in the list without empty lines,
+    starting from 0. The lines, that are not parsed, only have the index,
+    status and source.
+    """
+    row: Dict[str, Any] = dict.fromkeys(EXPORT_COLUMNS)
+    row["entry"] = index
+    if not isinstance(entry, Reference):
+        row["status"] = ParseStatus.Unparsed.name
+        row["source"] = entry
+        return row
+    text = entry.unparsed
+    row["status"] = ParseStatus.Parsed.name
+    row["source"] = text
+    authors = entry.authors[0] or []
+    named = [author for author in authors if not author.is_et_al]
+    row["authors"] = "; ".join(
+        f"{author.surname}, {author.initials}" for author in named
+    )
+    row["first_author"] = named[0].surname if named else None
+    row["author_count"] = len(named)
+    row["et_al"] = len(named) < len(authors)
+    row["year"] = entry.year[0]
+    row["title"] = text[entry.article].strip(" .,")
+    if entry.journal:
+        journal, journal_span = entry.journal
+        row["journal"] = text[journal_span].strip()
+        if journal:
+            row["journal_row"] = journal.row
+            for form, column in _JOURNAL_COLUMNS.items():
+                row[column] = journal.name.get(form)
+    if entry.volume:
+        row["volume"], row["issue"], _ = entry.volume
+    if entry.page_range:
+        row["first_page"], row["last_page"], _ = entry.page_range
+    if entry.doi:
+        doi_match = _DOI_REGEX.search(text[entry.doi])
+        row["doi"] = doi_match.group(0) if doi_match else text[entry.doi].strip()
+    return row
+
+
+def column_batches(
+    entries: Iterable[Union[Reference, str]], batch_size: int = BATCH_SIZE
+) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Yields the rows of `entries` transposed into columns,
+    at most `batch_size` rows at a time, so that the memory is bounded
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in EXPORT_COLUMNS}
+    size = 0
+    for index, entry in enumerate(entries):
+        for name, value in export_row(index, entry).items():
+            columns[name].append(value)
+        size += 1
+        if size == batch_size:
+            yield columns
+            columns = {name: [] for name in EXPORT_COLUMNS}
+            size = 0
+    if size:
+        yield columns
+
+
+def write_csv(batches: Iterable[Dict[str, List[Any]]], output: TextIO) -> int:
+    """
+    Writes the batches into `output` as CSV with a header row.
+
+    Returns the number of rows.
+    """
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for batch in batches:
+        rows = list(zip(*batch.values()))
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _arrow_schema() -> Any:
+    try:
+        import pyarrow as pa
+    except ImportError as ex:
+        raise ExportDependencyMissing(
+            "Parquet and Arrow export require the pyarrow package"
+        ) from ex
+
+    types = {"string": pa.string(), "int": pa.int64(), "bool": pa.bool_()}
+    return pa.schema(
+        [(name, types[type_name]) for name, type_name in EXPORT_COLUMNS.items()]
+    )
+
+
+def write_arrow(
+    batches: Iterable[Dict[str, List[Any]]], path: str, format: str = "parquet"
+) -> int:
+    """
+    Writes the batches into the file at `path` as Parquet or Arrow IPC,
+    one row group or record batch for each of them.
+
+    Returns the number of rows.
+    """
+    schema = _arrow_schema()
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if format == "parquet":
+        writer: Any = pyarrow.parquet.ParquetWriter(path, schema)
+    elif format == "arrow":
+        writer = pyarrow.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f"Unknown export format: {format}")
+    count = 0
+    with writer:
+        for batch in batches:
+            table = pa.Table.from_pydict(batch, schema=schema)
+            writer.write_table(table)
+            count += table.num_rows
+    return count
+
+
+def export_format(path: Optional[str], format: Optional[str] = None) -> str:
+    """
+    Returns `format`, or the format of the output file by its extension
+    """
+    if format:
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        return format
+    if path:
+        extension = path.rsplit(".", 1)[-1].lower()
+        if extension in ("parquet", "pq"):
+            return "parquet"
+        if extension in ("arrow", "feather", "ipc"):
+            return "arrow"
+    return "csv"
@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 
 import logging
-from typing import Dict, Optional, Union, Callable
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union, Callable
 from tkinterweb import HtmlFrame
 import tkinter as tk
 import tkinter.ttk as ttk
@@ -10,15 +13,19 @@ import tkinter.messagebox as tkmessagebox
 import tkinter.font as tkfont
 from enum import IntEnum
 import os
-from pathlib import Path
 
 from .citation import (
     process_reference_file,
     txt_first_step,
     txt_second_step,
+    intermediate_records,
     process_reference_html,
     StepOrderViolated,
+    OutputListener,
+    parser_logger,
+    pipeline_doi_lookup,
 )
+from .document import ParsedDocument
 from .options import (
     OptionGroup,
     Options,
@@ -27,10 +34,72 @@ from .options import (
     primary_options,
 )
 from .journal_list import JournalMatcher
+from .cache import ResultCache, default_cache_path
+from .progress import Cancelled, Progress
+from .readers import open_input, plain_extension
+from .stats import collect_stats
+from .result_store import ResultStore
 from .resources import get_resource
 from . import crossref
 
 
+# how often the state of the worker thread is checked, in milliseconds
+POLL_INTERVAL = 100
+
+# number of lines of the output kept in the preview
+PREVIEW_WINDOW = 300
+
+# the preview window is moved, when fewer lines are left beyond the visible ones
+PREVIEW_MARGIN = 50
+
+# delay of the live update after the last change of the options, in milliseconds
+LIVE_DELAY = 300
+
+# log records from the worker thread, to be displayed by the main thread
+_worker_messages: "queue.Queue[Callable[[], None]]" = queue.Queue()
+
+
+def _on_main_thread() -> bool:
+    return threading.current_thread() is threading.main_thread()
+
+
+def _estimate_references(input_path: str, html: bool, progress: Progress) -> int:
+    """
+    Quickly estimates the number of references in the input file.
+
+    Runs in the worker thread and stops, when the run is cancelled.
+    """
+    count = 0
+    with open_input(input_path) as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), ""):
+            progress.check()
+            if html:
+                chunk = chunk.lower()
+                count += chunk.count("</li") + chunk.count("</p")
+            else:
+                count += sum(1 for line in chunk.splitlines() if line.strip())
+        return count
+
+
+def _with_stats(
+    task: Callable[[Progress, OutputListener], Tuple[str, Any]]
+) -> Callable[[Progress, OutputListener], Tuple[str, Any]]:
+    """
+    Wraps a processing task, that returns a report and a result,
+    so that the statistics of processing are added to the report
+    """
+
+    def task_with_stats(
+        progress: Progress, on_output: OutputListener
+    ) -> Tuple[str, Any]:
+        # the statistics are collected in the worker thread
+        with collect_stats() as clock:
+            report, result = task(progress, on_output)
+        return report + "\n\n" + clock.report(), result
+
+    return task_with_stats
+
+
 class TkWarnLogger(logging.Handler):
     """Displays warnings with TK messagebox"""
 
@@ -39,6 +108,13 @@ class TkWarnLogger(logging.Handler):
         self.addFilter(lambda record: record.levelno == logging.WARNING)
 
     def emit(self, record: logging.LogRecord) -> None:
+        if record.name == parser_logger.name:
+            # there can be one for each reference, too many for message boxes
+            print("Warning:", record.getMessage())
+            return
+        if not _on_main_thread():
+            _worker_messages.put(lambda: self.emit(record))
+            return
         tkmessagebox.showwarning("Warning", record.getMessage())
         print(record.pathname, record.lineno, sep=": ")
         print("Warning:", record.getMessage(), "\n")
@@ -52,6 +128,9 @@ class TkErrorLogger(logging.Handler):
         self.addFilter(lambda record: record.levelno == logging.ERROR)
 
     def emit(self, record: logging.LogRecord) -> None:
+        if not _on_main_thread():
+            _worker_messages.put(lambda: self.emit(record))
+            return
         tkmessagebox.showerror("Error", record.getMessage())
         print(record.pathname, record.lineno, sep=": ")
         print("Error:", record.getMessage(), "\n")
@@ -92,6 +171,16 @@ class FmtParameters(ttk.LabelFrame):
             for _, group_frame in self.group_frames.items():
                 group_frame.pack(side=tk.TOP, fill=tk.X)
 
+    def on_change(self, callback: Callable[[], None]) -> None:
+        """
+        Calls `callback`, when any option is changed
+        """
+        for var_or_cmb in self.get_options.values():
+            if isinstance(var_or_cmb, tk.Variable):
+                var_or_cmb.trace_add("write", lambda *_: callback())
+            elif isinstance(var_or_cmb, ttk.Combobox):
+                var_or_cmb.bind("<<ComboboxSelected>>", lambda _: callback(), add="+")
+
     def get(self) -> OptionsDict:
         result: OptionsDict = {}
         for option, var_or_cmb in self.get_options.items():
@@ -106,10 +195,30 @@ class FmtGui(ttk.Frame):
     def __init__(self, *args, **kwargs):
         self.preview_dir = kwargs.pop("preview_dir")
         self.journal_matcher: Optional[JournalMatcher] = None
+        self.progress: Optional[Progress] = None
+        self.worker_results: "queue.Queue[Any]" = queue.Queue()
+        self.store = ResultStore(os.path.join(self.preview_dir, "preview"))
+        # lines of the store shown in the preview
+        self.window_start = 0
+        self.window_stop = 0
+        self.window_text = ""
+        self.window_pending = False
+        # the window ends with the last line of the store
+        self.window_at_end = True
+        self.worker_finish: Callable[[Any], None] = lambda _: None
+        self.running = False
+        # the references of the last run, that are re-rendered in live mode
+        self.document: Optional[ParsedDocument] = None
+        # store, that receives the output of a live update
+        self.live_store: Optional[ResultStore] = None
+        self.live_job: Optional[str] = None
+        # time of the last change of the options
+        self.change_time = 0.0
         super().__init__(*args, **kwargs)
         self.create_banner()
         self.create_top_frame()
         self.parameters_frame = FmtParameters(self, text="Parameters")
+        self.parameters_frame.on_change(self.options_changed)
         self.create_preview_frame()
 
         self.banner.grid(row=0, column=0, sticky="nwse", columnspan=2)
@@ -154,7 +263,7 @@ class FmtGui(ttk.Frame):
     def create_top_frame(self) -> None:
         self.top_frame = ttk.Frame(self)
         self.top_frame.rowconfigure(0, weight=1)
-        self.top_frame.columnconfigure(6, weight=1)
+        self.top_frame.columnconfigure(8, weight=1)
 
         ttk.Button(self.top_frame, text="Open", command=self.open_command).grid(
             row=0, column=0
@@ -164,26 +273,57 @@ class FmtGui(ttk.Frame):
         )
         ttk_style = ttk.Style()
         ttk_style.configure("Run.TButton", background="blue")
-        ttk.Button(
-            self.top_frame,
-            text="Run",
-            command=self.run_command(interactive=False),
-            style="Run.TButton",
-        ).grid(row=0, column=2)
-        ttk.Button(
-            self.top_frame,
-            text="Run step 1",
-            command=self.run_command(interactive=True),
-        ).grid(row=0, column=3)
-        ttk.Button(
-            self.top_frame, text="Run step 2", command=self.run_second_step
-        ).grid(row=0, column=4)
+        self.run_buttons = [
+            ttk.Button(
+                self.top_frame,
+                text="Run",
+                command=self.run_command(interactive=False),
+                style="Run.TButton",
+            ),
+            ttk.Button(
+                self.top_frame,
+                text="Run step 1",
+                command=self.run_command(interactive=True),
+            ),
+            ttk.Button(self.top_frame, text="Run step 2", command=self.run_second_step),
+        ]
+        for column, button in enumerate(self.run_buttons, start=2):
+            button.grid(row=0, column=column)
         ttk.Button(self.top_frame, text="Clear", command=self.clear_command).grid(
             row=0, column=5
         )
+        self.cancel_button = ttk.Button(
+            self.top_frame,
+            text="Cancel",
+            command=self.cancel_command,
+            state="disabled",
+        )
+        self.cancel_button.grid(row=0, column=6)
+        self.show_stats = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.top_frame, text="Statistics", variable=self.show_stats
+        ).grid(row=0, column=7)
+        self.progress_bar = ttk.Progressbar(self.top_frame, mode="determinate")
+        self.progress_bar.grid(row=0, column=8, sticky="we")
+        self.progress_status = tk.StringVar()
+        ttk.Label(self.top_frame, textvariable=self.progress_status).grid(
+            row=0, column=9
+        )
 
     def clear_command(self) -> None:
-        self.preview.delete("1.0", "end")
+        if self.live_job:
+            self.after_cancel(self.live_job)
+            self.live_job = None
+        self.document = None
+        self.close_stores()
+        self.store = ResultStore(os.path.join(self.preview_dir, "preview"))
+        self.show_window(0)
+
+    def close_stores(self) -> None:
+        self.store.close()
+        if self.live_store:
+            self.live_store.close()
+            self.live_store = None
 
     def open_command(self) -> None:
         input_path = tkfiledialog.askopenfilename()
@@ -193,19 +333,108 @@ class FmtGui(ttk.Frame):
     def save_command(self) -> None:
         output_path = tkfiledialog.asksaveasfilename()
         if output_path:
+            self.save_window_edits()
             with open(output_path, mode="w") as outfile:
-                outfile.write(self.preview.get("1.0", "end"))
+                self.store.save(outfile)
 
     def make_preview(self) -> None:
-        preview_file_path = os.path.join(self.preview_dir, "output")
-        with open(preview_file_path) as preview_file:
-            self.preview.insert("1.0", preview_file.read())
-        self.html_preview.load_url(
-            Path(preview_file_path).resolve().as_uri(), force=True
+        # the plain text preview is filled while processing
+        self.refresh_preview()
+        if self.make_rendered.get():
+            self.render_preview()
+
+    def render_preview(self) -> None:
+        self.html_preview.load_html(self.preview.get("1.0", "end"))
+
+    def show_window(self, top_line: int) -> None:
+        """
+        Loads the lines around `top_line` from the store into the preview
+        """
+        self.window_pending = False
+        self.save_window_edits()
+        line_count = len(self.store)
+        start = max(0, min(top_line - PREVIEW_WINDOW // 3, line_count - PREVIEW_WINDOW))
+        stop = min(line_count, start + PREVIEW_WINDOW)
+        self.window_at_end = stop == line_count
+        if self.window_at_end:
+            # include the lines added after the end
+            stop += 1
+        text = "\n".join(self.store.lines(start, stop))
+        self.preview.delete("1.0", "end")
+        self.preview.insert("1.0", text)
+        self.preview.edit_modified(False)
+        self.window_start, self.window_stop, self.window_text = start, stop, text
+        self.preview.yview_moveto((top_line - start) / max(self.displayed_lines(), 1))
+        if self.make_rendered.get():
+            self.render_preview()
+
+    def save_window_edits(self) -> None:
+        if not self.preview.edit_modified():
+            return
+        text = self.preview.get("1.0", "end-1c")
+        if text != self.window_text:
+            self.store.edit(self.window_start, self.window_stop, text.split("\n"))
+            self.window_text = text
+        self.preview.edit_modified(False)
+
+    def displayed_lines(self) -> int:
+        return int(self.preview.index("end-1c").split(".")[0])
+
+    def visible_lines(self) -> Tuple[int, int]:
+        """
+        Returns the range of the visible lines in the preview
+        """
+        top = int(self.preview.index("@0,0").split(".")[0]) - 1
+        bottom = self.preview.index(f"@0,{self.preview.winfo_height()}")
+        return top, int(bottom.split(".")[0])
+
+    def store_line(self, line: int) -> int:
+        """
+        Returns the line of the store, that is shown at `line` of the preview
+        """
+        window_size = min(self.window_stop, len(self.store)) - self.window_start
+        scale = window_size / max(self.displayed_lines(), 1)
+        return self.window_start + round(line * scale)
+
+    def on_preview_scroll(self, *_: str) -> None:
+        top, bottom = self.visible_lines()
+        line_count = max(len(self.store), 1)
+        self.preview_yscroll.set(
+            self.store_line(top) / line_count, self.store_line(bottom) / line_count
         )
+        if self.window_pending:
+            return
+        if (top < PREVIEW_MARGIN and self.window_start > 0) or (
+            self.displayed_lines() - bottom < PREVIEW_MARGIN
+            and self.window_stop < len(self.store)
+        ):
+            self.window_pending = True
+            top_line = self.store_line(top)
+            self.after_idle(lambda: self.show_window(top_line))
+
+    def scroll_preview(self, *args: str) -> None:
+        if args[0] == "moveto":
+            self.show_window(int(float(args[1]) * len(self.store)))
+        else:
+            self.preview.yview(*args)
+
+    def refresh_preview(self) -> None:
+        """
+        Fills the preview window, while the output is growing
+        """
+        shown = self.window_stop - 1 - self.window_start
+        if (
+            self.window_at_end
+            and shown < min(len(self.store), PREVIEW_WINDOW)
+            and not self.preview.edit_modified()
+        ):
+            self.show_window(self.store_line(self.visible_lines()[0]))
+        else:
+            self.on_preview_scroll()
 
     def switch_preview(self) -> None:
         if self.make_rendered.get():
+            self.render_preview()
             self.plain_preview.grid_remove()
             self.html_preview.grid()
         else:
@@ -233,79 +462,321 @@ class FmtGui(ttk.Frame):
                     "Please put a valid email into "
                     f"{get_resource('crossref_etiquette_email.txt')}"
                 )
-            try:
-                with open(self.input_file.get(), errors="replace") as infile:
-                    if options[Options.HtmlFormat]:
-                        if not interactive:
-                            process_reference_html(
-                                infile, self.preview_dir, options, self.journal_matcher
+            input_path = self.input_file.get()
+            html = options[Options.HtmlFormat]
+            if html and interactive:
+                logging.warning(
+                    "Two step transformation is not yet supported for HTML format"
+                )
+                return
+            if not html and self.input_has_html_extension():
+                logging.warning(
+                    "Input might be html file."
+                    ' Consider enabling "HTML format" option.'
+                )
+            if not os.path.isfile(input_path):
+                tkmessagebox.showerror("Error", f"File {input_path} cannot be opened")
+                return
+            journal_matcher = self.journal_matcher
+            live = self.live.get() and not interactive
+            stats = self.show_stats.get()
+
+            def task(
+                progress: Progress, on_output: OutputListener
+            ) -> Tuple[str, Optional[ParsedDocument]]:
+                # the input isn't read by the main thread, so that the window
+                # stays responsive with large and compressed files
+                progress.restart(_estimate_references(input_path, html, progress))
+                # the cache is used only by the worker thread
+                with open_input(input_path) as infile, ResultCache(
+                    default_cache_path()
+                ) as cache:
+                    if live:
+                        if html:
+                            document = ParsedDocument.from_html(
+                                infile, journal_matcher, progress
                             )
                         else:
-                            logging.warning(
-                                "Two step transformation is"
-                                "not yet supported for HTML format"
+                            document = ParsedDocument.from_text(
+                                infile, options, journal_matcher, cache, progress
                             )
+                        progress.restart(len(document.items))
+                        document.render(
+                            options,
+                            on_output,
+                            document.doi_lookup(pipeline_doi_lookup(cache, progress)),
+                            progress,
+                        )
+                        return cache.report(), document
+                    elif html:
+                        process_reference_html(
+                            infile,
+                            self.preview_dir,
+                            options,
+                            journal_matcher,
+                            cache,
+                            progress,
+                            on_output,
+                        )
+                    elif interactive:
+                        txt_first_step(
+                            infile,
+                            self.preview_dir,
+                            options,
+                            journal_matcher,
+                            cache,
+                            progress,
+                            on_output,
+                        )
                     else:
-                        if self.input_has_html_extension():
-                            logging.warning(
-                                "Input might be html file."
-                                ' Consider enabling "HTML format" option.'
-                            )
-                        if interactive:
-                            txt_first_step(
-                                infile, self.preview_dir, options, self.journal_matcher
-                            )
-                        else:
-                            process_reference_file(
-                                infile, self.preview_dir, options, self.journal_matcher
-                            )
-            except FileNotFoundError:
-                tkmessagebox.showerror(
-                    "Error", f"File {self.input_file.get()} cannot be opened"
-                )
-            else:
+                        process_reference_file(
+                            infile,
+                            self.preview_dir,
+                            options,
+                            journal_matcher,
+                            cache,
+                            progress,
+                            on_output,
+                        )
+                    return cache.report(), None
+
+            def finish(result: Tuple[str, Optional[ParsedDocument]]) -> None:
+                report, self.document = result
                 self.make_preview()
-                tkmessagebox.showinfo("Done", "Processing is complete")
+                tkmessagebox.showinfo("Done", "Processing is complete\n\n" + report)
+
+            self.start_worker(_with_stats(task) if stats else task, 0, finish)
 
         return run
 
     def run_second_step(self) -> None:
+        # the preview contains the result of step 1, possibly corrected by hand
+        self.save_window_edits()
+        view = list(self.store.iter_lines())
         self.clear_command()
-        second_input = Path(self.preview_dir) / "input2"
-        second_input.unlink(missing_ok=True)
-        (Path(self.preview_dir) / "output").rename(second_input)
-        with open(second_input) as input2:
-            try:
-                txt_second_step(
-                    input2,
-                    self.preview_dir,
-                    self.parameters_frame.get(),
-                    self.journal_matcher,
-                )
-            except StepOrderViolated:
-                logging.error(
-                    "Something went wrong.\n"
-                    "Perhaps you didn't run step 1 before step 2"
+        options = self.parameters_frame.get()
+        journal_matcher = self.journal_matcher
+
+        def task(progress: Progress, on_output: OutputListener) -> None:
+            txt_second_step(
+                view,
+                self.preview_dir,
+                options,
+                journal_matcher,
+                intermediate_records(self.preview_dir),
+                progress,
+                on_output,
+            )
+
+        self.start_worker(task, len(view), lambda _: self.make_preview())
+
+    def options_changed(self) -> None:
+        """
+        Schedules the live update, when the options stop changing
+        """
+        if not self.live.get() or self.document is None:
+            return
+        if self.live_job:
+            self.after_cancel(self.live_job)
+        self.change_time = time.perf_counter()
+        self.live_job = self.after(LIVE_DELAY, self.live_update)
+
+    def live_switched(self) -> None:
+        if self.live.get() and self.document is None:
+            self.progress_status.set("Live update starts after the next run")
+
+    def live_update(self) -> None:
+        """
+        Formats the parsed references with the changed options.
+
+        The visible part of the preview is updated at once,
+        the whole output is formatted by the worker thread.
+        DOIs are retrieved only for the references,
+        that were not looked up with the same options before.
+        """
+        self.live_job = None
+        document = self.document
+        if document is None:
+            return
+        options = self.parameters_frame.get()
+        if options[Options.HtmlFormat] != document.html:
+            self.progress_status.set("Press Run to change the input format")
+            return
+        # the hand edits of the previous output are discarded
+        top = self.preview.yview()[0]
+        stop = min(self.window_stop, len(document))
+        text = "\n".join(
+            document.lines(options, self.window_start, stop, document.doi_lookup())
+        )
+        self.preview.delete("1.0", "end")
+        self.preview.insert("1.0", text)
+        self.preview.edit_modified(False)
+        self.window_text = text
+        self.preview.yview_moveto(top)
+        if self.make_rendered.get():
+            self.render_preview()
+        self.update_idletasks()
+        preview_time = time.perf_counter() - self.change_time
+        self.progress_status.set(f"Preview updated in {preview_time * 1000:.0f} ms")
+        self.start_live_render(options, preview_time)
+
+    def start_live_render(self, options: OptionsDict, preview_time: float) -> None:
+        document = self.document
+        if document is None:
+            return
+        if self.running:
+            # the output for the previous options is not needed anymore
+            self.cancel_command()
+            self.live_job = self.after(
+                POLL_INTERVAL, lambda: self.start_live_render(options, preview_time)
+            )
+            return
+        self.live_job = None
+        if self.live_store:
+            self.live_store.close()
+        # the current store stays in the preview, until the new one is complete
+        if os.path.basename(self.store.path) == "preview":
+            live_path = os.path.join(self.preview_dir, "preview-live")
+        else:
+            live_path = os.path.join(self.preview_dir, "preview")
+        store = ResultStore(live_path)
+        self.live_store = store
+        change_time = self.change_time
+
+        def task(progress: Progress, on_output: OutputListener) -> None:
+            with ResultCache(default_cache_path()) as cache:
+                document.render(
+                    options,
+                    on_output,
+                    document.doi_lookup(pipeline_doi_lookup(cache, progress)),
+                    progress,
                 )
+
+        def finish(_: None) -> None:
+            top_line = self.store_line(self.visible_lines()[0])
+            self.store.close()
+            self.store = store
+            self.live_store = None
+            self.show_window(top_line)
+            self.progress_status.set(
+                f"Preview updated in {preview_time * 1000:.0f} ms, "
+                f"output in {time.perf_counter() - change_time:.1f} s"
+            )
+
+        self.start_worker(task, len(document.items), finish, store)
+
+    def start_worker(
+        self,
+        task: Callable[[Progress, OutputListener], Any],
+        total: int,
+        finish: Callable[[Any], None],
+        store: Optional[ResultStore] = None,
+    ) -> None:
+        """
+        Runs `task` in a worker thread and calls `finish` with its result,
+        when it's complete.
+
+        The output of `task` goes into `store`, the current store by default,
+        which is shown in the preview, while it's running.
+        """
+        progress = Progress(total)
+        if store is None:
+            store = self.store
+
+        def work() -> None:
+            try:
+                result = (True, task(progress, store.append))
+            except Exception as ex:
+                result = (False, ex)
+            store.finish()
+            self.worker_results.put(result)
+
+        self.progress = progress
+        self.worker_finish = finish
+        self.set_running(True)
+        threading.Thread(target=work, daemon=True).start()
+        self.after(POLL_INTERVAL, self.poll_worker)
+
+    def poll_worker(self) -> None:
+        try:
+            success, result = self.worker_results.get_nowait()
+        except queue.Empty:
+            self.show_worker_messages()
+            self.show_progress()
+            self.refresh_preview()
+            self.after(POLL_INTERVAL, self.poll_worker)
+            return
+        self.show_worker_messages()
+        self.show_progress()
+        self.refresh_preview()
+        self.set_running(False)
+        if success:
+            self.worker_finish(result)
+        elif isinstance(result, Cancelled):
+            self.progress_status.set("Cancelled")
+        elif isinstance(result, StepOrderViolated):
+            logging.error(
+                "Something went wrong.\nPerhaps you didn't run step 1 before step 2"
+            )
+        else:
+            raise result
+
+    def show_worker_messages(self) -> None:
+        while True:
+            try:
+                show_message = _worker_messages.get_nowait()
+            except queue.Empty:
                 return
-            self.make_preview()
+            show_message()
+
+    def show_progress(self) -> None:
+        if not self.progress:
+            return
+        done = self.progress.done
+        total = max(self.progress.total, done)
+        self.progress_bar.configure(maximum=max(total, 1), value=done)
+        status = f"{done} / {total} references, {self.progress.throughput():.0f}/s"
+        eta = self.progress.eta()
+        if eta is not None:
+            minutes, seconds = divmod(int(eta), 60)
+            status += f", {minutes}:{seconds:02} left"
+        self.progress_status.set(status)
+
+    def set_running(self, running: bool) -> None:
+        self.running = running
+        for button in self.run_buttons:
+            button.configure(state="disabled" if running else "normal")
+        self.cancel_button.configure(state="normal" if running else "disabled")
+
+    def cancel_command(self) -> None:
+        if self.progress:
+            self.progress.cancel()
+            self.progress_status.set("Cancelling...")
 
     def input_has_html_extension(self) -> bool:
-        _, ext = os.path.splitext(self.input_file.get())
-        return ext.startswith(".htm")
+        return plain_extension(self.input_file.get()).startswith(".htm")
 
     def create_preview_frame(self) -> None:
         self.preview_frame = ttk.LabelFrame(self, text="Preview")
         self.preview_frame.rowconfigure(1, weight=1)
         self.preview_frame.columnconfigure(0, weight=1)
 
+        preview_options = ttk.Frame(self.preview_frame)
+        preview_options.grid(row=0, column=0, sticky="w")
         self.make_rendered = tk.BooleanVar(value=False)
         ttk.Checkbutton(
-            self.preview_frame,
+            preview_options,
             text="Preview rendered",
             variable=self.make_rendered,
             command=self.switch_preview,
-        ).grid(row=0, column=0, sticky="w")
+        ).pack(side=tk.LEFT)
+        self.live = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            preview_options,
+            text="Live update",
+            variable=self.live,
+            command=self.live_switched,
+        ).pack(side=tk.LEFT)
 
         self.plain_preview = ttk.Frame(self.preview_frame)
         self.plain_preview.rowconfigure(0, weight=1)
@@ -315,11 +786,12 @@ class FmtGui(ttk.Frame):
         self.preview = tk.Text(self.plain_preview, height=15, width=30, wrap="none")
         self.preview.grid(row=0, column=0, sticky="nsew")
 
-        yscroll = ttk.Scrollbar(
-            self.plain_preview, orient="vertical", command=self.preview.yview
+        # the scrollbar spans the whole output, the text shows a window of it
+        self.preview_yscroll = ttk.Scrollbar(
+            self.plain_preview, orient="vertical", command=self.scroll_preview
         )
-        self.preview.config(yscrollcommand=yscroll.set)
-        yscroll.grid(row=0, column=1, sticky="nsew")
+        self.preview.config(yscrollcommand=self.on_preview_scroll)
+        self.preview_yscroll.grid(row=0, column=1, sticky="nsew")
 
         xscroll = ttk.Scrollbar(
             self.plain_preview, orient="horizontal", command=self.preview.xview
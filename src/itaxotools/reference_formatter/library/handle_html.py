@@ -1,46 +1,56 @@
 #!/usr/bin/env python3
 
+import bisect
+import functools
 import html
 import itertools
 import logging
-from typing import Tuple, Optional, NamedTuple, Iterator, List
+import tempfile
+from typing import (
+    Dict,
+    Tuple,
+    Optional,
+    NamedTuple,
+    Iterable,
+    Iterator,
+    List,
+    TextIO,
+    TypeVar,
+    Union,
+)
 
 import regex
 
 from .utils import normalize_space
 
 
+_OPEN_TAG_REGEX = regex.compile(r"<\s*(\w+)[^>]*>", flags=regex.IGNORECASE)
+_DECORATION_REGEX = regex.compile(r"<\s*(\w+)[^>]*>")
+_TAG_NAME_REGEX = regex.compile(r"\s*<\s*(\w+)")
+_ANY_TAG_REGEX = regex.compile(r"<[^>]*>")
+_TAG_TOKEN_REGEX = regex.compile(r"<\s*(/?\w+)[^>]*>")
+
+
 class TagPosition(NamedTuple):
     start: int
     end: int
 
 
-class LocatedTag(NamedTuple):
-    name: str
-    position: TagPosition
+@functools.lru_cache(maxsize=None)
+def _tag_regex(tag: str) -> regex.Pattern:
+    return regex.compile(r"<\s*" + tag + r"[^>]*>", flags=regex.IGNORECASE)
 
 
 def _find_tag(input: str, tag: str) -> Optional[TagPosition]:
-    tag_match = regex.search(r"<\s*" + tag + r"[^>]*>", input, flags=regex.IGNORECASE)
+    tag_match = _tag_regex(tag).search(input)
     if tag_match:
         return TagPosition(tag_match.start(), tag_match.end())
     else:
         return None
 
 
-def _next_tag(input: str) -> Optional[LocatedTag]:
-    tag_match = regex.search(r"<\s*(\w+)[^>]*>", input, flags=regex.IGNORECASE)
-    if tag_match:
-        return LocatedTag(
-            tag_match.group(1).casefold(),
-            TagPosition(tag_match.start(), tag_match.end()),
-        )
-    else:
-        return None
-
-
 def _close_tag(tag: str) -> str:
-    tag_name_match = regex.match(r"\s*<\s*(\w+)", tag)
+    tag_name_match = _TAG_NAME_REGEX.match(tag)
     if not tag_name_match:
         raise ValueError(f"{tag} is not an opening tag")
     return "</" + tag_name_match.group(1) + ">"
@@ -57,7 +67,7 @@ class ListEntry(NamedTuple):
     @staticmethod
     def construct(entry: str) -> "ListEntry":
         entry = normalize_space(entry.strip())
-        decoration_open_match = regex.match(r"<\s*(\w+)[^>]*>", entry)
+        decoration_open_match = _DECORATION_REGEX.match(entry)
         if decoration_open_match:
             entry = entry[decoration_open_match.end() :]
             tag_name = decoration_open_match.group(1)
@@ -86,40 +96,29 @@ class HTMLList:
 
     def __init__(self, document: str):
         self._input = document
+        self._start = 0
+        self._end = len(document)
         self._separate_preamble()
         self._detect_list_type()
+        self._scanner = _TagScanner(self._input, self._start, self._end)
 
     def __iter__(self) -> Iterator[ListEntry]:
         return self
 
     def __next__(self) -> ListEntry:
-        if self._list_type == HTMLList.PARAGRAPHS:
-            return self._paragraphs_next()
-        else:
-            return self._list_next()
+        split = _split_entry(self._scanner, self._start, self._list_type, True)
+        assert split is not None
+        if split.content is None:
+            raise StopIteration
+        self._start = split.end
+        return ListEntry.construct(split.content)
 
     def assemble_html(self, list: Iterator[ListEntry]) -> Iterator[str]:
         """
         Puts list entries in `list` back into the input html
         """
         yield self.preamble
-        if self._list_type == HTMLList.UNORDERED:
-            list_tag: Optional[str] = "<ul>"
-        elif self._list_type == HTMLList.ORDERED:
-            list_tag = "<ol>"
-        else:
-            list_tag = None
-        if list_tag:
-            yield "\t" * 2 + list_tag
-        for entry in list:
-            if list_tag:
-                yield "\t" * 3 + "<li>"
-            yield "\t" * 4 + entry.to_str()
-            if list_tag:
-                yield "\t" * 3 + "</li>"
-        if list_tag:
-            yield "\t" * 2 + _close_tag(list_tag)
-        yield "\t</body>\n</html>"
+        yield from _assemble_list(self._list_type, list)
 
     def _separate_preamble(self) -> None:
         located_body = _find_tag(self._input, "body")
@@ -127,111 +126,392 @@ class HTMLList:
             self.preamble = ""
             return
         self.preamble = self._input[: located_body.end]
-        self._input = self._input[located_body.end :]
-        located_body_end = _find_tag(self._input, "/body")
+        self._start = located_body.end
+        located_body_end = _search_tag(self._input, "/body", self._start, self._end)
         if located_body_end:
-            self._input = self._input[: located_body_end.start]
+            self._end = located_body_end.start
 
     def _detect_list_type(self) -> None:
-        first_body_tag = _next_tag(self._input)
-        if not first_body_tag:
+        list_start = _find_list_start(self._input, self._start, self._end)
+        if not list_start:
             logging.error("Can't detect the structure of the reference list")
             raise ValueError("Can't detect the structure of the reference list")
-        if first_body_tag.name == "ul":
-            self._list_type = HTMLList.UNORDERED
-        elif first_body_tag.name == "ol":
-            self._list_type = HTMLList.ORDERED
-        elif first_body_tag.name == "p":
-            self._list_type = HTMLList.PARAGRAPHS
+        self._list_type, self._start = list_start
+
+
+# size of the chunks, in which `HTMLListReader.read` reads the input
+CHUNK_SIZE = 1 << 16
+
+# preambles larger than this are spooled to a temporary file
+PREAMBLE_MAX_MEMORY = 1 << 20
+
+_LIST_TYPES = {
+    "ul": HTMLList.UNORDERED,
+    "ol": HTMLList.ORDERED,
+    "p": HTMLList.PARAGRAPHS,
+}
+
+
+class _Split(NamedTuple):
+    # content of the next entry, None if there is no entry
+    content: Optional[str]
+    # position, where the rest of the input starts
+    end: int
+
+
+def _search_tag(input: str, tag: str, start: int, end: int) -> Optional[TagPosition]:
+    tag_match = _tag_regex(tag).search(input, start, end)
+    if tag_match:
+        return TagPosition(tag_match.start(), tag_match.end())
+    else:
+        return None
+
+
+def _pending_tag_start(input: str) -> int:
+    """
+    Returns the start of a tag, that is not closed at the end of `input`,
+    or the length of `input`
+    """
+    pending = input.find("<", input.rfind(">") + 1)
+    return len(input) if pending < 0 else pending
+
+
+def _find_list_start(input: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """
+    Returns the type of the list and the position of its first tag
+    """
+    for tag_match in _OPEN_TAG_REGEX.finditer(input, start, end):
+        list_type = _LIST_TYPES.get(tag_match.group(1).casefold())
+        if list_type is not None:
+            return list_type, tag_match.start()
+    return None
+
+
+class _TagScanner:
+    """
+    Searches for tags in `input[start:end]` going forward.
+
+    The input is tokenized once and the search for each tag continues
+    from the previous result, so a sequence of searches for the same tag
+    with non-decreasing start positions takes linear time.
+    """
+
+    def __init__(self, input: str, start: int, end: int):
+        self.input = input
+        self.end = end
+        # a token starts at every "<" that begins a tag,
+        # including a "<" inside of another tag
+        self._tokens = _TAG_TOKEN_REGEX.finditer(input, start, end, overlapped=True)
+        self._found: List[Tuple[str, TagPosition]] = []
+        self._next: Dict[str, int] = {}
+
+    def find(self, tag: str, start: int) -> Optional[TagPosition]:
+        """
+        Same as `_search_tag(self.input, tag, start, self.end)`
+        """
+        i = self._next.get(tag, 0)
+        while True:
+            if i == len(self._found):
+                token = next(self._tokens, None)
+                if token is None:
+                    self._next[tag] = i
+                    return None
+                self._found.append(
+                    (token.group(1).lower(), TagPosition(token.start(), token.end()))
+                )
+            name, position = self._found[i]
+            if position.start >= start and name.startswith(tag):
+                self._next[tag] = i
+                return position
+            i += 1
+
+
+def _split_entry(
+    scanner: _TagScanner, start: int, list_type: int, complete: bool
+) -> Optional[_Split]:
+    """
+    Finds the next list entry in the input of `scanner`, starting from `start`.
+
+    If the input is not `complete`, None is returned, when the end
+    of the entry is not known yet.
+    If there is no entry, `end` is the end of the input, that can be skipped.
+    """
+    input = scanner.input
+    if list_type == HTMLList.PARAGRAPHS:
+        open_tag, close_tag = "p", "/p"
+    else:
+        open_tag, close_tag = "li", "/li"
+    opening = scanner.find(open_tag, start)
+    if not opening:
+        return _Split(None, scanner.end)
+    # paragraphs keep their tags, list items don't
+    content_start = opening.start if list_type == HTMLList.PARAGRAPHS else opening.end
+    closing = scanner.find(close_tag, opening.end)
+    if closing:
+        if list_type == HTMLList.PARAGRAPHS:
+            return _Split(input[content_start : closing.end], closing.end)
         else:
-            self._input = self._input[first_body_tag.position.end :]
-            self._detect_list_type()
+            return _Split(input[content_start : closing.start], closing.end)
+    if not complete:
+        # the closing tag can still come later
+        return None
+    next_opening = scanner.find(open_tag, opening.end)
+    if next_opening:
+        return _Split(input[content_start : next_opening.start], next_opening.start)
+    if list_type == HTMLList.PARAGRAPHS:
+        return _Split(input[content_start : scanner.end], scanner.end)
+    end_list_tag = scanner.find(
+        "/ul" if list_type == HTMLList.UNORDERED else "/ol", opening.end
+    )
+    if end_list_tag:
+        return _Split(input[content_start : end_list_tag.start], scanner.end)
+    return _Split(input[content_start : scanner.end], scanner.end)
 
-    def _list_next(self) -> ListEntry:
-        li_tag = _find_tag(self._input, "li")
-        if not li_tag:
-            raise StopIteration
-        self._input = self._input[li_tag.end :]
-        close_li_tag = _find_tag(self._input, "/li")
-        next_li_tag = _find_tag(self._input, "li")
-        if not close_li_tag and not next_li_tag:
-            if self._list_type == HTMLList.UNORDERED:
-                end_list_tag = _find_tag(self._input, "/ul")
-            elif self._list_type == HTMLList.ORDERED:
-                end_list_tag = _find_tag(self._input, "/ol")
+
+# indentation of the lines of list entries in the assembled html
+ENTRY_INDENT = "\t" * 4
+
+T = TypeVar("T")
+
+
+def _list_layout(list_type: int, list: Iterable[T]) -> Iterator[Union[str, T]]:
+    """
+    Yields the lines of the assembled list, with the entries of `list`
+    in place of their lines
+    """
+    if list_type == HTMLList.UNORDERED:
+        list_tag: Optional[str] = "<ul>"
+    elif list_type == HTMLList.ORDERED:
+        list_tag = "<ol>"
+    else:
+        list_tag = None
+    if list_tag:
+        yield "\t" * 2 + list_tag
+    for entry in list:
+        if list_tag:
+            yield "\t" * 3 + "<li>"
+        yield entry
+        if list_tag:
+            yield "\t" * 3 + "</li>"
+    if list_tag:
+        yield "\t" * 2 + _close_tag(list_tag)
+    yield "\t</body>\n</html>"
+
+
+def _assemble_list(list_type: int, list: Iterable[ListEntry]) -> Iterator[str]:
+    for line in _list_layout(list_type, list):
+        if isinstance(line, ListEntry):
+            yield ENTRY_INDENT + line.to_str()
+        else:
+            yield line
+
+
+class HTMLListReader:
+    """
+    Incremental version of `HTMLList`, that is fed the document in chunks.
+
+    List entries are returned as soon as they are closed,
+    so only the current entry is kept in memory.
+    The preamble is spooled to a temporary file, when it is large.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._preamble = tempfile.SpooledTemporaryFile(
+            max_size=PREAMBLE_MAX_MEMORY, mode="w+", encoding="utf-8", newline=""
+        )
+        self._in_body = False
+        # the end of the body has been seen or the input is closed
+        self._complete = False
+        # length of the buffer that has been checked for the end of the body
+        self._scanned = 0
+        self._list_type: Optional[int] = None
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[ListEntry]:
+        """
+        Reads the next chunk of the document and returns completed list entries
+        """
+        if self._complete:
+            return []
+        self._buffer += chunk
+        if not self._in_body:
+            self._find_body()
+        if self._in_body:
+            self._find_body_end()
+        return self._entries()
+
+    def close(self) -> List[ListEntry]:
+        """
+        Signals the end of the document and returns the remaining list entries
+        """
+        if not self._in_body:
+            # there is no <body>, so the whole document is the list
+            self._preamble.seek(0)
+            self._buffer = self._preamble.read() + self._buffer
+            self._preamble.seek(0)
+            self._preamble.truncate()
+            self._in_body = True
+        self._complete = True
+        entries = self._entries()
+        if self._list_type is None:
+            logging.error("Can't detect the structure of the reference list")
+            raise ValueError("Can't detect the structure of the reference list")
+        return entries
+
+    def read(self, input: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[ListEntry]:
+        """
+        Feeds the whole `input` to the reader and yields the list entries
+        """
+        return self.read_chunks(iter(lambda: input.read(chunk_size), ""))
+
+    def read_chunks(self, chunks: Iterable[str]) -> Iterator[ListEntry]:
+        """
+        Feeds all `chunks` of the document to the reader and yields the list entries
+        """
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
+
+    def assemble_html(self, list: Iterable[ListEntry]) -> Iterator[str]:
+        """
+        Puts list entries in `list` back into the input html.
+
+        Unlike `HTMLList.assemble_html` yields pieces of text to be written
+        as they are, since the preamble is copied in chunks.
+        `list` should be produced from this reader.
+        """
+        for piece in self.layout(list):
+            if isinstance(piece, ListEntry):
+                yield ENTRY_INDENT + piece.to_str() + "\n"
             else:
-                assert False
-            if end_list_tag:
-                entry_content = self._input[: end_list_tag.start]
+                yield piece
+
+    def layout(self, list: Iterable[T]) -> Iterator[Union[str, T]]:
+        """
+        Same as `assemble_html`, but the items of `list` are yielded as they are
+        in place of the lines of the entries, without the indentation
+        and the line end.
+
+        `list` should have an item for each entry produced from this reader.
+        """
+        items = iter(list)
+        # the structure of the list is known after the first entry is read
+        first_item = next(items, None)
+        assert self._list_type is not None
+        self._preamble.seek(0)
+        while True:
+            chunk = self._preamble.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield "\n"
+        if first_item is not None:
+            items = itertools.chain([first_item], items)
+        for line in _list_layout(self._list_type, items):
+            if isinstance(line, str):
+                yield line + "\n"
             else:
-                entry_content = self._input
-            return ListEntry.construct(entry_content)
-        if close_li_tag:
-            entry_content = self._input[: close_li_tag.start]
-            self._input = self._input[close_li_tag.end :]
-        elif next_li_tag:
-            entry_content = self._input[: next_li_tag.start]
-            self._input = self._input[next_li_tag.start :]
+                yield line
+        self._preamble.close()
+
+    def _find_body(self) -> None:
+        # a tag can be found only when its closing ">" has been read
+        end = _pending_tag_start(self._buffer)
+        located_body = _search_tag(self._buffer, "body", 0, end)
+        if located_body:
+            end = located_body.end
+            self._in_body = True
+        self._preamble.write(self._buffer[:end])
+        self._buffer = self._buffer[end:]
+
+    def _find_body_end(self) -> None:
+        end = _pending_tag_start(self._buffer)
+        located_body_end = _search_tag(self._buffer, "/body", self._scanned, end)
+        if located_body_end:
+            self._buffer = self._buffer[: located_body_end.start]
+            self._complete = True
         else:
-            assert False
-        return ListEntry.construct(entry_content)
-
-    def _paragraphs_next(self) -> ListEntry:
-        p_tag = _find_tag(self._input, "p")
-        if not p_tag:
-            raise StopIteration
-        p_description = self._input[p_tag.start : p_tag.end]
-        self._input = self._input[p_tag.end :]
-        close_p_tag = _find_tag(self._input, "/p")
-        next_p_tag = _find_tag(self._input, "p")
-        if close_p_tag:
-            entry_content = p_description + self._input[: close_p_tag.end]
-            self._input = self._input[close_p_tag.end :]
-        elif next_p_tag:
-            entry_content = p_description + self._input[: next_p_tag.start]
-            self._input = self._input[next_p_tag.start :]
+            self._scanned = max(self._scanned, end)
+
+    def _drop(self, length: int) -> None:
+        self._buffer = self._buffer[length:]
+        self._scanned = max(0, self._scanned - length)
+
+    def _entries(self) -> List[ListEntry]:
+        if not self._in_body or self._finished:
+            return []
+        end = len(self._buffer) if self._complete else _pending_tag_start(self._buffer)
+        if self._list_type is None:
+            list_start = _find_list_start(self._buffer, 0, end)
+            if not list_start:
+                self._drop(end)
+                return []
+            self._list_type, start = list_start
         else:
-            entry_content = p_description + self._input
-            self._input = ""
-        return ListEntry.construct(entry_content)
+            start = 0
+        scanner = _TagScanner(self._buffer, start, end)
+        entries: List[ListEntry] = []
+        while True:
+            split = _split_entry(scanner, start, self._list_type, self._complete)
+            if split is None:
+                break
+            start = split.end
+            if split.content is None:
+                if self._complete:
+                    self._finished = True
+                break
+            entries.append(ListEntry.construct(split.content))
+        self._drop(len(self._buffer) if self._finished else start)
+        return entries
 
 
 class ExtractedTags:
+    """
+    Tags extracted from a string with their positions in the text without tags
+    """
+
     def __init__(self, parts: List[str], tags: List[str]):
-        self._tags: List[Tuple[int, str]] = list(zip(map(len, parts), tags))
+        self._tags = tags
+        # position of each tag in the text
+        self._offsets: List[int] = list(itertools.accumulate(map(len, parts[:-1])))
+        # tags that are open after each tag
+        self._open_tags: List[Tuple[str, ...]] = []
+        opened_tags: Tuple[str, ...] = ()
+        for tag in tags:
+            if not is_closing(tag):
+                opened_tags = opened_tags + (tag,)
+            elif opened_tags:
+                opened_tags = opened_tags[:-1]
+            self._open_tags.append(opened_tags)
 
     def surround_tags(self, s: str, offset: int) -> str:
-        opened_tags: List[str] = []
-        for tag_offset, tag in self._tags:
-            if tag_offset > offset:
-                break
-            if is_closing(tag):
-                if opened_tags:
-                    opened_tags.pop()
-            else:
-                opened_tags.append(tag)
+        """
+        Surrounds `s` with the tags that are open at `offset`
+        """
+        tag_count = bisect.bisect_right(self._offsets, offset)
+        if not tag_count:
+            return s
+        opened_tags = self._open_tags[tag_count - 1]
         return "".join(
             itertools.chain(opened_tags, [s], map(_close_tag, reversed(opened_tags)))
         )
 
     def insert_tags(self, s: str, offset: int) -> str:
-        if not self._tags:
+        """
+        Inserts the tags that are inside of `s`, which starts at `offset`
+        """
+        first = bisect.bisect_left(self._offsets, offset)
+        last = bisect.bisect_right(self._offsets, offset + len(s))
+        if first == last:
             return s
-        total_offset = -offset
         parts: List[str] = []
-        for tag_offset, tag in self._tags:
-            if total_offset + tag_offset < 0:
-                total_offset += tag_offset
-                continue
-            if total_offset + tag_offset > len(s):
-                break
-            part_start = total_offset if total_offset >= 0 else 0
-            parts.append(html.escape(s[part_start : total_offset + tag_offset]))
+        part_start = 0
+        for tag_offset, tag in zip(self._offsets[first:last], self._tags[first:last]):
+            parts.append(html.escape(s[part_start : tag_offset - offset]))
             parts.append(tag)
-            total_offset += tag_offset
-        if total_offset < 0:
-            return s
-        parts.append(s[total_offset:])
+            part_start = tag_offset - offset
+        parts.append(s[part_start:])
         return "".join(parts)
 
 
@@ -240,8 +520,7 @@ def extract_tags(s: str) -> Tuple[str, ExtractedTags]:
     Returns HTML-unescaped string without tags
     and an object containing extracted tags with their positions
     """
-    tag_regex = regex.compile(r"<[^>]*>")
-    tags: List[str] = list(map(lambda m: m.group(), regex.finditer(tag_regex, s)))
-    parts: List[str] = list(map(html.unescape, regex.splititer(tag_regex, s)))
+    tags: List[str] = list(map(lambda m: m.group(), _ANY_TAG_REGEX.finditer(s)))
+    parts: List[str] = list(map(html.unescape, _ANY_TAG_REGEX.splititer(s)))
     assert parts
     return ("".join(parts), ExtractedTags(parts, tags))
@@ -11,8 +11,10 @@ class Journal:
     def __init__(
         self,
         name: Dict[NameForm, str],
+        row: Optional[int] = None,
     ):
         self.name = name
+        self.row = row
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, Journal):
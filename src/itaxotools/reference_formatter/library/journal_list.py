@@ -2,16 +2,25 @@
 
 import sys
 import os
-from typing import Tuple, List, Dict, Optional
+import hashlib
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple, List, Dict, Iterable, Iterator, Optional, Union
 from enum import IntEnum
 
-import pandas as pd
 from ahocorasick_rs import AhoCorasick, MATCHKIND_LEFTMOST_LONGEST
 
+from .cache import default_cache_path
 from .utils import *
 from .positioned import PositionedString
 from .resources import get_resource
 
+if TYPE_CHECKING:
+    # pandas is only needed to build the journal index
+    import pandas as pd
+
 
 class NameForm(IntEnum):
     FullName = 0
@@ -31,23 +40,160 @@ class NameForm(IntEnum):
 N_NAME_FORMS = len(NameForm)
 
 
-class JournalMatcher:
-    def __init__(self) -> None:
-        self.table, self.matcher = make_matcher(fill_missing(load()))
+# change when the format of the journal index or the normalization of the names change
+INDEX_FORMAT = 1
+
+# magic, format, version of the journal table and number of names
+_INDEX_HEADER = struct.Struct("=4sI8sI")
+_INDEX_MAGIC = b"RFJI"
+
+
+class JournalIndex:
+    """
+    Names of the journals in every `NameForm`, row by row, in a single buffer.
+
+    The buffer consists of a header, the offsets of the names
+    and the names encoded in UTF-8.
+    When it's mapped from a file, processes share one copy of it,
+    and forked processes don't copy it, since it contains no Python objects.
+    """
+
+    def __init__(
+        self, buffer: Union[bytes, mmap.mmap], path: Optional[Path] = None
+    ) -> None:
+        if len(buffer) < _INDEX_HEADER.size:
+            raise ValueError("Journal index is truncated")
+        magic, format, version, count = _INDEX_HEADER.unpack_from(buffer)
+        if magic != _INDEX_MAGIC or format != INDEX_FORMAT:
+            raise ValueError("Unknown format of the journal index")
+        names_start = _INDEX_HEADER.size + 4 * (count + 1)
+        if len(buffer) < names_start:
+            raise ValueError("Journal index is truncated")
+        view = memoryview(buffer)
+        self._offsets = view[_INDEX_HEADER.size : names_start].cast("I")
+        self._names = view[names_start:]
+        if len(self._names) != self._offsets[-1]:
+            raise ValueError("Journal index is truncated")
+        self.version = version.hex()
+        self.path = path
+
+    @staticmethod
+    def build(names: Iterable[str], version: str) -> bytes:
+        """
+        Returns the buffer of an index of `names`
+        for the journal table with `version`
+        """
+        data = bytearray()
+        offsets = array("I", [0])
+        for name in names:
+            data += name.encode()
+            offsets.append(len(data))
+        header = _INDEX_HEADER.pack(
+            _INDEX_MAGIC, INDEX_FORMAT, bytes.fromhex(version), len(offsets) - 1
+        )
+        return header + offsets.tobytes() + data
+
+    @classmethod
+    def open(cls, path: Path) -> "JournalIndex":
+        """
+        Maps the index at `path` read-only
+        """
+        with open(path, mode="rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def name(self, i: int) -> str:
+        return str(self._names[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+    def names(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.name(i)
+
+    def row(self, row: int) -> List[str]:
+        start = row * N_NAME_FORMS
+        return [self.name(i) for i in range(start, start + N_NAME_FORMS)]
+
+
+def default_index_path(version: str) -> Path:
+    return default_cache_path().with_name(f"journals-{version}.idx")
+
+
+def load_index(path: Path, version: str) -> JournalIndex:
+    """
+    Maps the journal index at `path`, after building it,
+    if it's missing or it's built from another version of the journal table.
+    If the index can't be written, it's kept in memory.
+    """
+    try:
+        index = JournalIndex.open(path)
+        if index.version == version:
+            return index
+    except (OSError, ValueError):
+        pass
+    buffer = JournalIndex.build(table_names(make_table(fill_missing(load()))), version)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # another process may be loading the same index
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}")
+        temporary_path.write_bytes(buffer)
+        os.replace(temporary_path, path)
+        return JournalIndex.open(path)
+    except OSError:
+        return JournalIndex(buffer)
 
-    def extract_journal(self, s: str) -> Optional[Tuple[Dict[NameForm, str], slice]]:
+
+class JournalMatcher:
+    """
+    Finds the names of journals in the journal table.
+
+    The names are read from a `JournalIndex` in the cache directory
+    or at `index_path`, which is built on first use.
+    Only the path is pickled, so that workers map the same index.
+    """
+
+    def __init__(self, index_path: Optional[Union[str, Path]] = None) -> None:
+        self.version = table_version()
+        if index_path is None:
+            index_path = default_index_path(self.version)
+        self.index = load_index(Path(index_path), self.version)
+        self.matcher = AhoCorasick(
+            list(self.index.names()), matchkind=MATCHKIND_LEFTMOST_LONGEST
+        )
+
+    def __reduce__(self) -> Tuple[type, Tuple[Optional[Path]]]:
+        return JournalMatcher, (self.index.path,)
+
+    def find_journal(self, s: str) -> Optional[Tuple[int, slice]]:
+        """
+        Returns the row of the journal table and the span of the journal name in `s`
+        """
         matches = self.matcher.find_matches_as_indexes(s)
         if not matches:
             return None
         match_num, _, _ = matches[-1]
-        journal_names = dict(self.table.iloc[match_num // N_NAME_FORMS])
-        journal_name = journal_names[NameForm(match_num % N_NAME_FORMS)]
+        row = match_num // N_NAME_FORMS
+        journal_name = self.index.name(match_num)
         start = s.index(journal_name)
         end = start + len(journal_name)
-        return journal_names, slice(start, end)
+        return row, slice(start, end)
+
+    def journal_names(self, row: int) -> Dict[NameForm, str]:
+        return dict(zip(NameForm, self.index.row(row)))
+
+    def extract_journal(self, s: str) -> Optional[Tuple[Dict[NameForm, str], slice]]:
+        found = self.find_journal(s)
+        if not found:
+            return None
+        row, span = found
+        return self.journal_names(row), span
 
 
-def load() -> pd.DataFrame:
+def load() -> "pd.DataFrame":
+    import pandas as pd
+
     path = get_resource("Journal_abbreviations.csv")
 
     return pd.read_table(path, dtype=str).rename(
@@ -59,26 +205,38 @@ def load() -> pd.DataFrame:
     )
 
 
-def fill_missing(table: pd.DataFrame) -> pd.DataFrame:
+def table_version() -> str:
+    """
+    Returns a digest of the journal table, that changes when the table is edited
+    """
+    with open(get_resource("Journal_abbreviations.csv"), mode="rb") as file:
+        return hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+
+
+def fill_missing(table: "pd.DataFrame") -> "pd.DataFrame":
     table.dropna(how="all", inplace=True)
     table.fillna(axis=1, method="ffill", inplace=True)
     return table
 
 
-def make_matcher(table: pd.DataFrame) -> Tuple[pd.DataFrame, AhoCorasick]:
+def make_table(table: "pd.DataFrame") -> "pd.DataFrame":
     # normalize spaces
     table = table.applymap(normalize_space)
     # make sure there are spaces after every period in abbrev_period
     table[NameForm.WithPeriods] = table[NameForm.WithPeriods].str.replace(
-        r"\.(?=\S)", ". "
+        r"\.(?=\S)", ". ", regex=True
     )
     # create column with for abbreviations with no spaces after the period
     table[NameForm.WithPeriodsNoSpace] = table[NameForm.WithPeriods].str.replace(
-        r"\.\s", "."
+        r"\.\s", ".", regex=True
     )
     # confirm columns order
-    table = table[list(NameForm)]
-    patterns: List[str] = []
-    for _, row in table.iterrows():
-        patterns.extend(row)
-    return (table, AhoCorasick(patterns, matchkind=MATCHKIND_LEFTMOST_LONGEST))
+    return table[list(NameForm)]
+
+
+def table_names(table: "pd.DataFrame") -> Iterator[str]:
+    """
+    Yields the names of the journals row by row
+    """
+    for row in table.itertuples(index=False):
+        yield from row
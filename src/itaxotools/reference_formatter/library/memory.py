@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional
+
+MIB = 1 << 20
+
+# number of allocation sites reported by default
+DEFAULT_TOP = 5
+
+
+class AllocationSite(NamedTuple):
+    location: str
+    size: int
+    count: int
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+class MemoryProfile:
+    """
+    Peak and retained memory of a stage, traced by `tracemalloc`.
+
+    Only the memory allocated through Python is traced, which excludes
+    the internal memory of extension modules, like the automaton of
+    the journal matcher.
+    """
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.peak = 0
+        self.retained = 0
+        self.sites: List[AllocationSite] = []
+
+    def check(self, budget: float) -> None:
+        """
+        Raises `MemoryBudgetExceeded`, if the peak is over `budget` MiB
+        """
+        if self.peak > budget * MIB:
+            raise MemoryBudgetExceeded(
+                f"{self.stage}: peak of {self.peak / MIB:.1f} MiB"
+                f" is over the budget of {budget:.1f} MiB"
+            )
+
+    def report(self) -> str:
+        """
+        Returns the peak, the retained memory and the largest allocation sites
+        """
+        lines = [
+            f"{self.stage}: peak {self.peak / MIB:.1f} MiB,"
+            f" retained {self.retained / MIB:.1f} MiB"
+        ]
+        for site in self.sites:
+            lines.append(
+                f"  {site.size / MIB:8.1f} MiB {site.count:9} blocks  {site.location}"
+            )
+        return "\n".join(lines)
+
+
+def _allocation_sites(
+    snapshot: tracemalloc.Snapshot, base: Optional[tracemalloc.Snapshot], top: int
+) -> List[AllocationSite]:
+    # the snapshots themselves are left out
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    snapshot = snapshot.filter_traces(filters)
+    sites: List[AllocationSite] = []
+    if base is None:
+        for statistic in snapshot.statistics("lineno")[:top]:
+            frame = statistic.traceback[0]
+            sites.append(
+                AllocationSite(
+                    f"{frame.filename}:{frame.lineno}", statistic.size, statistic.count
+                )
+            )
+    else:
+        # only the memory allocated since `base` is reported
+        base = base.filter_traces(filters)
+        for diff in snapshot.compare_to(base, "lineno")[:top]:
+            frame = diff.traceback[0]
+            sites.append(
+                AllocationSite(
+                    f"{frame.filename}:{frame.lineno}", diff.size_diff, diff.count_diff
+                )
+            )
+    return sites
+
+
+@contextmanager
+def profile_memory(
+    stage: str, top: int = DEFAULT_TOP, frames: int = 1
+) -> Iterator[MemoryProfile]:
+    """
+    Traces the memory allocated in the context.
+
+    The peak and the retained memory are relative to the memory traced
+    before the context, and the allocation sites are those of the memory,
+    that is still allocated at its end.
+    Tracing is started with `frames` per traceback, unless it's already on.
+    """
+    profile = MemoryProfile(stage)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+        base = None
+    else:
+        base = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        yield profile
+        current, peak = tracemalloc.get_traced_memory()
+        profile.peak = peak - start
+        profile.retained = current - start
+        if top:
+            profile.sites = _allocation_sites(tracemalloc.take_snapshot(), base, top)
+    finally:
+        if started:
+            tracemalloc.stop()
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
-from typing import Tuple, Dict, Any, Set
+from typing import Tuple, Dict, Any, Set, Optional
 
 from enum import IntEnum, Enum
+import hashlib
 
-from .journal_list import NameForm
+from .journal_list import JournalMatcher, NameForm
 
 
 class InitialsPeriod(IntEnum):
@@ -198,6 +199,7 @@ class Options(Enum):
     KeepNumbering = (bool, "Keep numbering of references")
     RemoveDoi = (bool, "Remove doi")
     CrossrefAPI = (CrossrefMatch, "Retrieve missing DOIs from Crossref")
+    SortReferences = (bool, "Sort references by authors and year")
 
     def __init__(self, type: type, description: str):
         self.type = type
@@ -225,6 +227,7 @@ class Options(Enum):
             Options.KeepNumbering: OptionGroup.Other,
             Options.RemoveDoi: OptionGroup.Other,
             Options.CrossrefAPI: OptionGroup.Other,
+            Options.SortReferences: OptionGroup.Other,
         }[self]
 
 
@@ -240,6 +243,11 @@ primary_options: Set[Options] = {
     Options.ProcessJournalName,
 }
 
+# options, that change only the order of the references, not their format
+order_options: Set[Options] = {
+    Options.SortReferences,
+}
+
 OptionsDict = Dict[Options, Any]
 
 
@@ -253,3 +261,57 @@ def default_options() -> OptionsDict:
         else:
             assert False
     return result
+
+
+def options_digest(options: OptionsDict) -> str:
+    """
+    Returns a stable digest of the options, identifying the format of a reference
+    """
+    description = ",".join(
+        f"{option.name}={int(options[option])}"
+        for option in list(Options)
+        if option in options and option not in order_options
+    )
+    return hashlib.blake2b(description.encode(), digest_size=8).hexdigest()
+
+
+def options_from_json(payload: Dict[str, Any]) -> OptionsDict:
+    """
+    Returns the default options updated with `payload`,
+    which maps names of `Options` to booleans or to names or numbers of their values.
+
+    Raises ValueError, if an option or a value is unknown
+    """
+    result = default_options()
+    for name, value in payload.items():
+        try:
+            option = Options[name]
+        except KeyError:
+            raise ValueError(f"Unknown option: {name}") from None
+        if option.type is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"Option {name} should be true or false")
+            result[option] = value
+        elif isinstance(value, str) and value in option.type.__members__:
+            result[option] = option.type[value]
+        elif isinstance(value, int) and not isinstance(value, bool):
+            try:
+                result[option] = option.type(value)
+            except ValueError:
+                raise ValueError(f"Unknown value of option {name}: {value}") from None
+        else:
+            raise ValueError(f"Unknown value of option {name}: {value}")
+    return result
+
+
+def options_journal_matcher(
+    options: OptionsDict, journal_matcher: Optional[JournalMatcher] = None
+) -> Optional[JournalMatcher]:
+    """
+    Returns the journal matcher, that parses the references for `options`:
+    `journal_matcher` or a new one, if the journal names are processed,
+    otherwise None
+    """
+    if not options[Options.ProcessJournalName]:
+        return None
+    return journal_matcher or JournalMatcher()
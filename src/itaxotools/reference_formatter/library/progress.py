@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from typing import Any, List, Optional
+
+from .crossref import DoiLookup
+
+# how often a waiting DOI lookup checks for cancellation, in seconds
+POLL_INTERVAL = 0.1
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Progress:
+    """
+    Progress of a processing run, shared with the thread that displays it.
+
+    The pipeline calls `advance` after each reference,
+    which raises `Cancelled` after `cancel` has been called.
+    """
+
+    def __init__(self, total: int = 0) -> None:
+        self.total = total
+        self.done = 0
+        self.start_time = time.monotonic()
+        self._cancelled = threading.Event()
+
+    def restart(self, total: int) -> None:
+        """
+        Starts counting the next stage of the run
+        """
+        self.total = total
+        self.done = 0
+        self.start_time = time.monotonic()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """
+        Raises `Cancelled`, if the run has been cancelled
+        """
+        if self._cancelled.is_set():
+            raise Cancelled
+
+    def advance(self, count: int = 1) -> None:
+        self.check()
+        self.done += count
+
+    def throughput(self) -> float:
+        """
+        Returns the number of processed references per second
+        """
+        elapsed = time.monotonic() - self.start_time
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """
+        Returns the estimated remaining time in seconds, if it is known
+        """
+        throughput = self.throughput()
+        if not throughput or self.done >= self.total:
+            return None
+        return (self.total - self.done) / throughput
+
+    def doi_lookup(self, lookup: DoiLookup) -> DoiLookup:
+        """
+        Wraps `lookup`, so that it runs in a background thread,
+        which is abandoned when the run is cancelled
+        """
+
+        def cancellable_lookup(title: str, fuzzy: bool) -> Optional[str]:
+            self.check()
+            outcome: List[Any] = []
+
+            def run() -> None:
+                try:
+                    outcome.append(lookup(title, fuzzy))
+                except Exception as ex:
+                    outcome.append(ex)
+
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            while thread.is_alive():
+                thread.join(POLL_INTERVAL)
+                self.check()
+            if isinstance(outcome[0], Exception):
+                raise outcome[0]
+            return outcome[0]
+
+        return cancellable_lookup
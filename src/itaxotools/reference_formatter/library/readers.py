@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import bz2
+import codecs
+import gzip
+import io
+import locale
+import lzma
+import mmap
+import os
+from typing import IO, Any, Callable, Dict, Iterator, Optional, TextIO, cast
+
+# uncompressed files at least this large are read through a memory map,
+# never if None: the buffered reader of `open` is faster at splitting lines
+# (see benchmarks/bench_readers.py) and doesn't load the whole file either
+MMAP_THRESHOLD: Optional[int] = None
+
+# openers of the compressed files by their magic bytes
+_COMPRESSED: Dict[bytes, Callable[..., IO]] = {
+    b"\x1f\x8b": gzip.open,
+    b"BZh": bz2.open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
+
+COMPRESSED_EXTENSIONS = {".gz", ".bz2", ".xz"}
+
+
+def compression_opener(path: str) -> Optional[Callable[..., IO]]:
+    """
+    Returns the function opening the file, if it's compressed
+    """
+    with open(path, mode="rb") as file:
+        magic = file.read(max(map(len, _COMPRESSED)))
+    for prefix, opener in _COMPRESSED.items():
+        if magic.startswith(prefix):
+            return opener
+    return None
+
+
+def plain_extension(path: str) -> str:
+    """
+    Returns the lowercase extension of the file without the compression,
+    for example ".html" for "list.html.gz"
+    """
+    root, extension = os.path.splitext(path)
+    if extension.lower() in COMPRESSED_EXTENSIONS:
+        _, extension = os.path.splitext(root)
+    return extension.lower()
+
+
+class MappedTextReader(io.TextIOBase):
+    """
+    Text of a memory-mapped file, decoded like by `open` with `errors`.
+
+    The lines are split at the line feeds of the map and decoded one by one,
+    and only the lines with a carriage return go through universal newlines.
+    """
+
+    def __init__(
+        self, path: str, encoding: Optional[str] = None, errors: str = "replace"
+    ):
+        self._file = open(path, mode="rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map: Any = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # an empty file can't be mapped
+            self._map = io.BytesIO()
+        self._encoding = encoding or locale.getpreferredencoding(False)
+        self._errors = errors
+        self._decoder = codecs.getincrementaldecoder(self._encoding)(errors)
+        self._line_iterator = self._iterate_lines()
+        # the rest of a line split at carriage returns
+        self._pending = io.StringIO()
+        # a "\r" at the end of the text of `read`, that can be followed by "\n"
+        self._carriage_return = False
+
+    @property
+    def encoding(self) -> str:  # type: ignore
+        return self._encoding
+
+    @property
+    def errors(self) -> str:  # type: ignore
+        return self._errors
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        if not self.closed:
+            self._map.close()
+            self._file.close()
+        super().close()
+
+    def _iterate_lines(self) -> Iterator[str]:
+        for line in iter(self._map.readline, b""):
+            text = line.decode(self._encoding, self._errors)
+            if "\r" in text:
+                # split and translated with universal newlines like by `open`
+                self._pending = io.StringIO(text, newline=None)
+                yield from self._pending
+            else:
+                yield text
+
+    def __next__(self) -> str:
+        return next(self._line_iterator)
+
+    def __iter__(self) -> Iterator[str]:
+        # the lines are iterated without a call of `__next__` for each
+        return self._line_iterator
+
+    def readline(self, size: Optional[int] = -1) -> str:  # type: ignore
+        return next(self._line_iterator, "")
+
+    def read(self, size: Optional[int] = -1) -> str:
+        """
+        Returns the text of at most `size` bytes, or the rest of the text
+        """
+        # the rest of the split line is returned first
+        rest = self._pending.read()
+        if rest and size is not None and size >= 0:
+            return rest
+        while True:
+            data = self._map.read(-1 if size is None else size)
+            end = not data or size is None or size < 0
+            text = self._decoder.decode(data, final=end)
+            if self._carriage_return:
+                text = "\r" + text
+            self._carriage_return = text.endswith("\r") and not end
+            if self._carriage_return:
+                text = text[:-1]
+            # universal newlines like by `open`
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if text or end:
+                return rest + text
+
+
+def open_input(path: str) -> TextIO:
+    """
+    Opens the input file as text with replaced decoding errors.
+
+    Compressed files are decompressed as they are read
+    and files of at least `MMAP_THRESHOLD` bytes are memory-mapped.
+    """
+    opener = compression_opener(path)
+    if opener:
+        return cast(TextIO, opener(path, mode="rt", errors="replace"))
+    if MMAP_THRESHOLD is not None and os.path.getsize(path) >= MMAP_THRESHOLD:
+        return cast(TextIO, MappedTextReader(path))
+    return open(path, errors="replace")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# number of lines read from the file at once, when all lines are read
+BLOCK_LINES = 4096
+
+
+class ResultStore:
+    """
+    Formatted output stored in a file, with access to lines by their number.
+
+    The output is appended by the processing thread, while other threads
+    read the lines.
+    Edits of the lines are kept in memory as an overlay over the file:
+    each edited line is mapped to the lines, that replace it.
+    Lines added after the end are mapped to the number of lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, mode="w+b")
+        # start of each line in the file, followed by the end of the last line
+        self._offsets = array("q", [0])
+        self._end = 0
+        self._lock = threading.Lock()
+        self.edits: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def append(self, text: str) -> None:
+        """
+        Appends the output text. Only complete lines become available.
+        """
+        data = text.encode()
+        with self._lock:
+            self._file.seek(self._end)
+            self._file.write(data)
+            newline = data.find(b"\n")
+            while newline >= 0:
+                self._offsets.append(self._end + newline + 1)
+                newline = data.find(b"\n", newline + 1)
+            self._end += len(data)
+
+    def finish(self) -> None:
+        """
+        Makes the last line available, if it's not terminated
+        """
+        if self._end > self._offsets[-1]:
+            self.append("\n")
+
+    def original_lines(self, start: int, stop: int) -> List[str]:
+        """
+        Returns the lines from `start` to `stop` without edits
+        """
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        with self._lock:
+            self._file.seek(self._offsets[start])
+            data = self._file.read(self._offsets[stop] - self._offsets[start])
+        return data.decode().split("\n")[:-1]
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        """
+        Returns the lines from `start` to `stop` with edits applied
+        """
+        original = self.original_lines(start, stop)
+        if not self.edits:
+            return original
+        result: List[str] = []
+        for i, line in enumerate(original, start=start):
+            result.extend(self.edits.get(i, [line]))
+        if start <= len(self) < stop:
+            result.extend(self.edits.get(len(self), []))
+        return result
+
+    def edit(self, start: int, stop: int, lines: List[str]) -> None:
+        """
+        Replaces the lines from `start` to `stop`,
+        as returned by `self.lines(start, stop)`, with `lines`
+        """
+        originals: List[Optional[str]] = list(self.original_lines(start, stop))
+        indices = list(range(start, start + len(originals)))
+        if start <= len(self) < stop:
+            indices.append(len(self))
+            originals.append(None)
+        if not indices:
+            return
+        groups = [
+            self.edits.get(i, self._unedited(line))
+            for i, line in zip(indices, originals)
+        ]
+        if len(lines) != sum(map(len, groups)):
+            # lines were added or removed, so the edits can't be attributed
+            # to single lines
+            groups = [lines] + [[]] * (len(indices) - 1)
+        position = 0
+        for i, line, group in zip(indices, originals, groups):
+            edited = lines[position : position + len(group)]
+            position += len(group)
+            if edited == self._unedited(line):
+                self.edits.pop(i, None)
+            else:
+                self.edits[i] = edited
+
+    @staticmethod
+    def _unedited(line: Optional[str]) -> List[str]:
+        return [] if line is None else [line]
+
+    def iter_lines(self) -> Iterator[str]:
+        """
+        Yields all lines with edits applied
+        """
+        for start in range(0, len(self) + 1, BLOCK_LINES):
+            yield from self.lines(start, start + BLOCK_LINES)
+
+    def save(self, outfile: TextIO) -> None:
+        """
+        Writes all lines with edits applied into `outfile`
+        """
+        for start in range(0, len(self) + 1, BLOCK_LINES):
+            lines = self.lines(start, start + BLOCK_LINES)
+            if lines:
+                outfile.write("\n".join(lines))
+                outfile.write("\n")
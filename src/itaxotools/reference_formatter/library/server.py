@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import gc
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import ResultCache, default_cache_path
+from .citation import format_document
+from .journal_list import JournalMatcher
+from .options import Options, OptionsDict, options_from_json, options_journal_matcher
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8737
+
+# largest accepted request body, in bytes
+MAX_REQUEST_SIZE = 64 << 20
+
+# the state of a worker process, that stays warm between requests
+_journal_matcher: Optional[JournalMatcher] = None
+_cache: Optional[ResultCache] = None
+
+
+def _init_worker(journal_matcher: JournalMatcher, use_cache: bool) -> None:
+    global _journal_matcher, _cache
+    _journal_matcher = journal_matcher
+    if use_cache:
+        _cache = ResultCache(default_cache_path())
+
+
+def worker_state() -> Tuple[Optional[JournalMatcher], Optional[ResultCache]]:
+    """
+    Returns the journal matcher and the cache of a worker process of `worker_pool`
+    """
+    return _journal_matcher, _cache
+
+
+def _ping() -> None:
+    pass
+
+
+def _format_request(text: str, options: OptionsDict) -> str:
+    """
+    Formats the reference list `text` in a worker process
+    and returns the output
+    """
+    journal_matcher = options_journal_matcher(options, _journal_matcher)
+    output = "".join(format_document(text, options, journal_matcher, _cache))
+    if _cache:
+        _cache.flush()
+    return output
+
+
+# a request is turned into the input of `_format_request`
+# and its output into the response
+Request = Tuple[str, OptionsDict]
+
+
+def _request_options(request: Dict[str, Any], html: bool) -> OptionsDict:
+    payload = request.get("options", {})
+    if not isinstance(payload, dict):
+        raise ValueError('"options" should be an object')
+    options = options_from_json(payload)
+    # the format is determined by the input
+    options[Options.HtmlFormat] = html
+    return options
+
+
+def _single_request(request: Dict[str, Any]) -> Request:
+    reference = request.get("reference")
+    if not isinstance(reference, str) or "\n" in reference.strip():
+        raise ValueError('"reference" should be a single line of text')
+    return reference, _request_options(request, False)
+
+
+def _single_response(output: str) -> Dict[str, Any]:
+    return {"formatted": output.rstrip("\n")}
+
+
+def _batch_request(request: Dict[str, Any]) -> Request:
+    if isinstance(request.get("text"), str) and "html" not in request:
+        return request["text"], _request_options(request, False)
+    elif isinstance(request.get("html"), str) and "text" not in request:
+        return request["html"], _request_options(request, True)
+    else:
+        raise ValueError('Either "text" or "html" should be given')
+
+
+def _batch_response(output: str) -> Dict[str, Any]:
+    return {"output": output}
+
+
+# request parser and response builder for each endpoint
+_ENDPOINTS: Dict[
+    str, Tuple[Callable[[Dict[str, Any]], Request], Callable[[str], Dict[str, Any]]]
+] = {
+    "/format": (_single_request, _single_response),
+    "/batch": (_batch_request, _batch_response),
+}
+
+
+def worker_pool(
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    journal_matcher: Optional[JournalMatcher] = None,
+    start_method: Optional[str] = None,
+) -> ProcessPoolExecutor:
+    """
+    Starts a pool of worker processes, that format with `_format_request`
+    or with the state returned by `worker_state`.
+
+    Workers are forked by default, so that they share the journal matcher
+    with this process, including its automaton.
+    Otherwise they map the same journal index and only build the automaton.
+    """
+    if journal_matcher is None:
+        journal_matcher = JournalMatcher()
+    if start_method is None and "fork" in multiprocessing.get_all_start_methods():
+        start_method = "fork"
+    pool = ProcessPoolExecutor(
+        workers,
+        multiprocessing.get_context(start_method),
+        initializer=_init_worker,
+        initargs=(journal_matcher, use_cache),
+    )
+    # the objects of this process are left out of garbage collection,
+    # which would otherwise write to them and copy them into every worker
+    gc.freeze()
+    # the workers are started
+    pool.submit(_ping).result()
+    return pool
+
+
+class FormatterServer(ThreadingHTTPServer):
+    """
+    HTTP server, that formats references in a pool of worker processes.
+
+    POST /format accepts {"reference": line, "options": {...}}
+    and returns {"formatted": line}.
+    POST /batch accepts {"text": list} or {"html": document} with "options"
+    and returns {"output": output}.
+    The options map names of `Options` to their values, see `options_from_json`.
+    Errors are returned as {"error": message}.
+    """
+
+    daemon_threads = True
+    # the default backlog makes concurrent clients wait for a retry of the connection
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        workers: Optional[int] = None,
+        use_cache: bool = True,
+        journal_matcher: Optional[JournalMatcher] = None,
+    ):
+        if journal_matcher is None:
+            journal_matcher = JournalMatcher()
+        self._pool_args = (workers, use_cache, journal_matcher)
+        self._pool_lock = threading.Lock()
+        # the workers are started, before the server starts threads
+        self.pool = worker_pool(*self._pool_args)
+        super().__init__(address, _RequestHandler)
+
+    def replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Replaces the pool, after a worker process of `broken` has died,
+        and returns the new pool.
+
+        The pool is replaced once, even if several requests find it broken.
+        """
+        with self._pool_lock:
+            if self.pool is broken:
+                logging.warning("A worker process died, restarting the workers")
+                self.pool = worker_pool(*self._pool_args)
+                broken.shutdown(wait=False)
+            return self.pool
+
+    def format(self, text: str, options: OptionsDict) -> str:
+        """
+        Formats `text` in a worker process.
+
+        A request, that finds the pool broken, is retried in a new pool,
+        and a request, during which a worker dies, replaces the pool
+        and raises BrokenProcessPool.
+        """
+        pool = self.pool
+        try:
+            future = pool.submit(_format_request, text, options)
+        except BrokenProcessPool:
+            pool = self.replace_pool(pool)
+            future = pool.submit(_format_request, text, options)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self.replace_pool(pool)
+            raise
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: FormatterServer
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        try:
+            parse_request, make_response = _ENDPOINTS[self.path]
+        except KeyError:
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        if "Content-Length" not in self.headers:
+            self._reply(411, {"error": "Content-Length is required"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError("Content-Length should not be negative")
+        except ValueError as ex:
+            self._reply(400, {"error": str(ex)})
+            return
+        if length > MAX_REQUEST_SIZE:
+            self._reply(413, {"error": "Request is too large"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("Request should be an object")
+            text, options = parse_request(request)
+        except ValueError as ex:
+            self._reply(400, {"error": str(ex)})
+            return
+        try:
+            output = self.server.format(text, options)
+        except ValueError as ex:
+            # the structure of the input is not recognized
+            self._reply(422, {"error": str(ex)})
+            return
+        except Exception as ex:
+            logging.exception("Formatting failed")
+            self._reply(500, {"error": str(ex)})
+            return
+        self._reply(200, make_response(output))
+
+    def _reply(self, status: int, response: Dict[str, Any]) -> None:
+        body = json.dumps(response, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> None:
+    """
+    Runs the formatting service until it's interrupted
+    """
+    with FormatterServer((host, port), workers, use_cache) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+import json
+import locale
+import os
+import shutil
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, TextIO
+
+from .cache import ResultCache, digest
+from .citation import ParseStatus, format_references, is_doi_line
+from .journal_list import JournalMatcher
+from .options import Options, options_from_json, options_journal_matcher
+from .readers import compression_opener
+from .server import worker_pool, worker_state
+from .stats import StageClock, collect_stats
+
+PLAN_FILE = "plan.json"
+
+# name of the output and of the statistics of a shard, without the extension
+_SHARD_NAME = "shard-{:05d}"
+
+# the lines are decoded like by `open`
+_ENCODING = locale.getpreferredencoding(False)
+
+
+class ShardError(Exception):
+    pass
+
+
+class Shard(NamedTuple):
+    index: int
+    # byte range of the input
+    start: int
+    end: int
+
+
+class ShardPlan(NamedTuple):
+    """
+    Partition of an input file, shared by the nodes that process it
+    """
+
+    input: str
+    size: int
+    # the options as accepted by `options_from_json`
+    options: Dict[str, Any]
+    shards: List[Shard]
+
+    def fingerprint(self) -> str:
+        return digest(json.dumps(self.to_record(), sort_keys=True))
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "input": self.input,
+            "size": self.size,
+            "options": self.options,
+            "shards": [[shard.start, shard.end] for shard in self.shards],
+        }
+
+    @staticmethod
+    def from_record(record: Dict[str, Any]) -> "ShardPlan":
+        return ShardPlan(
+            record["input"],
+            record["size"],
+            record["options"],
+            [
+                Shard(index, start, end)
+                for index, (start, end) in enumerate(record["shards"])
+            ],
+        )
+
+
+def _safe_boundary(file: BinaryIO, target: int, size: int) -> int:
+    """
+    Returns the start of the first line at or after `target`,
+    that can start a shard
+    """
+    file.seek(max(target - 1, 0))
+    if target:
+        # to the start of the next line
+        file.readline()
+    boundary = file.tell()
+    for line in iter(file.readline, b""):
+        if is_doi_line(line.decode(_ENCODING, errors="replace")):
+            # the DOI continues the previous reference
+            boundary = file.tell()
+        elif line.strip():
+            return boundary
+    return size
+
+
+def shard_boundaries(path: str, count: int) -> List[Shard]:
+    """
+    Splits the reference list at `path` into at most `count` shards
+    of about the same size.
+
+    The shards start at lines, that aren't DOIs continuing the previous
+    reference, after the empty lines, so that formatting the shards
+    gives the same output as formatting the whole list.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, mode="rb") as file:
+        for i in range(1, count):
+            target = max(size * i // count, boundaries[-1])
+            boundary = _safe_boundary(file, target, size)
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return [
+        Shard(index, start, end)
+        for index, (start, end) in enumerate(zip(boundaries, boundaries[1:]))
+    ]
+
+
+def shard_lines(path: str, shard: Shard) -> Iterator[str]:
+    """
+    Yields the lines of the input in the byte range of `shard`
+    """
+    with open(path, mode="rb") as file:
+        file.seek(shard.start)
+        position = shard.start
+        while position < shard.end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode(_ENCODING, errors="replace")
+
+
+def plan_shards(path: str, count: int, payload: Dict[str, Any]) -> ShardPlan:
+    """
+    Returns the plan of formatting the reference list at `path`
+    in `count` shards with the options `payload`.
+
+    Raises ShardError, if the options need the whole list
+    or the list is compressed.
+    """
+    options = options_from_json(payload)
+    if options[Options.HtmlFormat]:
+        raise ShardError("Only reference lists can be sharded")
+    if options[Options.SortReferences]:
+        raise ShardError("Sorted references need the whole list")
+    if compression_opener(path):
+        # the shards are byte ranges of the uncompressed input
+        raise ShardError("Compressed reference lists can't be sharded")
+    return ShardPlan(
+        os.path.abspath(path),
+        os.path.getsize(path),
+        payload,
+        shard_boundaries(path, count),
+    )
+
+
+def write_plan(plan: ShardPlan, directory: str) -> None:
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    with open(os.path.join(directory, PLAN_FILE), mode="w") as file:
+        json.dump(plan.to_record(), file, ensure_ascii=False)
+
+
+def read_plan(directory: str) -> ShardPlan:
+    with open(os.path.join(directory, PLAN_FILE)) as file:
+        return ShardPlan.from_record(json.load(file))
+
+
+def _shard_path(directory: str, index: int, extension: str) -> str:
+    return os.path.join(directory, _SHARD_NAME.format(index) + extension)
+
+
+def run_shard(
+    plan: ShardPlan,
+    index: int,
+    directory: str,
+    journal_matcher: Optional[JournalMatcher],
+    cache: Optional[ResultCache] = None,
+    stats: bool = False,
+) -> Dict[str, Any]:
+    """
+    Formats the shard `index` of `plan` into `directory`
+    and returns its statistics, which are also written next to its output.
+    The stages are timed only with `stats`.
+
+    The statistics are written last, so a shard is finished,
+    when they exist.
+    """
+    if os.path.getsize(plan.input) != plan.size:
+        raise ShardError(f"The input has changed since planning: {plan.input}")
+    shard = plan.shards[index]
+    options = options_from_json(plan.options)
+    output_path = _shard_path(directory, index, ".txt")
+    statuses = {status: 0 for status in ParseStatus}
+    clock = None
+    start_time = time.perf_counter()
+    with ExitStack() as stack:
+        if stats:
+            clock = stack.enter_context(collect_stats())
+        output = stack.enter_context(open(output_path + ".tmp", mode="w"))
+        for result in format_references(
+            shard_lines(plan.input, shard),
+            options,
+            options_journal_matcher(options, journal_matcher),
+            cache,
+        ):
+            output.write(result.formatted + "\n")
+            statuses[result.status] += 1
+    os.replace(output_path + ".tmp", output_path)
+    record = {
+        "plan": plan.fingerprint(),
+        "shard": index,
+        "start": shard.start,
+        "end": shard.end,
+        "seconds": time.perf_counter() - start_time,
+        "statuses": {status.name: count for status, count in statuses.items()},
+        "references": sum(statuses.values()),
+        "stages": clock.to_dict()["stages"] if clock else {},
+    }
+    with open(_shard_path(directory, index, ".json"), mode="w") as file:
+        json.dump(record, file)
+    return record
+
+
+def merge_shards(directory: str, output: TextIO) -> Dict[str, Any]:
+    """
+    Writes the outputs of the shards of the plan in `directory`
+    into `output` in the order of the input and returns the aggregated
+    statistics.
+
+    Raises ShardError, if a shard is not finished or belongs to another plan.
+    """
+    plan = read_plan(directory)
+    fingerprint = plan.fingerprint()
+    shard_stats: List[Dict[str, Any]] = []
+    missing: List[int] = []
+    for shard in plan.shards:
+        try:
+            with open(_shard_path(directory, shard.index, ".json")) as file:
+                stats = json.load(file)
+        except FileNotFoundError:
+            missing.append(shard.index)
+            continue
+        if stats["plan"] != fingerprint:
+            raise ShardError(f"Shard {shard.index} belongs to another plan")
+        shard_stats.append(stats)
+    if missing:
+        raise ShardError(
+            "Shards are not finished: " + ", ".join(str(index) for index in missing)
+        )
+    for shard in plan.shards:
+        with open(_shard_path(directory, shard.index, ".txt")) as file:
+            shutil.copyfileobj(file, output)
+    clock = StageClock()
+    statuses = {status.name: 0 for status in ParseStatus}
+    for stats in shard_stats:
+        clock.add(stats)
+        for status, count in stats["statuses"].items():
+            statuses[status] += count
+    return {
+        "shards": len(shard_stats),
+        # the total time of the shards and the time of the slowest one
+        "seconds": sum(stats["seconds"] for stats in shard_stats),
+        "slowest_seconds": max(stats["seconds"] for stats in shard_stats),
+        "statuses": statuses,
+        **clock.to_dict(),
+    }
+
+
+def merge_report(summary: Dict[str, Any]) -> str:
+    """
+    Returns the aggregated statistics of `merge_shards` as text
+    """
+    clock = StageClock()
+    clock.add(summary)
+    statuses = ", ".join(
+        f"{count} {status.lower()}" for status, count in summary["statuses"].items()
+    )
+    return "\n".join(
+        [
+            clock.report(),
+            f"{summary['shards']} shards: {statuses}",
+            f"{summary['seconds']:.3f} s in total,"
+            f" {summary['slowest_seconds']:.3f} s in the slowest shard",
+        ]
+    )
+
+
+def _run_local_shard(plan: ShardPlan, index: int, directory: str, stats: bool) -> None:
+    journal_matcher, cache = worker_state()
+    run_shard(plan, index, directory, journal_matcher, cache, stats)
+    if cache:
+        cache.flush()
+
+
+def run_local(
+    plan: ShardPlan,
+    directory: str,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    journal_matcher: Optional[JournalMatcher] = None,
+    stats: bool = False,
+) -> None:
+    """
+    Runs the shards of `plan` in a pool of local processes,
+    each of them like a separate node
+    """
+    with worker_pool(workers, use_cache, journal_matcher) as pool:
+        for future in [
+            pool.submit(_run_local_shard, plan, shard.index, directory, stats)
+            for shard in plan.shards
+        ]:
+            future.result()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import functools
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, TypeVar
+
+import regex
+
+from .utils import fold
+
+if TYPE_CHECKING:
+    from .citation import Reference
+
+T = TypeVar("T")
+
+# separates the parts of a key and sorts before all characters of folded names,
+# so that a name sorts before its extensions
+_SEPARATOR = "\x01"
+
+_YEAR_REGEX = regex.compile(r"(\d*)(\D*)")
+_ET_AL_REGEX = regex.compile(r"et\.? ?al")
+
+# number of folded surnames kept, since the same authors recur in a list
+SURNAME_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=SURNAME_CACHE_SIZE)
+def _folded_surname(surname: str) -> str:
+    return fold(surname)
+
+
+def _year_key(year: str) -> str:
+    digits, suffix = _YEAR_REGEX.match(year).groups()  # type: ignore
+    # the years sort by their value, followed by the suffix letter
+    return digits.rjust(4, "0") + suffix
+
+
+def collation_key(reference: "Reference") -> str:
+    """
+    Returns the key, that sorts the references by authors and year.
+
+    The references sort by the first author, then works of a single author
+    precede those of two authors, sorted by the second author,
+    which precede those of more authors or "et al.", sorted by year.
+    The surnames are compared without case and accents.
+    """
+    surnames = []
+    et_al = False
+    for author in reference.authors[0] or []:
+        if author.is_et_al:
+            et_al = True
+            continue
+        surnames.append(_folded_surname(author.surname))
+        # "et al." without a comma is parsed as a part of the initials
+        if not et_al and "al" in author.initials:
+            et_al = bool(_ET_AL_REGEX.search(author.initials))
+    if et_al or len(surnames) > 2:
+        bucket = "3"
+    else:
+        bucket = str(len(surnames))
+    first = surnames[0] if surnames else ""
+    year = _year_key(reference.year[0])
+    if bucket == "2":
+        parts = [first, bucket, surnames[1], year]
+    else:
+        parts = [first, bucket, year, *surnames[1:]]
+    return _SEPARATOR.join(parts)
+
+
+def sorted_in_place(items: Sequence[T], key: Callable[[T], Optional[str]]) -> List[T]:
+    """
+    Returns `items` sorted by `key`, which is computed once for each item.
+
+    The items, whose key is None, stay at their positions
+    and the others are sorted into the remaining positions.
+    """
+    keys = [key(item) for item in items]
+    positions = [i for i, item_key in enumerate(keys) if item_key is not None]
+    order = sorted(positions, key=keys.__getitem__)
+    result = list(items)
+    for position, i in zip(positions, order):
+        result[position] = items[i]
+    return result
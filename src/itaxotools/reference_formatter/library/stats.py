@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO, TypeVar
+
+from .crossref import DoiLookup
+
+T = TypeVar("T")
+
+
+class StageClock:
+    """
+    Counters and cumulative times of the stages of parsing and formatting.
+
+    The clock has a current stage, that receives the time until the next stage
+    is entered, so a stage entered inside another one is not counted twice.
+    With `trace` the times of the stages of each reference are written
+    into it as JSON lines.
+    """
+
+    def __init__(self, trace: Optional[TextIO] = None) -> None:
+        self.counts: Dict[str, int] = {}
+        self.times: Dict[str, float] = {}
+        self.references = 0
+        self._trace = trace
+        self._reference_times: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._mark = time.perf_counter()
+
+    def switch(self, stage: Optional[str]) -> Optional[str]:
+        """
+        Adds the time since the last switch to the current stage,
+        makes `stage` current and returns the previous one
+        """
+        now = time.perf_counter()
+        previous = self._stage
+        if previous is not None:
+            elapsed = now - self._mark
+            self.times[previous] = self.times.get(previous, 0.0) + elapsed
+            if self._trace:
+                self._reference_times[previous] = (
+                    self._reference_times.get(previous, 0.0) + elapsed
+                )
+        self._stage = stage
+        self._mark = now
+        return previous
+
+    def enter(self, stage: str) -> Optional[str]:
+        """
+        Same as `switch`, but also counts the stage
+        """
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        return self.switch(stage)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """
+        Enters `stage` and returns to the current stage on exit
+        """
+        previous = self.enter(stage)
+        try:
+            yield
+        finally:
+            self.switch(previous)
+
+    def end_reference(self, source: str) -> None:
+        """
+        Counts a processed reference and writes the trace of its stages
+        """
+        self.references += 1
+        if self._trace:
+            json.dump(
+                {"reference": source, "stages": self._reference_times},
+                self._trace,
+                ensure_ascii=False,
+            )
+            self._trace.write("\n")
+            self._reference_times = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "references": self.references,
+            "stages": {
+                stage: {"count": self.counts[stage], "seconds": self.times[stage]}
+                for stage in self.times
+            },
+        }
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Adds the counts and times of `record`, produced by `to_dict`
+        """
+        self.references += record["references"]
+        for stage, stage_record in record["stages"].items():
+            self.counts[stage] = self.counts.get(stage, 0) + stage_record["count"]
+            self.times[stage] = self.times.get(stage, 0.0) + stage_record["seconds"]
+
+    def report(self) -> str:
+        """
+        Returns the count and time of each stage, the slowest first
+        """
+        stages = sorted(self.times, key=self.times.__getitem__, reverse=True)
+        lines = [
+            f"{stage}: {self.counts[stage]} calls, {self.times[stage] * 1000:.1f} ms"
+            for stage in stages
+        ]
+        total = f"{sum(self.times.values()) * 1000:.1f} ms"
+        if self.references:
+            lines.append(f"{self.references} references in {total}")
+        else:
+            lines.append(f"total: {total}")
+        return "\n".join(lines)
+
+
+# the clock of the current context, when the statistics are collected
+_clock: ContextVar[Optional[StageClock]] = ContextVar("stage_clock", default=None)
+
+
+def stage_clock() -> Optional[StageClock]:
+    """
+    Returns the clock of the current context, if the statistics are collected.
+
+    The instrumented code gets the clock once per call and enters the stages
+    only if it's not None, so the instrumentation costs little otherwise.
+    """
+    return _clock.get()
+
+
+@contextmanager
+def collect_stats(trace: Optional[TextIO] = None) -> Iterator[StageClock]:
+    """
+    Collects the statistics of processing in the current context,
+    which is not inherited by new threads
+    """
+    clock = StageClock(trace)
+    token = _clock.set(clock)
+    try:
+        yield clock
+    finally:
+        clock.switch(None)
+        _clock.reset(token)
+
+
+def timed(stage: str, function: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wraps `function`, so that it runs in `stage`,
+    when the statistics are collected
+    """
+
+    def timed_function(*args: Any) -> T:
+        clock = _clock.get()
+        if clock is None:
+            return function(*args)
+        with clock.stage(stage):
+            return function(*args)
+
+    return timed_function
+
+
+def timed_lookup(lookup: DoiLookup) -> DoiLookup:
+    return timed("crossref", lookup)
@@ -1,17 +1,36 @@
 #!/usr/bin/env python3
 
+import unicodedata
+
 import regex
 
+_SPACES_REGEX = regex.compile(r"\s{2,}")
+_SPACE_BEFORE_PUNCTUATION_REGEX = regex.compile(r"[\u00A0\u202F ](?=[.,;:])")
+_NON_ALNUM_REGEX = regex.compile(r"[^\p{Alnum}]+")
+
 
 def normalize_space(s: str) -> str:
     """
     Collapses whitespace sequences and removes spaces before some punctuation
     """
-    s = regex.sub(r"\s{2,}", " ", s)
-    s = regex.sub(r"[\u00A0\u202F ](?=[.,;:])", "", s)
+    s = _SPACES_REGEX.sub(" ", s)
+    s = _SPACE_BEFORE_PUNCTUATION_REGEX.sub("", s)
     return s
 
 
+def fold(s: str) -> str:
+    """
+    Removes accents, case and punctuation, so that differently formatted
+    versions of a text compare equal
+    """
+    if s.isascii():
+        # ASCII has no accents and its case folding is lowering
+        return _NON_ALNUM_REGEX.sub(" ", s.lower()).strip()
+    decomposed = unicodedata.normalize("NFKD", s)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM_REGEX.sub(" ", stripped.casefold()).strip()
+
+
 def replace_slice(input: str, position: slice, replacement: str) -> str:
     start, stop, step = position.indices(len(input))
     if step != 1:
@@ -1,19 +1,26 @@
 #!/usr/bin/env python
 
-import tkinter as tk
+import argparse
+import json
+import logging
+import sys
 import tempfile
 import os
-
-from .library.gui import FmtGui
+from contextlib import ExitStack
 
 
 def gui_main():
+    import tkinter as tk
+
+    from .library.gui import FmtGui
+
     root = tk.Tk()
 
     root.title("Reference-formatter")
     preview_dir = tempfile.mkdtemp()
 
     def close_window():
+        gui.close_stores()
         for file in os.scandir(preview_dir):
             os.remove(file)
         os.rmdir(preview_dir)
@@ -24,13 +31,453 @@ def gui_main():
     root.rowconfigure(0, weight=1)
     root.columnconfigure(0, weight=1)
 
-    FmtGui(root, preview_dir=preview_dir)
+    gui = FmtGui(root, preview_dir=preview_dir)
 
     root.mainloop()
 
 
+def serve_main(args: argparse.Namespace) -> None:
+    # the GUI is not imported by the service
+    from .library.server import serve
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    serve(args.host, args.port, args.workers, not args.no_cache)
+
+
+def format_main(args: argparse.Namespace) -> None:
+    from .library.cache import ResultCache, default_cache_path
+    from .library.checkpoint import ResumeMismatch
+    from .library.citation import format_checkpointed, format_document
+    from .library.options import Options, options_from_json, options_journal_matcher
+    from .library.readers import open_input, plain_extension
+    from .library.stats import collect_stats
+
+    try:
+        options = options_from_json(json.loads(args.options or "{}"))
+    except ValueError as ex:
+        sys.exit(f"Invalid options: {ex}")
+    if args.html or plain_extension(args.input).startswith(".htm"):
+        options[Options.HtmlFormat] = True
+    # the progress of formatting a reference list into a file is checkpointed
+    checkpointed = bool(args.output) and not options[Options.HtmlFormat]
+    if args.resume and not checkpointed:
+        sys.exit("Only formatting of a reference list into a file can be resumed")
+    journal_matcher = options_journal_matcher(options)
+    clock = None
+    cache = None
+    with ExitStack() as stack:
+        if not args.no_cache:
+            cache = stack.enter_context(ResultCache(default_cache_path()))
+        if args.stats or args.trace:
+            trace = (
+                stack.enter_context(open(args.trace, mode="w")) if args.trace else None
+            )
+            clock = stack.enter_context(collect_stats(trace))
+        if checkpointed:
+            try:
+                format_checkpointed(
+                    args.input,
+                    args.output,
+                    options,
+                    journal_matcher,
+                    cache,
+                    args.resume,
+                )
+            except ResumeMismatch as ex:
+                sys.exit(f"Cannot resume: {ex}")
+        else:
+            infile = stack.enter_context(open_input(args.input))
+            if args.output:
+                outfile = stack.enter_context(open(args.output, mode="w"))
+            else:
+                outfile = sys.stdout
+            for piece in format_document(infile, options, journal_matcher, cache):
+                outfile.write(piece)
+    if args.stats:
+        assert clock is not None
+        print(clock.report(), file=sys.stderr)
+        if cache:
+            print(cache.report(), file=sys.stderr)
+
+
+def duplicates_main(args: argparse.Namespace) -> None:
+    from .library.citation import Reference, txt_to_references
+    from .library.duplicates import duplicate_clusters
+    from .library.journal_list import JournalMatcher
+    from .library.options import default_options
+    from .library.readers import open_input
+
+    with open_input(args.input) as infile:
+        entries = list(txt_to_references(infile, default_options(), JournalMatcher()))
+    lines = [
+        entry.unparsed if isinstance(entry, Reference) else entry for entry in entries
+    ]
+    positions = [i for i, entry in enumerate(entries) if isinstance(entry, Reference)]
+    references = [entries[i] for i in positions]
+    clusters = [
+        [positions[i] for i in cluster]
+        for cluster in duplicate_clusters(references, args.threshold)
+    ]
+    with ExitStack() as stack:
+        if args.output:
+            outfile = stack.enter_context(open(args.output, mode="w"))
+        else:
+            outfile = sys.stdout
+        if args.remove:
+            removed = {i for cluster in clusters for i in cluster[1:]}
+            for i, line in enumerate(lines):
+                if i not in removed:
+                    print(line, file=outfile)
+        else:
+            for number, cluster in enumerate(clusters):
+                if number:
+                    print(file=outfile)
+                for i in cluster:
+                    print(lines[i], file=outfile)
+
+
+def export_main(args: argparse.Namespace) -> None:
+    from .library.cache import ResultCache, default_cache_path
+    from .library.citation import txt_to_references
+    from .library.export import (
+        ExportDependencyMissing,
+        column_batches,
+        export_format,
+        write_arrow,
+        write_csv,
+    )
+    from .library.journal_list import JournalMatcher
+    from .library.options import default_options
+    from .library.readers import open_input
+
+    try:
+        format = export_format(args.output, args.format)
+    except ValueError as ex:
+        sys.exit(str(ex))
+    if format != "csv" and not args.output:
+        sys.exit(f"Export to {format} requires an output file")
+    with ExitStack() as stack:
+        infile = stack.enter_context(open_input(args.input))
+        cache = None
+        if not args.no_cache:
+            cache = stack.enter_context(ResultCache(default_cache_path()))
+        entries = txt_to_references(infile, default_options(), JournalMatcher(), cache)
+        batches = column_batches(entries, args.batch_size)
+        if format == "csv":
+            if args.output:
+                outfile = stack.enter_context(open(args.output, mode="w", newline=""))
+            else:
+                outfile = sys.stdout
+            write_csv(batches, outfile)
+        else:
+            try:
+                write_arrow(batches, args.output, format)
+            except ExportDependencyMissing as ex:
+                sys.exit(str(ex))
+
+
+def render_main(args: argparse.Namespace) -> None:
+    from .library.cache import ResultCache, default_cache_path
+    from .library.citation import pipeline_doi_lookup
+    from .library.document import (
+        ParsedDocument,
+        RenderTarget,
+        TargetKind,
+        render_targets,
+    )
+    from .library.options import Options, options_from_json, options_journal_matcher
+    from .library.readers import open_input, plain_extension
+
+    targets = []
+    with ExitStack() as stack:
+        for target in args.target:
+            if len(target) not in (2, 3):
+                sys.exit("A target is KIND OUTPUT [OPTIONS]")
+            kind, path, *target_options = target
+            try:
+                target_kind = TargetKind(kind)
+            except ValueError:
+                sys.exit(f"Unknown target: {kind}")
+            try:
+                options = options_from_json(
+                    {
+                        **json.loads(args.options or "{}"),
+                        **json.loads(target_options[0] if target_options else "{}"),
+                    }
+                )
+            except ValueError as ex:
+                sys.exit(f"Invalid options: {ex}")
+            outfile = stack.enter_context(open(path, mode="w"))
+            targets.append(RenderTarget(target_kind, options, outfile))
+        # the references are parsed once for all targets
+        if len({target.options[Options.ProcessJournalName] for target in targets}) > 1:
+            sys.exit("ProcessJournalName should be the same for all targets")
+        journal_matcher = options_journal_matcher(targets[0].options)
+        cache = None
+        if not args.no_cache:
+            cache = stack.enter_context(ResultCache(default_cache_path()))
+        infile = stack.enter_context(open_input(args.input))
+        if args.html or plain_extension(args.input).startswith(".htm"):
+            document = ParsedDocument.from_html(infile, journal_matcher)
+        else:
+            document = ParsedDocument.from_text(
+                infile, targets[0].options, journal_matcher, cache
+            )
+        render_targets(document, targets, pipeline_doi_lookup(cache, None))
+
+
+def shard_main(args: argparse.Namespace) -> None:
+    from .library.cache import ResultCache, default_cache_path
+    from .library.options import options_from_json, options_journal_matcher
+    from .library.shards import (
+        ShardError,
+        merge_report,
+        merge_shards,
+        plan_shards,
+        read_plan,
+        run_local,
+        run_shard,
+        write_plan,
+    )
+
+    try:
+        if args.shard_command in ("plan", "local"):
+            try:
+                payload = json.loads(args.options or "{}")
+                plan = plan_shards(args.input, args.count, payload)
+            except ValueError as ex:
+                sys.exit(f"Invalid options: {ex}")
+            write_plan(plan, args.directory)
+        else:
+            plan = read_plan(args.directory)
+        if args.shard_command == "run":
+            with ExitStack() as stack:
+                cache = None
+                if not args.no_cache:
+                    cache = stack.enter_context(ResultCache(default_cache_path()))
+                journal_matcher = options_journal_matcher(
+                    options_from_json(plan.options)
+                )
+                for index in args.index:
+                    if not 0 <= index < len(plan.shards):
+                        sys.exit(f"The plan has {len(plan.shards)} shards")
+                    run_shard(
+                        plan,
+                        index,
+                        args.directory,
+                        journal_matcher,
+                        cache,
+                        args.stats,
+                    )
+        elif args.shard_command == "local":
+            run_local(
+                plan,
+                args.directory,
+                args.workers,
+                not args.no_cache,
+                stats=args.stats,
+            )
+        if args.shard_command in ("merge", "local"):
+            with ExitStack() as stack:
+                if args.output:
+                    outfile = stack.enter_context(open(args.output, mode="w"))
+                else:
+                    outfile = sys.stdout
+                summary = merge_shards(args.directory, outfile)
+            if args.stats:
+                print(merge_report(summary), file=sys.stderr)
+    except ShardError as ex:
+        sys.exit(str(ex))
+
+
 def main() -> None:
-    gui_main()
+    from .library.duplicates import TITLE_THRESHOLD
+    from .library.export import BATCH_SIZE, EXPORT_FORMATS
+    from .library.server import DEFAULT_HOST, DEFAULT_PORT
+
+    parser = argparse.ArgumentParser(
+        prog="reference_formatter",
+        description="Formats bibliography references. Starts the GUI by default.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser(
+        "serve", help="run the formatting service over HTTP/JSON"
+    )
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    serve_parser.add_argument(
+        "--no-cache", action="store_true", help="don't use the result cache"
+    )
+    serve_parser.add_argument(
+        "--verbose", action="store_true", help="log every request"
+    )
+    format_parser = commands.add_parser("format", help="format a reference list")
+    format_parser.add_argument("input", help="reference list or html document")
+    format_parser.add_argument(
+        "-o", "--output", help="output file (default: standard output)"
+    )
+    format_parser.add_argument(
+        "--html", action="store_true", help="the input is html (default: by extension)"
+    )
+    format_parser.add_argument(
+        "--options",
+        help='JSON object of options, for example \'{"YearFormat": "Period"}\'',
+    )
+    format_parser.add_argument(
+        "--no-cache", action="store_true", help="don't use the result cache"
+    )
+    format_parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print the time spent in each stage of processing",
+    )
+    format_parser.add_argument(
+        "--trace", help="write the stages of each reference into a JSON lines file"
+    )
+    format_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run from its last checkpoint in OUTPUT.progress",
+    )
+    duplicates_parser = commands.add_parser(
+        "duplicates", help="find the duplicates in a reference list"
+    )
+    duplicates_parser.add_argument("input", help="reference list")
+    duplicates_parser.add_argument(
+        "-o", "--output", help="output file (default: standard output)"
+    )
+    duplicates_parser.add_argument(
+        "--remove",
+        action="store_true",
+        help="output the list without the later duplicates"
+        " (default: output the groups of duplicates)",
+    )
+    duplicates_parser.add_argument(
+        "--threshold",
+        type=int,
+        default=TITLE_THRESHOLD,
+        help=f"similarity of the titles from 0 to 100 (default: {TITLE_THRESHOLD})",
+    )
+    export_parser = commands.add_parser(
+        "export", help="export the parsed fields of the references as a table"
+    )
+    export_parser.add_argument("input", help="reference list")
+    export_parser.add_argument(
+        "-o", "--output", help="output file (default: CSV to standard output)"
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="format of the output (default: by extension, otherwise csv)",
+    )
+    export_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"number of rows written at once (default: {BATCH_SIZE})",
+    )
+    export_parser.add_argument(
+        "--no-cache", action="store_true", help="don't use the result cache"
+    )
+    render_parser = commands.add_parser(
+        "render", help="parse a reference list once and write several outputs"
+    )
+    render_parser.add_argument("input", help="reference list or html document")
+    render_parser.add_argument(
+        "-t",
+        "--target",
+        nargs="+",
+        action="append",
+        required=True,
+        metavar="KIND OUTPUT [OPTIONS]",
+        help="write the output of KIND (document, text or json) into OUTPUT,"
+        " formatted with the JSON object OPTIONS over --options; can be repeated",
+    )
+    render_parser.add_argument(
+        "--html", action="store_true", help="the input is html (default: by extension)"
+    )
+    render_parser.add_argument(
+        "--options", help="JSON object of options shared by the targets"
+    )
+    render_parser.add_argument(
+        "--no-cache", action="store_true", help="don't use the result cache"
+    )
+    shard_parser = commands.add_parser(
+        "shard", help="format a reference list in shards, possibly on several nodes"
+    )
+    shard_commands = shard_parser.add_subparsers(dest="shard_command", required=True)
+    shard_plan_parser = shard_commands.add_parser(
+        "plan", help="split the input into shards and write the plan into DIRECTORY"
+    )
+    shard_run_parser = shard_commands.add_parser(
+        "run", help="format the shards with the given indices"
+    )
+    shard_merge_parser = shard_commands.add_parser(
+        "merge", help="write the formatted shards in the order of the input"
+    )
+    shard_local_parser = shard_commands.add_parser(
+        "local", help="plan, run the shards in local processes and merge"
+    )
+    for subparser in (shard_plan_parser, shard_local_parser):
+        subparser.add_argument("input", help="reference list")
+    for subparser in (
+        shard_plan_parser,
+        shard_run_parser,
+        shard_merge_parser,
+        shard_local_parser,
+    ):
+        subparser.add_argument("directory", help="directory of the plan and shards")
+    for subparser in (shard_plan_parser, shard_local_parser):
+        subparser.add_argument(
+            "-n", "--count", type=int, required=True, help="number of shards"
+        )
+        subparser.add_argument("--options", help="JSON object of options")
+    shard_run_parser.add_argument("index", type=int, nargs="+")
+    shard_run_parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="time the stages for the statistics of merge --stats",
+    )
+    for subparser in (shard_merge_parser, shard_local_parser):
+        subparser.add_argument(
+            "-o", "--output", help="output file (default: standard output)"
+        )
+        subparser.add_argument(
+            "--stats",
+            action="store_true",
+            help="print the statistics aggregated from the shards",
+        )
+    for subparser in (shard_run_parser, shard_local_parser):
+        subparser.add_argument(
+            "--no-cache", action="store_true", help="don't use the result cache"
+        )
+    shard_local_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve_main(args)
+    elif args.command == "format":
+        format_main(args)
+    elif args.command == "duplicates":
+        duplicates_main(args)
+    elif args.command == "export":
+        export_main(args)
+    elif args.command == "render":
+        render_main(args)
+    elif args.command == "shard":
+        shard_main(args)
+    else:
+        gui_main()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import asyncio
+import html
+import json
+import multiprocessing
+import urllib.parse
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+from itaxotools.reference_formatter.library.async_pipeline import (
+    CrossrefClient,
+    format_references_async,
+)
+from itaxotools.reference_formatter.library.citation import (
+    FormattedReference,
+    format_references,
+)
+from itaxotools.reference_formatter.library.document import ParsedDocument
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    OptionsDict,
+    default_options,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def doi_of(title: str) -> str:
+    return "10.5555/" + str(zlib.crc32(title.encode()))
+
+
+class StandInCrossref:
+    """
+    Local stand-in for the Crossref works endpoint, that finds every title.
+
+    Responses are delayed by a time depending on the title,
+    and every other one is sent in chunks.
+    """
+
+    def __init__(self) -> None:
+        self.titles: List[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()).strip():
+                pass
+            target = urllib.parse.urlsplit(request_line.split()[1].decode())
+            title = urllib.parse.parse_qs(target.query)["query"][0]
+            self.titles.append(title)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(zlib.crc32(title.encode()) % 5 * 0.002)
+            self.running -= 1
+            body = json.dumps(
+                {"message": {"items": [{"DOI": doi_of(title), "title": [title]}]}}
+            ).encode()
+            if len(self.titles) % 2:
+                writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+                for i in range(0, len(body), 100):
+                    chunk = body[i : i + 100]
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                writer.write(b"0\r\n\r\n")
+            else:
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body)
+                )
+                writer.write(body)
+            await writer.drain()
+        writer.close()
+
+
+def run_with_stand_in(test: Callable[[StandInCrossref, str], Awaitable[Any]]) -> Any:
+    async def main() -> Any:
+        stand_in = StandInCrossref()
+        server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        async with server:
+            return await test(stand_in, f"http://{host}:{port}/works")
+
+    return asyncio.run(main())
+
+
+def crossref_options() -> OptionsDict:
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+    return options
+
+
+async def collect(
+    input: Any,
+    options: OptionsDict,
+    client: Optional[CrossrefClient],
+    executor: Optional[Executor] = None,
+) -> List[FormattedReference]:
+    return [
+        result
+        async for result in format_references_async(
+            input, options, JOURNAL_MATCHER, client, executor
+        )
+    ]
+
+
+def test_text() -> None:
+    options = crossref_options()
+    text = TESTFILE_PATH.read_text()
+
+    async def test(stand_in: StandInCrossref, url: str) -> List[FormattedReference]:
+        async with CrossrefClient(url, concurrency=3) as client:
+            results = await collect(text, options, client)
+        assert 1 < stand_in.max_running <= 3
+        assert len(stand_in.titles) == len(set(stand_in.titles))
+        return results
+
+    results = run_with_stand_in(test)
+    document = ParsedDocument.from_text(text.splitlines(), options, JOURNAL_MATCHER)
+    expected: List[str] = []
+    document.render(
+        options,
+        expected.append,
+        document.doi_lookup(lambda title, _: "doi:" + doi_of(title)),
+    )
+    assert "".join(result.formatted + "\n" for result in results) == "".join(expected)
+    plain = list(format_references(text, default_options(), JOURNAL_MATCHER))
+    assert [result._replace(formatted="") for result in results] == [
+        result._replace(formatted="") for result in plain
+    ]
+
+
+def test_html() -> None:
+    options = crossref_options()
+    options[Options.HtmlFormat] = True
+    document = "<html><body>\n{}</body></html>".format(
+        "".join(
+            f"<p>{html.escape(line)}</p>\n"
+            for line in TESTFILE_PATH.read_text().splitlines()
+        )
+    )
+
+    async def test(stand_in: StandInCrossref, url: str) -> List[FormattedReference]:
+        async with CrossrefClient(url) as client:
+            return await collect(document, options, client)
+
+    results = run_with_stand_in(test)
+    with_doi = [result for result in results if "doi:10.5555/" in result.formatted]
+    assert with_doi
+    options[Options.CrossrefAPI] = CrossrefMatch.NotUsed
+    plain = list(format_references(document, options, JOURNAL_MATCHER))
+    assert len(results) == len(plain)
+    for result, expected in zip(results, plain):
+        assert result.formatted.startswith(expected.formatted)
+
+
+def test_without_crossref() -> None:
+    text = TESTFILE_PATH.read_text()
+    results = asyncio.run(collect(text, default_options(), None))
+    assert results == list(format_references(text, default_options(), JOURNAL_MATCHER))
+
+
+def test_process_pool() -> None:
+    options = crossref_options()
+    text = TESTFILE_PATH.read_text()
+
+    async def test(stand_in: StandInCrossref, url: str) -> List[FormattedReference]:
+        with ProcessPoolExecutor(2, multiprocessing.get_context("spawn")) as pool:
+            async with CrossrefClient(url) as client:
+                return await collect(text, options, client, pool)
+
+    async def expected(stand_in: StandInCrossref, url: str) -> List[FormattedReference]:
+        async with CrossrefClient(url) as client:
+            return await collect(text, options, client)
+
+    assert run_with_stand_in(test) == run_with_stand_in(expected)
+
+
+def test_early_exit() -> None:
+    options = crossref_options()
+
+    async def test(stand_in: StandInCrossref, url: str) -> None:
+        async with CrossrefClient(url, concurrency=2) as client:
+            results = format_references_async(
+                TESTFILE_PATH.read_text(), options, JOURNAL_MATCHER, client
+            )
+            async for _ in results:
+                break
+            await results.aclose()
+
+    run_with_stand_in(test)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter.library import cache as cache_module
+from itaxotools.reference_formatter.library.cache import WRITE_BATCH_SIZE, ResultCache
+from itaxotools.reference_formatter.library.citation import process_reference_file
+from itaxotools.reference_formatter.library.options import default_options
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def process(input_path: Path, output_dir: Path, cache: Optional[ResultCache]) -> str:
+    with open(input_path) as infile:
+        process_reference_file(
+            infile, str(output_dir), default_options(), JOURNAL_MATCHER, cache
+        )
+    return (output_dir / "output").read_text()
+
+
+def test_rerun(tmp_path: Path) -> None:
+    expected = process(TESTFILE_PATH, tmp_path, None)
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        assert process(TESTFILE_PATH, tmp_path, cache) == expected
+        assert not cache.hits
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        assert process(TESTFILE_PATH, tmp_path, cache) == expected
+        assert not cache.misses
+        assert cache.hits["formatted"] > 0
+
+
+def test_changed_line(tmp_path: Path) -> None:
+    lines = TESTFILE_PATH.read_text().splitlines()
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        process(TESTFILE_PATH, tmp_path, cache)
+    lines[1] = lines[1].replace("Lemmon", "Lemon")
+    changed_path = tmp_path / "changed.txt"
+    changed_path.write_text("\n".join(lines))
+    expected = process(changed_path, tmp_path, None)
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        assert process(changed_path, tmp_path, cache) == expected
+        assert cache.misses["parsed"] == 1
+
+
+def test_eviction(tmp_path: Path) -> None:
+    with ResultCache(tmp_path / "cache.sqlite", max_entries=10) as cache:
+        for i in range(25):
+            cache.put("parsed", str(i), "null")
+        cache.flush()
+        assert cache.get("parsed", "24") is not None
+        assert cache.get("parsed", "0") is None
+        cache.get("parsed", "15")
+        for i in range(25, 34):
+            cache.put("parsed", str(i), "null")
+        cache.flush()
+        # recently read entry survives eviction
+        assert cache.get("parsed", "15") is not None
+        assert cache.get("parsed", "16") is None
+
+
+def test_doi_lookup(tmp_path: Path) -> None:
+    titles: List[str] = []
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        titles.append(title)
+        return None if title == "unknown" else "doi:10.1000/1"
+
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        cached_lookup = cache.doi_lookup(lookup)
+        for _ in range(2):
+            assert cached_lookup("title", False) == "doi:10.1000/1"
+            assert cached_lookup("unknown", False) is None
+    assert titles == ["title", "unknown"]
+
+
+def test_shared(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # a writer, that waits for the other, fails quickly
+    monkeypatch.setattr(cache_module, "BUSY_TIMEOUT", 0.1)
+    path = tmp_path / "cache.sqlite"
+    with ResultCache(path) as first, ResultCache(path) as second:
+        for i in range(WRITE_BATCH_SIZE * 2):
+            first.put("parsed", f"first {i}", "null")
+            second.put("parsed", f"second {i}", "null")
+        # the full batches are written and visible to the other process
+        assert second.get("parsed", "first 0") == "null"
+        assert first.get("parsed", "second 0") == "null"
+    with ResultCache(path) as cache:
+        assert cache.get("parsed", f"first {WRITE_BATCH_SIZE * 2 - 1}") == "null"
+        assert cache.get("parsed", f"second {WRITE_BATCH_SIZE * 2 - 1}") == "null"
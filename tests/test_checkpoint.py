@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.checkpoint import (
+    JOURNAL_SUFFIX,
+    ResumeMismatch,
+)
+from itaxotools.reference_formatter.library.citation import (
+    format_checkpointed,
+    format_document,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    OptionsDict,
+    default_options,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+INTERVAL = 5
+
+
+class Killed(Exception):
+    pass
+
+
+class FakeLookup:
+    """
+    Retrieves a DOI derived from the title and fails after `limit` lookups
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.titles: List[str] = []
+
+    def __call__(self, title: str, fuzzy: bool) -> Optional[str]:
+        if self.limit is not None and len(self.titles) == self.limit:
+            raise Killed
+        self.titles.append(title)
+        return f"doi:10.1000/{len(title)}"
+
+
+def crossref_options() -> OptionsDict:
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+    return options
+
+
+def run(
+    output: Path,
+    lookup: FakeLookup,
+    options: Optional[OptionsDict] = None,
+    resume: bool = False,
+) -> None:
+    format_checkpointed(
+        str(TESTFILE_PATH),
+        str(output),
+        options or crossref_options(),
+        JOURNAL_MATCHER,
+        resume=resume,
+        lookup=lookup,
+        interval=INTERVAL,
+    )
+
+
+def committed_titles(journal: Path) -> List[str]:
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    return [title for record in records[1:] for title, _, _ in record["dois"]]
+
+
+def test_uninterrupted(tmp_path: Path) -> None:
+    output = tmp_path / "output.txt"
+    format_checkpointed(
+        str(TESTFILE_PATH), str(output), default_options(), JOURNAL_MATCHER
+    )
+    assert output.read_text() == "".join(
+        format_document(TESTFILE_PATH.read_text(), default_options(), JOURNAL_MATCHER)
+    )
+    assert not Path(str(output) + JOURNAL_SUFFIX).exists()
+
+
+@pytest.mark.parametrize("limit", [3, 17, 40])
+def test_resume(tmp_path: Path, limit: int) -> None:
+    expected = tmp_path / "expected.txt"
+    run(expected, FakeLookup())
+    output = tmp_path / "output.txt"
+    with pytest.raises(Killed):
+        run(output, FakeLookup(limit))
+    journal = Path(str(output) + JOURNAL_SUFFIX)
+    committed = committed_titles(journal)
+    # killed while writing the output and the journal
+    with open(output, mode="a") as file:
+        file.write("Incomplete")
+    with open(journal, mode="a") as file:
+        file.write('{"references": ')
+    lookup = FakeLookup()
+    run(output, lookup, resume=True)
+    assert output.read_text() == expected.read_text()
+    assert not journal.exists()
+    assert not set(committed) & set(lookup.titles)
+
+
+def test_resume_twice(tmp_path: Path) -> None:
+    expected = tmp_path / "expected.txt"
+    run(expected, FakeLookup())
+    output = tmp_path / "output.txt"
+    with pytest.raises(Killed):
+        run(output, FakeLookup(10))
+    with pytest.raises(Killed):
+        run(output, FakeLookup(10), resume=True)
+    run(output, FakeLookup(), resume=True)
+    assert output.read_text() == expected.read_text()
+
+
+def test_mismatch(tmp_path: Path) -> None:
+    output = tmp_path / "output.txt"
+    with pytest.raises(Killed):
+        run(output, FakeLookup(10))
+    options = crossref_options()
+    options[Options.SortReferences] = True
+    with pytest.raises(ResumeMismatch):
+        run(output, FakeLookup(), options, resume=True)
+    # without resuming the run starts again
+    run(output, FakeLookup(), options)
+    assert not Path(str(output) + JOURNAL_SUFFIX).exists()
+
+
+def test_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    output = tmp_path / "output.txt"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["reference_formatter", "format", "--no-cache", "--resume", str(TESTFILE_PATH)],
+    )
+    with pytest.raises(SystemExit):
+        main()
+    monkeypatch.setattr(sys, "argv", sys.argv[:-1] + ["-o", str(output), sys.argv[-1]])
+    main()
+    assert output.read_text() == "".join(
+        format_document(TESTFILE_PATH.read_text(), default_options(), JOURNAL_MATCHER)
+    )
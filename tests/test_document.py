@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+import html
+import io
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.citation import (
+    format_document,
+    process_reference_file,
+    process_reference_html,
+)
+from itaxotools.reference_formatter.library.document import (
+    ParsedDocument,
+    RenderTarget,
+    TargetKind,
+    render_targets,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    OptionsDict,
+    default_options,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def changed_options() -> OptionsDict:
+    options = default_options()
+    options[Options.ProcessPageRangeVolume] = False
+    return options
+
+
+def html_document() -> str:
+    entries = "".join(
+        f"<p class=MsoNormal>{html.escape(line)}</p>\n"
+        for line in TESTFILE_PATH.read_text().splitlines()
+    )
+    return f"<html><head></head><body>\n{entries}</body></html>"
+
+
+def render(document: ParsedDocument, options: OptionsDict) -> str:
+    output: List[str] = []
+    document.render(options, output.append, document.doi_lookup())
+    return "".join(output)
+
+
+@pytest.mark.parametrize("options", [default_options(), changed_options()])
+def test_text(tmp_path: Path, options: OptionsDict) -> None:
+    with open(TESTFILE_PATH) as infile:
+        process_reference_file(infile, str(tmp_path), options, JOURNAL_MATCHER)
+    with open(TESTFILE_PATH) as infile:
+        document = ParsedDocument.from_text(infile, options, JOURNAL_MATCHER)
+    assert render(document, options) == (tmp_path / "output").read_text()
+
+
+@pytest.mark.parametrize("options", [default_options(), changed_options()])
+def test_html(tmp_path: Path, options: OptionsDict) -> None:
+    options[Options.HtmlFormat] = True
+    process_reference_html(
+        io.StringIO(html_document()), str(tmp_path), options, JOURNAL_MATCHER
+    )
+    document = ParsedDocument.from_html(io.StringIO(html_document()), JOURNAL_MATCHER)
+    assert render(document, options) == (tmp_path / "output").read_text()
+
+
+def test_lines() -> None:
+    options = changed_options()
+    document = ParsedDocument.from_html(io.StringIO(html_document()), JOURNAL_MATCHER)
+    output = render(document, options).splitlines()
+    assert len(output) == len(document)
+    assert document.lines(options, 5, 20, document.doi_lookup()) == output[5:20]
+
+
+def test_doi_lookup() -> None:
+    titles: List[str] = []
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        titles.append(title)
+        return "doi:10.1000/1"
+
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+    with open(TESTFILE_PATH) as infile:
+        document = ParsedDocument.from_text(infile, options, JOURNAL_MATCHER)
+    output: List[str] = []
+    # no DOIs are remembered before the lookup
+    assert "doi:10.1000/1" not in "".join(
+        document.lines(options, 0, 10, document.doi_lookup())
+    )
+    document.render(options, output.append, document.doi_lookup(lookup))
+    looked_up = len(titles)
+    assert looked_up > 0
+    document.render(changed_options(), output.append, document.doi_lookup(lookup))
+    document.render(options, output.append, document.doi_lookup(lookup))
+    assert len(titles) == looked_up
+    options[Options.CrossrefAPI] = CrossrefMatch.Fuzzy
+    document.render(options, output.append, document.doi_lookup(lookup))
+    assert len(titles) == 2 * looked_up
+
+
+def test_targets_text() -> None:
+    with open(TESTFILE_PATH) as infile:
+        document = ParsedDocument.from_text(infile, default_options(), JOURNAL_MATCHER)
+    outputs = [io.StringIO() for _ in range(3)]
+    render_targets(
+        document,
+        [
+            RenderTarget(TargetKind.Document, default_options(), outputs[0]),
+            RenderTarget(TargetKind.Text, changed_options(), outputs[1]),
+            RenderTarget(TargetKind.Json, default_options(), outputs[2]),
+        ],
+        document.doi_lookup(),
+    )
+    text = TESTFILE_PATH.read_text()
+    expected = "".join(format_document(text, default_options(), JOURNAL_MATCHER))
+    assert outputs[0].getvalue() == expected
+    assert outputs[1].getvalue() == "".join(
+        format_document(text, changed_options(), JOURNAL_MATCHER)
+    )
+    records = [json.loads(line) for line in outputs[2].getvalue().splitlines()]
+    assert [record["formatted"] for record in records] == expected.splitlines()
+
+
+def test_targets_html() -> None:
+    # the byte order mark isn't removed from html
+    input = html_document().replace("\ufeff", "")
+    document = ParsedDocument.from_html(io.StringIO(input), JOURNAL_MATCHER)
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    outputs = [io.StringIO() for _ in range(2)]
+    render_targets(
+        document,
+        [
+            RenderTarget(TargetKind.Document, default_options(), outputs[0]),
+            RenderTarget(TargetKind.Text, default_options(), outputs[1]),
+        ],
+        document.doi_lookup(),
+    )
+    assert outputs[0].getvalue() == "".join(
+        format_document(input, options, JOURNAL_MATCHER)
+    )
+    # the references are formatted as plain text
+    assert outputs[1].getvalue() == "".join(
+        format_document(TESTFILE_PATH.read_text(), default_options(), JOURNAL_MATCHER)
+    )
+
+
+def test_targets_doi_lookup() -> None:
+    titles: List[str] = []
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        titles.append(title)
+        return "doi:10.1000/1"
+
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+    with open(TESTFILE_PATH) as infile:
+        document = ParsedDocument.from_text(infile, options, JOURNAL_MATCHER)
+    render_targets(
+        document,
+        [
+            RenderTarget(kind, options, io.StringIO())
+            for kind in [TargetKind.Document, TargetKind.Json]
+        ],
+        lookup,
+    )
+    assert titles
+    assert len(titles) == len(set(titles))
+
+
+def test_render_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    text_output = tmp_path / "output.txt"
+    json_output = tmp_path / "output.jsonl"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "reference_formatter",
+            "render",
+            "--no-cache",
+            str(TESTFILE_PATH),
+            "-t",
+            "document",
+            str(text_output),
+            "-t",
+            "json",
+            str(json_output),
+            '{"ProcessPageRangeVolume": false}',
+        ],
+    )
+    main()
+    text = TESTFILE_PATH.read_text()
+    assert text_output.read_text() == "".join(
+        format_document(text, default_options(), JOURNAL_MATCHER)
+    )
+    records = [json.loads(line) for line in json_output.read_text().splitlines()]
+    assert [record["formatted"] for record in records] == "".join(
+        format_document(text, changed_options(), JOURNAL_MATCHER)
+    ).splitlines()
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        '{"ProcessJournalName": false}',
+        '{"ProcessJournalName": false, "ProcessPageRangeVolume": false}',
+    ],
+)
+def test_render_like_format(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, payload: str
+) -> None:
+    rendered = tmp_path / "rendered.txt"
+    formatted = tmp_path / "formatted.txt"
+    for command in [
+        ["render", "-t", "document", str(rendered)],
+        ["format", "-o", str(formatted)],
+    ]:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "reference_formatter",
+                command[0],
+                "--no-cache",
+                "--options",
+                payload,
+                str(TESTFILE_PATH),
+                *command[1:],
+            ],
+        )
+        main()
+    assert rendered.read_text() == formatted.read_text()
+
+
+def test_render_journal_names(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "reference_formatter",
+            "render",
+            "--no-cache",
+            str(TESTFILE_PATH),
+            "-t",
+            "document",
+            str(tmp_path / "output.txt"),
+            "-t",
+            "json",
+            str(tmp_path / "output.jsonl"),
+            '{"ProcessJournalName": false}',
+        ],
+    )
+    with pytest.raises(SystemExit):
+        main()
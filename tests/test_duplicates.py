@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.citation import Reference
+from itaxotools.reference_formatter.library.duplicates import (
+    deduplicate,
+    duplicate_clusters,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.utils import fold
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+FIRST = (
+    "Müller, J., Hipsley, C. A., Head, J. J., Kardjilov, N., Hilger, A., Wuttke, M."
+    " & Reisz, R. R. Eocene lizard from Germany reveals amphisbaenian origins."
+    " Nature 473, 364–367 (2011)."
+)
+SECOND = (
+    "Prum, R. O., Berv, J. S., Dornburg, A., Field, D. J., Townsend, J. P.,"
+    " Lemmon, E. C. & Lemmon, A. R. A fully resolved, comprehensive phylogeny"
+    " of birds (Aves) using targeted next generation DNA sequencing."
+    " Nature 526, 569–573 (2015)."
+)
+
+# each is a duplicate of FIRST
+DUPLICATES = [
+    # other separators and dashes
+    FIRST.replace(" & ", " and ").replace("–", "-"),
+    # without accents, with a capitalized title
+    FIRST.replace("Müller", "Muller").replace("lizard from", "Lizard From"),
+    # a typo in the title
+    FIRST.replace("amphisbaenian", "amphisbenian"),
+    # medial year
+    "Müller, J., Hipsley, C. A., Head, J. J., Kardjilov, N., Hilger, A., Wuttke, M."
+    " & Reisz, R. R. (2011). Eocene lizard from Germany reveals amphisbaenian"
+    " origins. Nature, 473, 364–367.",
+]
+
+# each is a different work than FIRST
+DIFFERENT = [
+    # another title
+    FIRST.replace("Eocene lizard from Germany", "Miocene snakes of Spain"),
+    # another year and page
+    FIRST.replace("364–367 (2011)", "12–19 (2012)"),
+]
+
+
+def parse(lines: List[str]) -> List[Reference]:
+    references = [Reference.parse(line, JOURNAL_MATCHER) for line in lines]
+    assert all(references)
+    return references  # type: ignore
+
+
+def test_fold() -> None:
+    assert fold("Müller, J.") == "muller j"
+    assert fold("Eocene  Lizard — from") == "eocene lizard from"
+    # ASCII takes a shorter path
+    assert fold("O'Brien-SMITH, J. 2001a") == "o brien smith j 2001a"
+
+
+@pytest.mark.parametrize("line", DUPLICATES)
+def test_duplicate(line: str) -> None:
+    assert duplicate_clusters(parse([FIRST, SECOND, line])) == [[0, 2]]
+
+
+@pytest.mark.parametrize("line", DIFFERENT)
+def test_different(line: str) -> None:
+    assert duplicate_clusters(parse([FIRST, SECOND, line])) == []
+
+
+def test_clusters() -> None:
+    references = parse([DUPLICATES[0], SECOND, FIRST, SECOND, *DUPLICATES[1:]])
+    assert duplicate_clusters(references) == [[0, 2, 4, 5, 6], [1, 3]]
+    assert deduplicate(references) == [0, 1]
+
+
+def test_test_list() -> None:
+    lines = TESTFILE_PATH.read_text().splitlines()
+    parsed = (Reference.parse(line, JOURNAL_MATCHER) for line in lines)
+    references = [reference for reference in parsed if reference]
+    assert duplicate_clusters(references) == []
+    assert duplicate_clusters(references + references[:10]) == [
+        [i, len(references) + i] for i in range(10)
+    ]
+
+
+def test_command(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    input = tmp_path / "input.txt"
+    input.write_text("\n".join(["References", FIRST, SECOND, *DUPLICATES[:2]]))
+    monkeypatch.setattr(sys, "argv", ["reference_formatter", "duplicates", str(input)])
+    main()
+    assert capsys.readouterr().out.splitlines() == [FIRST, *DUPLICATES[:2]]
+    monkeypatch.setattr(
+        sys, "argv", ["reference_formatter", "duplicates", "--remove", str(input)]
+    )
+    main()
+    assert capsys.readouterr().out.splitlines() == ["References", FIRST, SECOND]
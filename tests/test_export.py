@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.citation import txt_to_references
+from itaxotools.reference_formatter.library.export import (
+    EXPORT_COLUMNS,
+    ExportDependencyMissing,
+    column_batches,
+    export_format,
+    export_row,
+    write_arrow,
+    write_csv,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+REFERENCE = (
+    "Lemmon, A. R., Emme, S. & Lemmon, E. M. 2012. Anchored hybrid enrichment"
+    " for massively high-throughput phylogenetics. Syst. Biol. 61(12): 721–744."
+    " doi: 10.1093/sysbio/sys049"
+)
+
+
+def entries(text: str) -> list:
+    return list(
+        txt_to_references(io.StringIO(text), default_options(), JOURNAL_MATCHER)
+    )
+
+
+def test_row() -> None:
+    [reference] = entries(REFERENCE)
+    row = export_row(3, reference)
+    assert list(row) == list(EXPORT_COLUMNS)
+    assert row["entry"] == 3
+    assert row["status"] == "Parsed"
+    assert row["authors"] == "Lemmon, A.R.; Emme, S.; Lemmon, E.M."
+    assert row["first_author"] == "Lemmon"
+    assert row["author_count"] == 3
+    assert not row["et_al"]
+    assert row["year"] == "2012"
+    assert row["title"] == (
+        "Anchored hybrid enrichment for massively high-throughput phylogenetics"
+    )
+    assert row["journal"] == "Syst. Biol."
+    assert row["journal_full_name"] == "Systematic Biology"
+    assert row["journal_abbrev"] == "Syst Biol"
+    assert (row["volume"], row["issue"]) == ("61", "12")
+    assert (row["first_page"], row["last_page"]) == ("721", "744")
+    assert row["doi"] == "10.1093/sysbio/sys049"
+
+
+def test_unparsed_row() -> None:
+    row = export_row(0, "References")
+    assert row["status"] == "Unparsed"
+    assert row["source"] == "References"
+    assert all(row[name] is None for name in list(EXPORT_COLUMNS)[3:])
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 1000])
+def test_batches(batch_size: int) -> None:
+    parsed = entries(TESTFILE_PATH.read_text())
+    batches = list(column_batches(parsed, batch_size))
+    assert all(len(batch["entry"]) <= batch_size for batch in batches)
+    assert [index for batch in batches for index in batch["entry"]] == list(
+        range(len(parsed))
+    )
+
+
+def test_csv() -> None:
+    parsed = entries(TESTFILE_PATH.read_text())
+    output = io.StringIO()
+    assert write_csv(column_batches(parsed, 10), output) == len(parsed)
+    output.seek(0)
+    rows = list(csv.DictReader(output))
+    assert len(rows) == len(parsed)
+    for row, entry in zip(rows, parsed):
+        expected = export_row(int(row["entry"]), entry)
+        assert row == {
+            name: "" if value is None else str(value)
+            for name, value in expected.items()
+        }
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_arrow(tmp_path: Path, format: str) -> None:
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    parsed = entries(TESTFILE_PATH.read_text())
+    path = str(tmp_path / f"references.{format}")
+    assert write_arrow(column_batches(parsed, 10), path, format) == len(parsed)
+    if format == "parquet":
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.column("entry").to_pylist() == list(range(len(parsed)))
+    assert table.column("year").to_pylist() == [
+        export_row(0, entry)["year"] for entry in parsed
+    ]
+
+
+def test_without_pyarrow(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ExportDependencyMissing):
+        write_arrow(iter([]), str(tmp_path / "references.parquet"))
+
+
+def test_format() -> None:
+    assert export_format(None) == "csv"
+    assert export_format("out.parquet") == "parquet"
+    assert export_format("out.feather") == "arrow"
+    assert export_format("out.parquet", "csv") == "csv"
+    with pytest.raises(ValueError):
+        export_format(None, "xlsx")
+
+
+def test_command(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    input = tmp_path / "input.txt"
+    input.write_text("References\n" + REFERENCE)
+    monkeypatch.setattr(
+        sys, "argv", ["reference_formatter", "export", "--no-cache", str(input)]
+    )
+    main()
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [row["status"] for row in rows] == ["Unparsed", "Parsed"]
+    assert rows[1]["journal_full_name"] == "Systematic Biology"
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import html
+import sys
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.cache import ResultCache
+from itaxotools.reference_formatter.library.citation import (
+    FormattedReference,
+    ParseStatus,
+    format_document,
+    format_references,
+    process_reference_file,
+    process_reference_html,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import Options, default_options
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def html_document() -> str:
+    entries = "".join(
+        f"<p class=MsoNormal>{html.escape(line)}</p>\n"
+        for line in TESTFILE_PATH.read_text().splitlines()
+    )
+    return f"<html><head></head><body>\n{entries}</body></html>"
+
+
+def chunks(s: str, size: int) -> Iterator[str]:
+    for i in range(0, len(s), size):
+        yield s[i : i + size]
+
+
+def check_results(results: List[FormattedReference]) -> None:
+    assert results
+    for result in results:
+        if result.status == ParseStatus.Parsed:
+            assert set(result.spans) >= {"authors", "year", "article"}
+            year = result.source[result.spans["year"]]
+            assert any(c.isdigit() for c in year)
+        else:
+            assert result.formatted.startswith("*")
+            assert not result.spans
+
+
+def test_text(tmp_path: Path) -> None:
+    options = default_options()
+    with open(TESTFILE_PATH) as infile:
+        process_reference_file(infile, str(tmp_path), options, JOURNAL_MATCHER)
+    text = TESTFILE_PATH.read_text()
+    assert (
+        "".join(format_document(text, options, JOURNAL_MATCHER))
+        == (tmp_path / "output").read_text()
+    )
+    # lines are taken from any iterable
+    lines = (line for line in text.splitlines())
+    results = list(format_references(lines, options, JOURNAL_MATCHER))
+    check_results(results)
+    assert [result.formatted + "\n" for result in results] == list(
+        format_document(text, options, JOURNAL_MATCHER)
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_html(tmp_path: Path, chunk_size: int) -> None:
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    with open(tmp_path / "input.html", mode="w") as infile:
+        infile.write(html_document())
+    with open(tmp_path / "input.html") as infile:
+        process_reference_html(infile, str(tmp_path), options, JOURNAL_MATCHER)
+    document = chunks(html_document(), chunk_size)
+    assert (
+        "".join(format_document(document, options, JOURNAL_MATCHER))
+        == (tmp_path / "output").read_text()
+    )
+    document = chunks(html_document(), chunk_size)
+    check_results(list(format_references(document, options, JOURNAL_MATCHER)))
+
+
+def test_html_cache(tmp_path: Path) -> None:
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    expected = list(format_references(html_document(), options, JOURNAL_MATCHER))
+    for _ in range(2):
+        with ResultCache(tmp_path / "cache.sqlite") as cache:
+            results = list(
+                format_references(html_document(), options, JOURNAL_MATCHER, cache)
+            )
+        assert results == expected
+    assert cache.hits["formatted"] == len(expected)
+
+
+@pytest.mark.parametrize(
+    "command", [["format", "--no-cache"], ["duplicates"], ["export", "--no-cache"]]
+)
+def test_command_stdout(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+    caplog: pytest.LogCaptureFixture,
+    command: List[str],
+) -> None:
+    input = tmp_path / "input.txt"
+    # the name is reported by the parser
+    input.write_text("Smith 2000. Title. Zootaxa 1: 1-2.\nReferences\n")
+    monkeypatch.setattr(sys, "argv", ["reference_formatter", *command, str(input)])
+    main()
+    assert "Unexpected name" not in capsys.readouterr().out
+    assert "Unexpected name: Smith" in caplog.text
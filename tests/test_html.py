@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import io
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter.library.handle_html import (
+    HTMLList,
+    HTMLListReader,
+    ListEntry,
+    _search_tag,
+    _TagScanner,
+    extract_tags,
+)
+
+DOCUMENTS = [
+    "<html><head><style>p { margin: 0 }</style></head><body>"
+    "<div><p class=MsoNormal>Lemmon AR. 2008. <i>Title</i>. Zootaxa 1:1-2.</p>\n"
+    "<P>Glaw F, Vences M. 2007. Title. Herpetologica 2:3-4.</P></div>"
+    "</body></html>",
+    "<html><body>\n<ul>\n<li>First &amp; entry</li>\n<li>Second entry\n"
+    "<li><b>Third entry</b>\n</ul>\n</body>\n</html>",
+    "<HTML><BODY><h1>References</h1><OL><LI>First</LI><LI>Second</LI></OL></BODY>"
+    "<p>after the body</p></HTML>",
+    "<ol><li>First<li>Second</ol>",
+    "<p>First<p>Second<p>Third",
+    "<html><body><p>Unclosed</body></html>",
+]
+
+
+def read(document: str, chunk_size: int) -> List[ListEntry]:
+    reader = HTMLListReader()
+    return list(reader.read(io.StringIO(document), chunk_size))
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 17, 1 << 16])
+def test_reader(document: str, chunk_size: int) -> None:
+    assert read(document, chunk_size) == list(HTMLList(document))
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_assemble(document: str) -> None:
+    html = HTMLList(document)
+    expected = "".join(line + "\n" for line in html.assemble_html(html))
+    reader = HTMLListReader()
+    entries = reader.read(io.StringIO(document), 3)
+    assert "".join(reader.assemble_html(entries)) == expected
+
+
+def test_entries_are_streamed() -> None:
+    reader = HTMLListReader()
+    assert reader.feed("<html><body><ul><li>First</li><li>Sec") == [
+        ListEntry(None, "First")
+    ]
+    assert reader.feed("ond</li></ul>") == [ListEntry(None, "Second")]
+    assert reader.close() == []
+
+
+SCANNED = "<x <li>a</ li><LINK>b</Li ><  li x=1><pre></p><p\n></P>< /li>"
+
+
+@pytest.mark.parametrize("tag", ["li", "/li", "p", "/p", "pre", "link"])
+def test_scanner(tag: str) -> None:
+    scanner = _TagScanner(SCANNED, 0, len(SCANNED))
+    for start in range(len(SCANNED) + 1):
+        assert scanner.find(tag, start) == _search_tag(
+            SCANNED, tag, start, len(SCANNED)
+        )
+
+
+def test_no_list() -> None:
+    with pytest.raises(ValueError):
+        read("<html><body>text</body></html>", 4)
+
+
+STYLED = "Smith, A. &amp; <b>Jones</b>, B. (2001) <i>Title</i> of <i>Zootaxa</i>"
+
+
+@pytest.mark.parametrize(
+    "s, expected",
+    [
+        ("Smith", "Smith"),
+        ("Jones", "<b>Jones</b>"),
+        ("Zootaxa", "<i>Zootaxa</i>"),
+        ("of", "of"),
+    ],
+)
+def test_surround_tags(s: str, expected: str) -> None:
+    text, tags = extract_tags(STYLED)
+    assert tags.surround_tags(s, text.index(s)) == expected
+
+
+@pytest.mark.parametrize(
+    "s, expected",
+    [
+        ("Smith, A.", "Smith, A."),
+        ("Smith, A. & ", "Smith, A. &amp; <b>"),
+        ("A. & Jones", "A. &amp; <b>Jones</b>"),
+        ("(2001) Title of", "(2001) <i>Title</i> of"),
+    ],
+)
+def test_insert_tags(s: str, expected: str) -> None:
+    text, tags = extract_tags(STYLED)
+    assert tags.insert_tags(s, text.index(s)) == expected
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from itaxotools.reference_formatter.library.journal_list import (
+    N_NAME_FORMS,
+    JournalIndex,
+    JournalMatcher,
+    NameForm,
+    load_index,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def found_journals(
+    journal_matcher: JournalMatcher,
+) -> List[Optional[Tuple[Dict[NameForm, str], slice]]]:
+    return [
+        journal_matcher.extract_journal(line)
+        for line in TESTFILE_PATH.read_text().splitlines()
+    ]
+
+
+def test_index() -> None:
+    names = ["Journal of Herpetology", "J. Herpetol.", "J Herpetol", "J.Herpetol."]
+    index = JournalIndex(JournalIndex.build(names * 2 + ["Zoölogy"], "00ff" * 4))
+    assert len(index) == 2 * N_NAME_FORMS + 1
+    assert index.version == "00ff" * 4
+    assert index.row(1) == names
+    assert index.name(2 * N_NAME_FORMS) == "Zoölogy"
+    assert index.path is None
+
+
+def test_mapped_index(tmp_path: Path) -> None:
+    path = tmp_path / "journals.idx"
+    journal_matcher = JournalMatcher(path)
+    assert journal_matcher.index.path == path
+    assert len(journal_matcher.index) == len(JOURNAL_MATCHER.index)
+    assert found_journals(journal_matcher) == found_journals(JOURNAL_MATCHER)
+    assert journal_matcher.journal_names(0) == dict(
+        zip(NameForm, journal_matcher.index.row(0))
+    )
+
+
+@pytest.mark.parametrize("content", [b"", b"RFJI\1\0\0\0", b"not an index" * 10])
+def test_invalid_index(tmp_path: Path, content: bytes) -> None:
+    path = tmp_path / "journals.idx"
+    path.write_bytes(content)
+    index = load_index(path, JOURNAL_MATCHER.version)
+    assert index.path == path
+    assert list(index.names()) == list(JOURNAL_MATCHER.index.names())
+
+
+def test_stale_index(tmp_path: Path) -> None:
+    path = tmp_path / "journals.idx"
+    path.write_bytes(JournalIndex.build(["Journal"] * N_NAME_FORMS, "0" * 16))
+    index = load_index(path, JOURNAL_MATCHER.version)
+    assert index.version == JOURNAL_MATCHER.version
+    assert len(index) == len(JOURNAL_MATCHER.index)
+
+
+def test_unwritable_index(tmp_path: Path) -> None:
+    # the parent of the index is a file
+    path = tmp_path / "file" / "journals.idx"
+    path.parent.write_text("")
+    index = load_index(path, JOURNAL_MATCHER.version)
+    assert index.path is None
+    assert len(index) == len(JOURNAL_MATCHER.index)
+
+
+def test_pickle() -> None:
+    journal_matcher = pickle.loads(pickle.dumps(JOURNAL_MATCHER))
+    assert journal_matcher.index.path == JOURNAL_MATCHER.index.path
+    assert found_journals(journal_matcher) == found_journals(JOURNAL_MATCHER)
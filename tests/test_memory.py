@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import html
+import io
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter.library.citation import (
+    Reference,
+    process_reference_html,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.memory import (
+    MIB,
+    MemoryBudgetExceeded,
+    profile_memory,
+)
+from itaxotools.reference_formatter.library.options import Options, default_options
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+# budgets of the peaks in MiB, see also benchmarks/bench_memory.py
+JOURNAL_MATCHER_BUDGET = 16
+REFERENCE_BUDGET = 3 / 1024
+HTML_BUDGET = 4
+
+
+def test_profile_memory() -> None:
+    with profile_memory("outer") as outer:
+        kept = [bytes(1024) for _ in range(1024)]
+        with profile_memory("inner") as inner:
+            temporary = [bytes(1024) for _ in range(2048)]
+            del temporary
+    assert inner.peak >= 2 * MIB
+    assert inner.retained < MIB / 8
+    assert outer.peak >= 3 * MIB
+    assert outer.retained >= MIB
+    assert outer.sites[0].location.startswith(__file__)
+    assert outer.sites[0].count >= 1024
+    assert "outer: peak 3." in outer.report()
+    outer.check(4)
+    with pytest.raises(MemoryBudgetExceeded):
+        outer.check(2)
+    del kept
+
+
+def test_journal_matcher_budget() -> None:
+    with profile_memory("journal_matcher") as profile:
+        JournalMatcher()
+    profile.check(JOURNAL_MATCHER_BUDGET)
+
+
+def test_parse_budget() -> None:
+    lines = TESTFILE_PATH.read_text().splitlines() * 10
+    references: List[Reference] = []
+    with profile_memory("parse") as profile:
+        for line in lines:
+            reference = Reference.parse(line, JOURNAL_MATCHER)
+            if reference:
+                references.append(reference)
+    assert len(references) > len(lines) / 2
+    profile.check(REFERENCE_BUDGET * len(lines))
+
+
+def test_html_budget(tmp_path: Path) -> None:
+    entries = "".join(
+        f"<p class=MsoNormal>{html.escape(line)}</p>\n"
+        for line in TESTFILE_PATH.read_text().splitlines() * 10
+    )
+    document = f"<html><head></head><body>\n{entries}</body></html>"
+    options = default_options()
+    options[Options.HtmlFormat] = True
+    with profile_memory("html") as profile:
+        process_reference_html(
+            io.StringIO(document), str(tmp_path), options, JOURNAL_MATCHER
+        )
+    profile.check(HTML_BUDGET)
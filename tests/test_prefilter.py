@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import io
+import random
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter.library.citation import (
+    DEFAULT_PARSER,
+    parse_line,
+    txt_to_references,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+NON_REFERENCES = [
+    "References",
+    "LITERATURE CITED",
+    "4. DISCUSSION",
+    "ZOOTAXA 4821 (2) 123",
+    "© 2020 Magnolia Press",
+    "* Corresponding author: smith@example.org",
+    "---",
+]
+
+# lines near the boundaries of the checks
+EDGE_CASES = [
+    "DOI: 10.1000/ABC",
+    "doi: 10.1000/abc",
+    "https://doi.org/10.1000/ABC",
+    "12",
+    "12. 5 Ab, 7 x y z (1999)",
+    "12. 5 Ab, 7 x y z (1999).",
+    "5 Ab, 7 x y z 1999",
+    "1. Smith, J. 2000. Title of the work. Zootaxa 1, 1-2.",
+    "1.Smith, J. (2000) Title",
+    "SMITH, J. (2000) Title of the work",
+    "A,b 1",
+    "(12) Smith, J. 2000",
+]
+
+# characters of the random lines, that exercise the parser
+ALPHABET = "aAbB19 ().,:-–&doi"
+
+
+def agrees(line: str) -> bool:
+    """
+    The pre-filter only rejects lines, that are not parsed
+    """
+    return DEFAULT_PARSER.may_be_reference(line) or (
+        parse_line(line, JOURNAL_MATCHER) is None
+    )
+
+
+def test_references() -> None:
+    lines = TESTFILE_PATH.read_text().splitlines()
+    for line in lines:
+        assert agrees(line.strip())
+
+
+@pytest.mark.parametrize("line", NON_REFERENCES)
+def test_non_references(line: str) -> None:
+    assert not DEFAULT_PARSER.may_be_reference(line)
+    assert parse_line(line, JOURNAL_MATCHER) is None
+
+
+@pytest.mark.parametrize("line", EDGE_CASES)
+def test_edge_cases(line: str) -> None:
+    assert agrees(line)
+
+
+def test_random_lines() -> None:
+    rng = random.Random(0)
+    for _ in range(2000):
+        line = "".join(rng.choices(ALPHABET, k=rng.randint(1, 30))).strip()
+        assert agrees(line)
+
+
+def test_passed_through() -> None:
+    lines = TESTFILE_PATH.read_text().splitlines()
+    mixed: List[str] = []
+    for line, heading in zip(lines, NON_REFERENCES * len(lines)):
+        mixed += [heading, line]
+    output = list(
+        txt_to_references(io.StringIO("\n".join(mixed)), default_options(), None)
+    )
+    for heading in NON_REFERENCES:
+        assert heading in output
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import io
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter.library.citation import process_reference_file
+from itaxotools.reference_formatter.library.options import default_options
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.progress import Cancelled, Progress
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def test_progress(tmp_path: Path) -> None:
+    lines = TESTFILE_PATH.read_text().splitlines()
+    progress = Progress(len(lines))
+    with open(TESTFILE_PATH) as infile:
+        process_reference_file(
+            infile, str(tmp_path), default_options(), JOURNAL_MATCHER, None, progress
+        )
+    output = (tmp_path / "output").read_text().splitlines()
+    assert progress.done == len(output)
+    assert progress.throughput() > 0
+
+
+def test_cancel(tmp_path: Path) -> None:
+    progress = Progress()
+
+    class CancellingInput(io.StringIO):
+        # cancels the run while the input is read
+        def __next__(self) -> str:
+            if progress.done == 3:
+                progress.cancel()
+            return super().__next__()
+
+    input = CancellingInput(TESTFILE_PATH.read_text())
+    with pytest.raises(Cancelled):
+        process_reference_file(
+            input, str(tmp_path), default_options(), JOURNAL_MATCHER, None, progress
+        )
+    assert progress.done == 3
+
+
+def test_cancel_doi_lookup() -> None:
+    progress = Progress()
+    release = threading.Event()
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        release.wait()
+        return "doi:10.1000/1"
+
+    threading.Timer(0.05, progress.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        progress.doi_lookup(lookup)("title", False)
+    # the lookup in flight is abandoned
+    assert time.monotonic() - start < 5
+    release.set()
+
+
+def test_doi_lookup() -> None:
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        if title == "error":
+            raise ValueError(title)
+        return "doi:10.1000/1"
+
+    cancellable_lookup = Progress().doi_lookup(lookup)
+    assert cancellable_lookup("title", False) == "doi:10.1000/1"
+    with pytest.raises(ValueError):
+        cancellable_lookup("error", False)
+
+
+def test_output_listener(tmp_path: Path) -> None:
+    written: List[str] = []
+    with open(TESTFILE_PATH) as infile:
+        process_reference_file(
+            infile,
+            str(tmp_path),
+            default_options(),
+            JOURNAL_MATCHER,
+            on_output=written.append,
+        )
+    assert "".join(written) == (tmp_path / "output").read_text()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import bz2
+import gzip
+import lzma
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library import readers
+from itaxotools.reference_formatter.library.citation import format_document
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import default_options
+from itaxotools.reference_formatter.library.readers import (
+    MappedTextReader,
+    compression_opener,
+    open_input,
+    plain_extension,
+)
+from itaxotools.reference_formatter.library.shards import ShardError, plan_shards
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+
+# line ends of all kinds and an invalid byte
+MIXED_TEXT = b"first\r\nsecond\rthird\n\xff fourth\r\n\r\nlast"
+
+
+def read_lines(path: Path) -> List[str]:
+    with open(path, errors="replace") as file:
+        return list(file)
+
+
+def read_text(path: Path) -> str:
+    with open(path, errors="replace") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("extension", COMPRESSORS)
+def test_compressed(tmp_path: Path, extension: str) -> None:
+    path = tmp_path / ("list.txt" + extension)
+    path.write_bytes(COMPRESSORS[extension](TESTFILE_PATH.read_bytes()))
+    assert compression_opener(str(path))
+    with open_input(str(path)) as file:
+        assert list(file) == read_lines(TESTFILE_PATH)
+
+
+def test_plain(tmp_path: Path) -> None:
+    assert compression_opener(str(TESTFILE_PATH)) is None
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert compression_opener(str(empty)) is None
+
+
+@pytest.mark.parametrize("content", [MIXED_TEXT, MIXED_TEXT + b"\r", b""])
+def test_mapped_lines(tmp_path: Path, content: bytes) -> None:
+    path = tmp_path / "list.txt"
+    path.write_bytes(content)
+    with MappedTextReader(str(path)) as file:
+        assert list(file) == read_lines(path)
+    with MappedTextReader(str(path)) as file:
+        assert list(iter(file.readline, "")) == read_lines(path)
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 1 << 16, -1])
+def test_mapped_read(tmp_path: Path, size: int) -> None:
+    path = tmp_path / "list.txt"
+    path.write_bytes(MIXED_TEXT * 3)
+    with MappedTextReader(str(path)) as file:
+        pieces = list(iter(lambda: file.read(size), ""))
+    assert "".join(pieces) == read_text(path)
+
+
+@pytest.mark.parametrize("lines", [1, 2])
+def test_mapped_continued(tmp_path: Path, lines: int) -> None:
+    path = tmp_path / "list.txt"
+    path.write_bytes(MIXED_TEXT)
+    with MappedTextReader(str(path)) as file:
+        # the second line is split from "second\rthird\n"
+        first = "".join(file.readline() for _ in range(lines))
+        assert first + file.read() == read_text(path)
+
+
+def test_open_input(monkeypatch: pytest.MonkeyPatch) -> None:
+    with open_input(str(TESTFILE_PATH)) as file:
+        assert not isinstance(file, MappedTextReader)
+    monkeypatch.setattr(readers, "MMAP_THRESHOLD", 0)
+    with open_input(str(TESTFILE_PATH)) as file:
+        assert isinstance(file, MappedTextReader)
+        assert list(file) == read_lines(TESTFILE_PATH)
+
+
+@pytest.mark.parametrize(
+    "path, extension",
+    [
+        ("list.txt", ".txt"),
+        ("list.HTML.gz", ".html"),
+        ("list.htm.bz2", ".htm"),
+        ("list.xz", ""),
+    ],
+)
+def test_plain_extension(path: str, extension: str) -> None:
+    assert plain_extension(path) == extension
+
+
+def test_shards(tmp_path: Path) -> None:
+    path = tmp_path / "list.txt.gz"
+    path.write_bytes(gzip.compress(TESTFILE_PATH.read_bytes()))
+    with pytest.raises(ShardError):
+        plan_shards(str(path), 2, {})
+
+
+def test_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    compressed = tmp_path / "list.txt.gz"
+    compressed.write_bytes(gzip.compress(TESTFILE_PATH.read_bytes()))
+    output = tmp_path / "output.txt"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "reference_formatter",
+            "format",
+            "--no-cache",
+            str(compressed),
+            "-o",
+            str(output),
+        ],
+    )
+    main()
+    assert output.read_text() == "".join(
+        format_document(TESTFILE_PATH.read_text(), default_options(), JOURNAL_MATCHER)
+    )
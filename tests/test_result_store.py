@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import io
+import random
+from pathlib import Path
+from typing import List
+
+from itaxotools.reference_formatter.library.result_store import ResultStore
+
+LINES = [f"{i}. Reference number {i}, ünïcode" for i in range(10000)]
+
+
+def make_store(tmp_path: Path) -> ResultStore:
+    store = ResultStore(str(tmp_path / "preview"))
+    text = "\n".join(LINES)
+    # the output arrives in arbitrary pieces
+    rng = random.Random(0)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 200)
+        store.append(text[position : position + size])
+        position += size
+    store.finish()
+    return store
+
+
+def saved(store: ResultStore) -> List[str]:
+    outfile = io.StringIO()
+    store.save(outfile)
+    return outfile.getvalue().split("\n")[:-1]
+
+
+def test_lines(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    assert len(store) == len(LINES)
+    assert store.lines(0, 5) == LINES[0:5]
+    assert store.lines(9998, 10100) == LINES[9998:]
+    assert store.lines(10000, 10100) == []
+    assert list(store.iter_lines()) == LINES
+    assert saved(store) == LINES
+
+
+def test_edits(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    expected = list(LINES)
+    window = store.lines(100, 110)
+    window[3] = "corrected"
+    store.edit(100, 110, window)
+    expected[103] = "corrected"
+    assert store.edits == {103: ["corrected"]}
+
+    window = store.lines(200, 210)
+    del window[5]
+    window.insert(0, "inserted")
+    store.edit(200, 210, window)
+    expected[200:210] = window
+    assert store.lines(195, 215) == expected[195:215]
+
+    # edits of a window, that includes earlier edits
+    window = store.lines(195, 215)
+    window[0] = "changed"
+    store.edit(195, 215, window)
+    expected[195] = "changed"
+    assert store.lines(190, 220) == expected[190:220]
+
+    # restoring the original text removes the edit
+    window = store.lines(100, 110)
+    window[3] = LINES[103]
+    store.edit(100, 110, window)
+    expected[103] = LINES[103]
+    assert 103 not in store.edits
+    assert saved(store) == expected
+
+
+def test_lines_after_end(tmp_path: Path) -> None:
+    store = ResultStore(str(tmp_path / "preview"))
+    store.edit(0, 100, ["pasted", "text"])
+    assert store.lines(0, 100) == ["pasted", "text"]
+    assert saved(store) == ["pasted", "text"]
@@ -2,10 +2,17 @@
 
 from typing import Iterator
 from pathlib import Path
+import json
 
 import pytest
 
-from itaxotools.reference_formatter.library.citation import txt_to_references, Reference
+from itaxotools.reference_formatter.library.citation import (
+    txt_to_references,
+    txt_first_step,
+    txt_second_step,
+    intermediate_records,
+    Reference,
+)
 from itaxotools.reference_formatter.library.options import default_options
 from itaxotools.reference_formatter.library.journal_list import JournalMatcher
 
@@ -25,3 +32,27 @@ def test_serialize(ref: Reference) -> None:
     ref_serialized = ref.serialize("{}")
     ref_deserialized = ref.deserialize(ref_serialized, "{}", JOURNAL_MATCHER)
     assert ref_deserialized == ref
+
+
+@pytest.mark.parametrize("ref", references())
+def test_record(ref: Reference) -> None:
+    ref_record = json.loads(json.dumps(ref.to_record()))
+    assert Reference.from_record(ref_record, JOURNAL_MATCHER) == ref
+
+
+def test_second_step(tmp_path: Path) -> None:
+    options = default_options()
+    testfile_path = Path(__file__).with_name("Referencelist2.txt")
+    with open(testfile_path) as testfile:
+        txt_first_step(testfile, str(tmp_path), options, JOURNAL_MATCHER)
+    view = (tmp_path / "output").read_text().splitlines()
+    txt_second_step(view, str(tmp_path), options, JOURNAL_MATCHER)
+    from_view = (tmp_path / "output").read_text()
+    txt_second_step(
+        view,
+        str(tmp_path),
+        options,
+        JOURNAL_MATCHER,
+        intermediate_records(str(tmp_path)),
+    )
+    assert (tmp_path / "output").read_text() == from_view
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import http.client
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+from itaxotools.reference_formatter.library.citation import (
+    format_document,
+    process_reference_file,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    Options,
+    YearFormat,
+    default_options,
+    options_from_json,
+)
+from itaxotools.reference_formatter.library import cache
+from itaxotools.reference_formatter.library.server import FormatterServer
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+@pytest.fixture(scope="module")
+def url() -> Iterator[str]:
+    with FormatterServer(
+        ("127.0.0.1", 0), workers=2, use_cache=False, journal_matcher=JOURNAL_MATCHER
+    ) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.server_address[:2]
+        yield f"http://{host}:{port}"
+        server.shutdown()
+
+
+def post(url: str, request: Any) -> Tuple[int, Dict[str, Any]]:
+    data = json.dumps(request).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_batch(url: str, tmp_path: Path) -> None:
+    options = default_options()
+    options[Options.YearFormat] = YearFormat.Period
+    with open(TESTFILE_PATH) as infile:
+        process_reference_file(infile, str(tmp_path), options, JOURNAL_MATCHER)
+    status, response = post(
+        url + "/batch",
+        {"text": TESTFILE_PATH.read_text(), "options": {"YearFormat": "Period"}},
+    )
+    assert status == 200
+    assert response["output"] == (tmp_path / "output").read_text()
+
+
+def test_journal_names(url: str) -> None:
+    text = TESTFILE_PATH.read_text()
+    payload = {"ProcessJournalName": False}
+    status, response = post(url + "/batch", {"text": text, "options": payload})
+    assert status == 200
+    assert response["output"] == "".join(
+        format_document(text, options_from_json(payload), None)
+    )
+
+
+def test_single(url: str, tmp_path: Path) -> None:
+    line = TESTFILE_PATH.read_text().splitlines()[1]
+    (tmp_path / "input.txt").write_text(line)
+    with open(tmp_path / "input.txt") as infile:
+        process_reference_file(
+            infile, str(tmp_path), default_options(), JOURNAL_MATCHER
+        )
+    status, response = post(url + "/format", {"reference": line})
+    assert status == 200
+    assert response["formatted"] + "\n" == (tmp_path / "output").read_text()
+
+
+@pytest.mark.parametrize(
+    "endpoint, payload, expected_status",
+    [
+        ("/format", {"reference": "a\nb"}, 400),
+        ("/format", {"reference": "a", "options": {"NoSuchOption": True}}, 400),
+        ("/batch", {"text": "a", "html": "b"}, 400),
+        ("/batch", [], 400),
+        ("/batch", {"html": "<html><body>text</body></html>"}, 422),
+        ("/unknown", {}, 404),
+    ],
+)
+def test_errors(url: str, endpoint: str, payload: Any, expected_status: int) -> None:
+    status, response = post(url + endpoint, payload)
+    assert status == expected_status
+    assert "error" in response
+
+
+def post_raw(url: str, length: Any) -> int:
+    host, port = url.split("//")[1].split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    connection.putrequest("POST", "/format")
+    if length is not None:
+        connection.putheader("Content-Length", length)
+    connection.endheaders()
+    status = connection.getresponse().status
+    connection.close()
+    return status
+
+
+@pytest.mark.parametrize(
+    "length, expected_status", [("abc", 400), ("-1", 400), (None, 411)]
+)
+def test_content_length(url: str, length: Any, expected_status: int) -> None:
+    assert post_raw(url, length) == expected_status
+
+
+def test_broken_pool() -> None:
+    with FormatterServer(
+        ("127.0.0.1", 0), workers=1, use_cache=False, journal_matcher=JOURNAL_MATCHER
+    ) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}/format"
+        line = TESTFILE_PATH.read_text().splitlines()[1]
+        # the worker dies while formatting a request
+        broken = server.pool
+        with pytest.raises(Exception):
+            broken.submit(os._exit, 1).result()
+        status, _ = post(url, {"reference": line})
+        assert status == 200
+        assert server.pool is not broken
+        server.shutdown()
+
+
+def test_shared_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    # a worker, that waits for the other one to release the cache, fails quickly
+    monkeypatch.setattr(cache, "BUSY_TIMEOUT", 0.5)
+    lines = TESTFILE_PATH.read_text().splitlines()
+    texts = [
+        "\n".join(
+            line.replace(" ", f" {batch}{copy} ", 1)
+            for copy in range(40)
+            for line in lines
+        )
+        for batch in "ab"
+    ]
+    with FormatterServer(
+        ("127.0.0.1", 0), workers=2, use_cache=True, journal_matcher=JOURNAL_MATCHER
+    ) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.server_address[:2]
+        statuses: List[int] = []
+
+        def send(text: str) -> None:
+            status, _ = post(f"http://{host}:{port}/batch", {"text": text})
+            statuses.append(status)
+
+        clients = [threading.Thread(target=send, args=(text,)) for text in texts]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        server.shutdown()
+    assert statuses == [200, 200]
+
+
+def test_options_from_json() -> None:
+    options = options_from_json(
+        {"RemoveDoi": True, "YearFormat": 2, "CrossrefAPI": "Fuzzy"}
+    )
+    assert options[Options.RemoveDoi] is True
+    assert options[Options.YearFormat] == YearFormat(2)
+    assert options[Options.CrossrefAPI].is_fuzzy()
+    for payload in [{"RemoveDoi": 1}, {"YearFormat": 100}, {"YearFormat": "No"}]:
+        with pytest.raises(ValueError):
+            options_from_json(payload)
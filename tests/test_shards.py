@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from itaxotools.reference_formatter import main
+from itaxotools.reference_formatter.library.citation import (
+    format_document,
+    is_doi_line,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    default_options,
+    options_from_json,
+)
+from itaxotools.reference_formatter.library.shards import (
+    ShardError,
+    merge_report,
+    merge_shards,
+    plan_shards,
+    run_local,
+    run_shard,
+    shard_boundaries,
+    shard_lines,
+    write_plan,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+
+def reference_list(tmp_path: Path) -> Path:
+    """
+    The test list with DOIs on separate lines, some after empty lines,
+    and headings
+    """
+    lines: List[str] = ["References"]
+    for i, line in enumerate(TESTFILE_PATH.read_text().splitlines()):
+        lines.append(line)
+        if i % 3 == 0:
+            lines += [""] * (i % 2) + [f"doi: 10.1000/{i}"]
+        if i % 20 == 19:
+            lines.append("Supplementary references")
+    path = tmp_path / "input.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def formatted(path: Path) -> str:
+    return "".join(
+        format_document(path.read_text(), default_options(), JOURNAL_MATCHER)
+    )
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 50, 1000])
+def test_boundaries(tmp_path: Path, count: int) -> None:
+    path = reference_list(tmp_path)
+    shards = shard_boundaries(str(path), count)
+    assert 1 <= len(shards) <= count
+    assert shards[0].start == 0 and shards[-1].end == path.stat().st_size
+    assert all(a.end == b.start for a, b in zip(shards, shards[1:]))
+    lines = [list(shard_lines(str(path), shard)) for shard in shards]
+    assert "".join(line for shard in lines for line in shard) == path.read_text()
+    for shard in lines[1:]:
+        first = next(line for line in shard if line.strip())
+        assert not is_doi_line(first)
+
+
+@pytest.mark.parametrize("count", [1, 4, 13])
+def test_merge(tmp_path: Path, count: int) -> None:
+    path = reference_list(tmp_path)
+    directory = str(tmp_path / "shards")
+    plan = plan_shards(str(path), count, {})
+    write_plan(plan, directory)
+    # the shards are processed in any order
+    for shard in reversed(plan.shards):
+        run_shard(plan, shard.index, directory, JOURNAL_MATCHER, stats=True)
+    output = io.StringIO()
+    summary = merge_shards(directory, output)
+    assert output.getvalue() == formatted(path)
+    assert summary["shards"] == len(plan.shards)
+    assert summary["references"] == len(output.getvalue().splitlines())
+    assert summary["references"] == sum(summary["statuses"].values())
+    assert (
+        summary["stages"]["format_reference"]["count"] == summary["statuses"]["Parsed"]
+    )
+
+
+def test_unfinished(tmp_path: Path) -> None:
+    path = reference_list(tmp_path)
+    directory = str(tmp_path / "shards")
+    plan = plan_shards(str(path), 3, {})
+    write_plan(plan, directory)
+    run_shard(plan, 0, directory, JOURNAL_MATCHER)
+    with pytest.raises(ShardError):
+        merge_shards(directory, io.StringIO())
+    # the shards of another plan are not merged
+    write_plan(plan_shards(str(path), 3, {"YearFormat": "Period"}), directory)
+    with pytest.raises(ShardError):
+        merge_shards(directory, io.StringIO())
+
+
+def test_journal_names(tmp_path: Path) -> None:
+    path = reference_list(tmp_path)
+    directory = str(tmp_path / "shards")
+    payload = {"ProcessJournalName": False}
+    plan = plan_shards(str(path), 2, payload)
+    write_plan(plan, directory)
+    for shard in plan.shards:
+        run_shard(plan, shard.index, directory, JOURNAL_MATCHER)
+    output = io.StringIO()
+    merge_shards(directory, output)
+    assert output.getvalue() == "".join(
+        format_document(path.read_text(), options_from_json(payload), None)
+    )
+
+
+def test_whole_list_options(tmp_path: Path) -> None:
+    with pytest.raises(ShardError):
+        plan_shards(str(reference_list(tmp_path)), 2, {"SortReferences": True})
+
+
+def test_local(tmp_path: Path) -> None:
+    path = reference_list(tmp_path)
+    directory = str(tmp_path / "shards")
+    plan = plan_shards(str(path), 3, {})
+    write_plan(plan, directory)
+    run_local(plan, directory, 2, False, JOURNAL_MATCHER)
+    output = io.StringIO()
+    summary = merge_shards(directory, output)
+    assert output.getvalue() == formatted(path)
+    # the stages are not timed without statistics
+    assert summary["stages"] == {}
+    assert summary["references"] == len(output.getvalue().splitlines())
+    assert merge_report(summary)
+
+
+def test_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = reference_list(tmp_path)
+    directory = str(tmp_path / "shards")
+    output = tmp_path / "output.txt"
+    commands = [
+        ["plan", str(path), directory, "-n", "3"],
+        ["run", "--no-cache", directory, "2", "0"],
+        ["run", "--no-cache", "--stats", directory, "1"],
+        ["merge", directory, "-o", str(output)],
+    ]
+    for command in commands:
+        monkeypatch.setattr(sys, "argv", ["reference_formatter", "shard", *command])
+        main()
+    assert output.read_text() == formatted(path)
+    plan = json.loads((tmp_path / "shards" / "plan.json").read_text())
+    assert len(plan["shards"]) == 3
+    stages = [
+        json.loads((tmp_path / "shards" / f"shard-{index:05d}.json").read_text())[
+            "stages"
+        ]
+        for index in range(3)
+    ]
+    assert not stages[0] and stages[1] and not stages[2]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import asyncio
+import io
+import random
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter.library.async_pipeline import (
+    format_references_async,
+)
+from itaxotools.reference_formatter.library import citation
+from itaxotools.reference_formatter.library.citation import (
+    FormattedReference,
+    Reference,
+    bracketed_views,
+    format_document,
+    format_references,
+    formatted_views,
+)
+from itaxotools.reference_formatter.library.document import ParsedDocument
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    Options,
+    OptionsDict,
+    default_options,
+    options_digest,
+)
+from itaxotools.reference_formatter.library.sorting import (
+    collation_key,
+    sorted_in_place,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+# in the sorted order
+SORTED = [
+    "Abel, K. 2001. Frogs of the island. Zootaxa 1: 1-2.",
+    "Åberg, J. 1999. Lizards of the island. Zootaxa 1: 1-2.",
+    "aberg, J. 2003a. Snakes of the island. Zootaxa 1: 1-2.",
+    "Aberg, J. 2003b. More snakes of the island. Zootaxa 1: 1-2.",
+    "Aberg, J. & Smith, K. 1990. Geckos of the island. Zootaxa 1: 1-2.",
+    "Aberg, J. & Zander, K. 1980. Skinks of the island. Zootaxa 1: 1-2.",
+    "Aberg, J., Zander, K. & Smith, L. 1985. Turtles of the island. Zootaxa 1: 1-2.",
+    "Aberg, J. et al. 1995. Newts of the island. Zootaxa 1: 1-2.",
+    "Abergson, J. 1950. Toads of the island. Zootaxa 1: 1-2.",
+    "Müller, J. 1990. Eocene lizards. Nature 473: 364-367.",
+    "Muller, J. 2000. Eocene snakes. Nature 473: 368-370.",
+]
+
+
+def parse(line: str) -> Reference:
+    reference = Reference.parse(line, JOURNAL_MATCHER)
+    assert reference
+    return reference
+
+
+def sort_options(html: bool = False) -> OptionsDict:
+    options = default_options()
+    options[Options.SortReferences] = True
+    options[Options.HtmlFormat] = html
+    return options
+
+
+def shuffled(lines: List[str]) -> List[str]:
+    lines = list(lines)
+    random.Random(0).shuffle(lines)
+    return lines
+
+
+def test_collation_key() -> None:
+    references = [parse(line) for line in shuffled(SORTED)]
+    assert [
+        reference.unparsed for reference in sorted(references, key=collation_key)
+    ] == SORTED
+
+
+def test_sorted_in_place() -> None:
+    items = ["b", None, "a", "c", None, "a"]
+    assert sorted_in_place(items, lambda item: item) == [
+        "a",
+        None,
+        "a",
+        "b",
+        None,
+        "c",
+    ]
+
+
+def test_options_digest() -> None:
+    # the format of the references doesn't depend on their order
+    assert options_digest(sort_options()) == options_digest(default_options())
+
+
+def test_text() -> None:
+    lines = shuffled(SORTED)
+    lines.insert(3, "References")
+    output = "".join(format_document("\n".join(lines), sort_options(), None))
+    expected = "".join(format_document("\n".join(SORTED), default_options(), None))
+    expected_lines = expected.splitlines()
+    expected_lines.insert(3, "* References")
+    assert output.splitlines() == expected_lines
+
+
+@pytest.mark.parametrize("html", [False, True])
+def test_document(html: bool) -> None:
+    text = TESTFILE_PATH.read_text()
+    if html:
+        text = "<html><body>\n" + "".join(
+            f"<p class=MsoNormal>{line}</p>\n" for line in text.splitlines()
+        )
+        document = ParsedDocument.from_html(io.StringIO(text), JOURNAL_MATCHER)
+    else:
+        document = ParsedDocument.from_text(
+            io.StringIO(text), sort_options(), JOURNAL_MATCHER
+        )
+    options = sort_options(html)
+    output = document.lines(options, 0, len(document), document.doi_lookup())
+    expected = "".join(format_document(text, options, JOURNAL_MATCHER)).splitlines()
+    assert output == expected
+    options[Options.SortReferences] = False
+    unsorted = "".join(format_document(text, options, JOURNAL_MATCHER))
+    assert output != unsorted.splitlines()
+    assert sorted(output) == sorted(unsorted.splitlines())
+
+
+def html_list(lines: List[str]) -> str:
+    return "<html><body>\n" + "".join(
+        f"<p class=MsoNormal>{line}</p>\n" for line in lines
+    )
+
+
+def test_html_parsed_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = "".join(
+        format_document(html_list(SORTED), sort_options(True), JOURNAL_MATCHER)
+    )
+    parsed: List[str] = []
+    parse = Reference.parse
+
+    def counted_parse(text: str, *args: Any) -> Optional[Reference]:
+        parsed.append(text)
+        return parse(text, *args)
+
+    monkeypatch.setattr(citation.Reference, "parse", counted_parse)
+    output = "".join(
+        format_document(
+            html_list(shuffled(SORTED)), sort_options(True), JOURNAL_MATCHER
+        )
+    )
+    assert output == expected
+    assert len(parsed) == len(SORTED)
+
+
+def test_two_step() -> None:
+    text = TESTFILE_PATH.read_text()
+    views: List[str] = []
+    records: List[str] = []
+    for view, record in bracketed_views(
+        text.splitlines(), default_options(), JOURNAL_MATCHER
+    ):
+        views.append(view)
+        records.append(record)
+    options = sort_options()
+    output = list(formatted_views(views, options, JOURNAL_MATCHER, records))
+    expected = "".join(format_document(text, options, JOURNAL_MATCHER))
+    assert output == expected.splitlines()
+
+
+def test_async() -> None:
+    text = TESTFILE_PATH.read_text()
+    options = sort_options()
+
+    async def collect() -> List[FormattedReference]:
+        return [
+            result
+            async for result in format_references_async(text, options, JOURNAL_MATCHER)
+        ]
+
+    expected = list(format_references(text, options, JOURNAL_MATCHER))
+    assert asyncio.run(collect()) == expected
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from itaxotools.reference_formatter.library.citation import (
+    Reference,
+    format_references,
+)
+from itaxotools.reference_formatter.library.journal_list import JournalMatcher
+from itaxotools.reference_formatter.library.options import (
+    CrossrefMatch,
+    Options,
+    default_options,
+)
+from itaxotools.reference_formatter.library.stats import (
+    collect_stats,
+    stage_clock,
+    timed_lookup,
+)
+
+JOURNAL_MATCHER = JournalMatcher()
+
+TESTFILE_PATH = Path(__file__).with_name("Referencelist2.txt")
+
+PARSE_STAGES = ["tokenize", "numbering_year", "extract_journal", "parse_authors"]
+
+FORMAT_STAGES = ["format_doi", "format_authors", "format_numbering", "normalize_space"]
+
+
+@pytest.mark.parametrize("html", [False, True])
+def test_stats(html: bool) -> None:
+    options = default_options()
+    options[Options.HtmlFormat] = html
+    if html:
+        input = "".join(
+            f"<p>{line}</p>\n" for line in TESTFILE_PATH.read_text().splitlines()
+        )
+    else:
+        input = TESTFILE_PATH.read_text()
+    expected = list(format_references(input, options, JOURNAL_MATCHER))
+    assert stage_clock() is None
+    with collect_stats() as clock:
+        assert stage_clock() is clock
+        assert list(format_references(input, options, JOURNAL_MATCHER)) == expected
+    assert stage_clock() is None
+    assert clock.references == len(expected)
+    for stage in PARSE_STAGES + FORMAT_STAGES:
+        assert clock.counts[stage] > 0
+        assert clock.times[stage] > 0
+    assert set(clock.to_dict()["stages"]) == set(clock.times)
+    assert f"{len(expected)} references in" in clock.report()
+
+
+def test_trace() -> None:
+    trace = io.StringIO()
+    with collect_stats(trace) as clock:
+        results = list(
+            format_references(
+                TESTFILE_PATH.read_text(), default_options(), JOURNAL_MATCHER
+            )
+        )
+    records = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert [record["reference"] for record in records] == [
+        result.source for result in results
+    ]
+    for stage, time in clock.times.items():
+        assert sum(record["stages"].get(stage, 0) for record in records) == (
+            pytest.approx(time)
+        )
+
+
+def test_nested_stage() -> None:
+    options = default_options()
+    options[Options.CrossrefAPI] = CrossrefMatch.Exact
+
+    def lookup(title: str, fuzzy: bool) -> Optional[str]:
+        time.sleep(0.01)
+        return "doi:10.1000/1"
+
+    parsed = (
+        Reference.parse(line, JOURNAL_MATCHER)
+        for line in TESTFILE_PATH.read_text().splitlines()
+    )
+    references = [reference for reference in parsed if reference][:5]
+    with collect_stats() as clock:
+        for reference in references:
+            reference.format_reference(options, None, timed_lookup(lookup))
+    assert clock.counts["crossref"] == 5
+    assert clock.times["crossref"] >= 0.05
+    # the lookup is not counted in the stage, that calls it
+    assert clock.times["format_doi"] < 0.01
+
+
+def test_threads() -> None:
+    clocks: List[object] = []
+    with collect_stats():
+        thread = threading.Thread(target=lambda: clocks.append(stage_clock()))
+        thread.start()
+        thread.join()
+    assert clocks == [None]